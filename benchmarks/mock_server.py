@@ -0,0 +1,280 @@
+"""In-process stand-in for the Cognos REST endpoints used by ContentClient and SessionFactory."""
+import hashlib
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlsplit
+
+from instrumentation import endpoint_kind
+from session import AUTH_HEADER
+
+
+logger = logging.getLogger(__name__)
+
+ROOT_FOLDER_ID = "team_folders"
+ITEMS_PATH = re.compile(r"^/content/([^/]+)/items$")
+CONTENT_PATH = re.compile(r"^/content/([^/]+)$")
+MODULE_PATH = re.compile(r"^/modules/([^/]+)$")
+# Fields kept server-side only; they are served through /modules/{id}.
+PRIVATE_FIELDS = ("parentId", "moduleJson")
+
+
+class MockContentStore:
+    """Content store tree shared by the request handlers of one mock server.
+
+    Every node is a dict of content fields plus ``parentId``; ``moduleJson``
+    holds what ``/modules/{id}`` returns for it. ``calls`` counts the handled
+    requests by endpoint kind and ``not_modified`` the GETs answered with 304.
+    ``expire_passports`` makes the server reject every passport issued so far, and
+    ``fail_next`` answers the next content requests with the given error statuses.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, Dict[str, Any]] = {ROOT_FOLDER_ID: {"id": ROOT_FOLDER_ID, "type": "folder", "defaultName": "Team content"}}
+        self.children: Dict[str, List[str]] = {ROOT_FOLDER_ID: []}
+        self.calls: Counter = Counter()
+        self.not_modified = 0
+        self.passports: List[str] = []
+        self.expired: Set[str] = set()
+        self.failures: List[int] = []
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._clock = itertools.count(1)
+
+    def add(self, parent_id: str, name: str, obj_type: str, obj_id: Optional[str] = None, **fields) -> str:
+        obj_id = obj_id or f"i{next(self._ids):08X}"
+        node = {
+            "id": obj_id,
+            "type": obj_type,
+            "defaultName": name,
+            "parentId": parent_id,
+            "modificationTime": self._timestamp(),
+        }
+        node.update(fields)
+        self.nodes[obj_id] = node
+        self.children.setdefault(parent_id, []).append(obj_id)
+        self.children.setdefault(obj_id, [])
+        self._touch(parent_id)
+        return obj_id
+
+    def update(self, obj_id: str, fields: Dict[str, Any]) -> None:
+        node = self.nodes[obj_id]
+        node.update(fields)
+        node["modificationTime"] = self._timestamp()
+        self._touch(node.get("parentId"))
+
+    def ancestors(self, obj_id: str) -> List[Dict[str, Any]]:
+        chain = []
+        parent = self.nodes.get(self.nodes[obj_id].get("parentId"))
+        while parent is not None:
+            chain.insert(0, {"id": parent["id"], "type": parent["type"], "defaultName": parent["defaultName"]})
+            parent = self.nodes.get(parent.get("parentId"))
+        return chain
+
+    def project(self, obj_id: str, fields: Optional[str]) -> Dict[str, Any]:
+        node = self.nodes[obj_id]
+        public = {key: value for key, value in node.items() if key not in PRIVATE_FIELDS}
+        if not fields or fields == "*":
+            return public
+        wanted = set(fields.split(","))
+        projected = {key: value for key, value in public.items() if key in wanted or key in ("id", "type")}
+        if "ancestors" in wanted:
+            projected["ancestors"] = self.ancestors(obj_id)
+        return projected
+
+    def expire_passports(self) -> None:
+        with self.lock:
+            self.expired.update(self.passports)
+
+    def fail_next(self, *statuses: int) -> None:
+        with self.lock:
+            self.failures.extend(statuses)
+
+    def reset_calls(self) -> Counter:
+        with self.lock:
+            calls, self.calls = self.calls, Counter()
+        return calls
+
+    def _timestamp(self) -> str:
+        return f"2024-01-01T00:00:00.{next(self._clock):06d}Z"
+
+    def _touch(self, folder_id: Optional[str]) -> None:
+        if folder_id in self.nodes:
+            self.nodes[folder_id]["modificationTime"] = self._timestamp()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        mock = self.server.mock
+        delay = mock.latency + (random.uniform(0, mock.jitter) if mock.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        body = self._read_body()
+        store = mock.store
+        with store.lock:
+            store.calls[endpoint_kind(method, parts.path)] += 1
+            if parts.path == "/session" and method == "PUT":
+                self._session()
+                return
+            if AUTH_HEADER not in self.headers:
+                self._reply(401, {"message": "not authenticated"})
+                return
+            if self.headers[AUTH_HEADER].split(" ")[-1] in store.expired:
+                self._reply(441, {"message": "passport expired"})
+                return
+            if store.failures:
+                self._reply(store.failures.pop(0), {"message": "injected failure"})
+                return
+            try:
+                status, payload = self._route(store, method, parts.path, query, body)
+            except KeyError as exc:
+                status, payload = 404, {"message": f"{exc} not found"}
+            data = json.dumps(payload).encode("utf-8")
+            # GETs carry an ETag of their body and are answered 304 when the client already has it.
+            etag = f'"{hashlib.sha1(data).hexdigest()}"' if method == "GET" and status == 200 else None
+            if etag is not None and self.headers.get("If-None-Match") == etag:
+                store.not_modified += 1
+                status = 304
+        self._reply(status, payload, data=data, etag=etag)
+
+    def _route(self, store: MockContentStore, method: str, path: str, query: Dict[str, str], body: Any):
+        match = ITEMS_PATH.match(path)
+        if match and method == "GET":
+            children = store.children[match.group(1)]
+            return 200, {"content": [store.project(child, query.get("fields")) for child in children]}
+        if path == "/content/copy" and method == "POST":
+            source = store.nodes[body["source_id"]]
+            fields = {key: value for key, value in source.items() if key not in ("id", "defaultName", "type", "parentId", "modificationTime")}
+            new_id = store.add(body["destination_id"], source["defaultName"], source["type"], **fields)
+            return 201, {"id": new_id}
+        if path == "/search" and method == "GET":
+            text = query.get("query", "").lower()
+            types = set(query.get("type", "").split(","))
+            hits = [
+                store.project(obj_id, query.get("fields"))
+                for obj_id, node in store.nodes.items()
+                if node["type"] in types and text in (node.get("defaultName") or "").lower()
+            ]
+            return 200, {"content": hits}
+        match = CONTENT_PATH.match(path)
+        if match and method == "GET":
+            data = store.project(match.group(1), query.get("fields"))
+            if query.get("fields", "*") != "*":
+                data = dict(data, fields=dict(data))
+            return 200, data
+        if match and method == "PUT":
+            store.update(match.group(1), body or {})
+            return 200, {}
+        if path == "/modules" and method == "POST":
+            new_id = store.add(query["location"], body.get("label"), "module", moduleJson=body)
+            return 201, {"id": new_id}
+        match = MODULE_PATH.match(path)
+        if match and method == "GET":
+            return 200, store.nodes[match.group(1)].get("moduleJson", {})
+        if match and method == "PUT":
+            store.update(match.group(1), {"moduleJson": body})
+            return 200, {}
+        return 404, {"message": f"No route for {method} {path}"}
+
+    def _session(self) -> None:
+        passport = f"passport{next(self.server.mock.passports)}"
+        self.server.mock.store.passports.append(passport)
+        self.send_response(201)
+        self.send_header("Set-Cookie", f"cam_passport={passport}; Path=/")
+        self.send_header("Set-Cookie", "XSRF-TOKEN=mock-xsrf; Path=/")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def _read_body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw) if raw else None
+
+    def _reply(self, status: int, payload: Any, data: Optional[bytes] = None, etag: Optional[str] = None) -> None:
+        if data is None:
+            data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    mock: "MockContentServer"
+
+
+class MockContentServer:
+    """Serves ``store`` on a free localhost port.
+
+    Every request sleeps ``latency`` seconds plus up to ``jitter`` seconds before
+    it is handled, which stands in for the round trip to a real server.
+    """
+
+    def __init__(self, store: MockContentStore, latency: float = 0.0, jitter: float = 0.0):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.passports = itertools.count(1)
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Mock server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.mock = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-content-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Mock content server listening on {self.base_url}")
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+
+    def __enter__(self) -> "MockContentServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
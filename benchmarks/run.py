@@ -0,0 +1,206 @@
+"""End-to-end benchmark of discovery, validation and migration against the mock server.
+
+    python -m benchmarks.run --depth 4 --fanout 5 --latency-ms 20 --json results.json
+
+Each phase runs with freshly logged-in clients, so its timings and API call
+counts do not depend on what the previous phase cached. The migration phase
+writes to the mock trees and therefore runs last.
+"""
+import argparse
+import copy
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List
+
+from benchmarks.mock_server import ROOT_FOLDER_ID, MockContentServer, MockContentStore
+from benchmarks.tree_gen import (
+    ADMIN_FOLDER_NAME,
+    BACKUP_FOLDER_NAME,
+    BACKUP_SUBFOLDERS,
+    TEMPLATE_DASHBOARD_ID,
+    TEMPLATE_REPORT_ID,
+    TreeShape,
+    generate,
+)
+from clients.content_client import ContentClient
+from config import DEFAULT_TAG, EnvironmentConfig
+from services.discovery import DiscoveryService
+from services.migrator import Migrator
+from services.validator import Validator
+from session import SessionFactory, SessionPool
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PhaseResult:
+    name: str
+    seconds: float
+    dev_calls: Dict[str, int] = field(default_factory=dict)
+    prod_calls: Dict[str, int] = field(default_factory=dict)
+    outcome: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.dev_calls.values()) + sum(self.prod_calls.values())
+
+
+def environment_config(base_url: str, main_folders: List[str], workers: int) -> EnvironmentConfig:
+    return EnvironmentConfig(
+        base_url=base_url,
+        namespace="mock",
+        username="benchmark",
+        password="benchmark",
+        root_folder_id=ROOT_FOLDER_ID,
+        main_folders=main_folders,
+        admin_folder_name=ADMIN_FOLDER_NAME,
+        backup_folder_name=BACKUP_FOLDER_NAME,
+        backup_subfolders=BACKUP_SUBFOLDERS,
+        template_report_id=TEMPLATE_REPORT_ID,
+        template_dashboard_id=TEMPLATE_DASHBOARD_ID,
+        tag=DEFAULT_TAG,
+        crawl_workers=workers,
+        migration_workers=workers,
+        http_retries=0,
+        adaptive_concurrency=False,
+    )
+
+
+def connect(env: EnvironmentConfig) -> ContentClient:
+    sessions = SessionPool(SessionFactory(env).create(), env.session_pool_size)
+    return ContentClient(env.base_url, sessions)
+
+
+class Benchmark:
+    """Runs the phases against one pair of generated trees and collects their results."""
+
+    def __init__(self, dev_store: MockContentStore, prod_store: MockContentStore, dev: EnvironmentConfig, prod: EnvironmentConfig):
+        self.dev_store = dev_store
+        self.prod_store = prod_store
+        self.dev = dev
+        self.prod = prod
+        self.results: List[PhaseResult] = []
+
+    def _phase(self, name: str, body: Callable[[ContentClient, ContentClient], Dict[str, int]]) -> PhaseResult:
+        self.dev_store.reset_calls()
+        self.prod_store.reset_calls()
+        started = time.perf_counter()
+        outcome = body(connect(self.dev), connect(self.prod))
+        result = PhaseResult(
+            name=name,
+            seconds=time.perf_counter() - started,
+            dev_calls=dict(self.dev_store.reset_calls()),
+            prod_calls=dict(self.prod_store.reset_calls()),
+            outcome=outcome,
+        )
+        self.results.append(result)
+        logger.info(f"{name}: {result.seconds:.2f}s, {result.total_calls} API calls")
+        return result
+
+    def run(self) -> List[PhaseResult]:
+        discovered: Dict[str, object] = {}
+
+        def discovery(dev_client: ContentClient, prod_client: ContentClient) -> Dict[str, int]:
+            dev_discovery = DiscoveryService(dev_client, self.dev)
+            prod_discovery = DiscoveryService(prod_client, self.prod)
+            discovered["dev_main"] = dev_discovery.find_main_folders()
+            discovered["prod_main"] = prod_discovery.find_main_folders()
+            discovered["prod_backup"] = prod_discovery.find_backup_folders()
+            discovered["objects"] = dev_discovery.find_tagged_objects(discovered["dev_main"])
+            return {"tagged": len(discovered["objects"])}
+
+        def validation(dev_client: ContentClient, prod_client: ContentClient) -> Dict[str, int]:
+            validator = Validator(dev_client, prod_client, self.dev)
+            passed = sum(
+                validator.validate(obj, discovered["dev_main"], discovered["prod_main"])
+                for obj in copy.deepcopy(discovered["objects"])
+            )
+            return {"passed": passed, "failed": len(discovered["objects"]) - passed}
+
+        def migration(dev_client: ContentClient, prod_client: ContentClient) -> Dict[str, int]:
+            migrator = Migrator(dev_client, prod_client, self.dev, self.prod, Validator(dev_client, prod_client, self.dev))
+            migrated = migrator.migrate_objects(
+                copy.deepcopy(discovered["objects"]),
+                discovered["dev_main"],
+                discovered["prod_main"],
+                discovered["prod_backup"],
+            )
+            return {"migrated": len(migrated), "unchanged": len(migrator.unchanged)}
+
+        self._phase("discovery", discovery)
+        self._phase("validation", validation)
+        self._phase("migration", migration)
+        return self.results
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = TreeShape()
+    parser = argparse.ArgumentParser(description="Benchmark discovery, validation and migration against a mock server")
+    parser.add_argument("--depth", type=int, default=defaults.depth, help="folder levels below each main folder")
+    parser.add_argument("--fanout", type=int, default=defaults.fanout, help="subfolders per folder")
+    parser.add_argument("--objects", type=int, default=defaults.objects_per_folder, help="objects per folder")
+    parser.add_argument("--tagged-every", type=int, default=defaults.tagged_every, help="one object in N is tagged")
+    parser.add_argument("--prod-share", type=float, default=defaults.prod_share, help="share of tagged objects already in prod")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="server-side delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay per request")
+    parser.add_argument("--workers", type=int, default=8, help="crawl and migration workers")
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser.parse_args()
+
+
+def print_results(results: List[PhaseResult]) -> None:
+    print(f"{'phase':<12}{'seconds':>10}{'dev calls':>11}{'prod calls':>12}  outcome")
+    for result in results:
+        outcome = ", ".join(f"{key}={value}" for key, value in result.outcome.items())
+        print(
+            f"{result.name:<12}{result.seconds:>10.2f}{sum(result.dev_calls.values()):>11}"
+            f"{sum(result.prod_calls.values()):>12}  {outcome}"
+        )
+    for result in results:
+        for target, calls in (("dev", result.dev_calls), ("prod", result.prod_calls)):
+            if calls:
+                breakdown = ", ".join(f"{kind}={count}" for kind, count in sorted(calls.items()))
+                print(f"  {result.name} {target}: {breakdown}")
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    shape = TreeShape(
+        depth=args.depth,
+        fanout=args.fanout,
+        objects_per_folder=args.objects,
+        tagged_every=args.tagged_every,
+        prod_share=args.prod_share,
+        seed=args.seed,
+    )
+    trees = generate(shape, DEFAULT_TAG)
+    print(f"Generated {trees.folders} folders and {trees.objects} objects, tagged: {trees.tagged}")
+
+    latency, jitter = args.latency_ms / 1000, args.jitter_ms / 1000
+    with MockContentServer(trees.dev, latency, jitter) as dev_server, MockContentServer(trees.prod, latency, jitter) as prod_server:
+        dev = environment_config(dev_server.base_url, list(shape.main_folders), args.workers)
+        prod = environment_config(prod_server.base_url, list(shape.main_folders), args.workers)
+        results = Benchmark(trees.dev, trees.prod, dev, prod).run()
+
+    print_results(results)
+    summary = {
+        "shape": asdict(shape),
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "workers": args.workers,
+        "folders": trees.folders,
+        "objects": trees.objects,
+        "phases": [dict(asdict(result), total_calls=result.total_calls) for result in results],
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as results_file:
+            json.dump(summary, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Synthetic dev/prod content trees for the benchmarks."""
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from benchmarks.mock_server import ROOT_FOLDER_ID, MockContentStore
+from services.spec_checks import DESCRIPTION_PREFIXES
+
+
+REPORT_NAMESPACE = "http://developer.cognos.com/schemas/report/16.0/"
+ADMIN_FOLDER_NAME = "Administration"
+BACKUP_FOLDER_NAME = "Backup"
+BACKUP_SUBFOLDERS = {"report": "Reports", "dashboard": "Dashboards", "module": "Modules"}
+TEMPLATE_REPORT_ID = "iTEMPLATEREPORT"
+TEMPLATE_DASHBOARD_ID = "iTEMPLATEDASHBOARD"
+
+
+@dataclass
+class TreeShape:
+    """Size and mix of a generated tree.
+
+    Every folder below each main folder has ``fanout`` subfolders down to ``depth``
+    levels and ``objects_per_folder`` objects. One object in ``tagged_every`` carries
+    the tag; ``prod_share`` of the tagged objects already exist in prod (so they are
+    backed up and updated rather than created), and one tagged report in
+    ``module_ref_every`` uses a data module from its folder.
+    """
+
+    main_folders: Tuple[str, ...] = ("Main",)
+    depth: int = 4
+    fanout: int = 4
+    objects_per_folder: int = 4
+    tagged_every: int = 20
+    prod_share: float = 0.5
+    module_ref_every: int = 5
+    seed: int = 1
+
+
+@dataclass
+class GeneratedTrees:
+    dev: MockContentStore
+    prod: MockContentStore
+    folders: int
+    objects: int
+    tagged: Dict[str, int]
+
+
+def report_spec(sql: str = "", greenplum_layout: bool = True) -> str:
+    attributes = 'viewPagesAsTabs="bottomLeft"' if greenplum_layout else ""
+    sql_text = f"<sqlText>{sql}</sqlText>" if sql else ""
+    return (
+        f'<report xmlns="{REPORT_NAMESPACE}" {attributes}>'
+        f"<queries><query><source>{sql_text}</source></query></queries>"
+        "<layouts><layout><reportPages><page name=\"Page1\"/></reportPages></layout></layouts>"
+        "</report>"
+    )
+
+
+def module_json(label: str) -> Dict:
+    return {
+        "label": label,
+        "identifier": label.replace(" ", "_"),
+        "querySubject": [{"label": f"{label} facts", "item": [{"queryItem": {"label": "amount"}}]}],
+        "useSpec": [{"ancestors": [{"defaultName": "Greenplum"}], "searchPath": "CAMID('greenplum')"}],
+    }
+
+
+def module_search_path(main_folder: str, path: List[str], name: str) -> str:
+    folders = "".join(f"/folder[@name='{folder}']" for folder in [main_folder] + path)
+    return f"CAMID(':'){folders}/module[@name='{name}']"
+
+
+def add_admin_tree(store: MockContentStore) -> None:
+    admin_id = store.add(ROOT_FOLDER_ID, ADMIN_FOLDER_NAME, "folder")
+    backup_id = store.add(admin_id, BACKUP_FOLDER_NAME, "folder")
+    for folder_name in BACKUP_SUBFOLDERS.values():
+        store.add(backup_id, folder_name, "folder")
+    templates_id = store.add(admin_id, "Templates", "folder")
+    store.add(templates_id, "Report template", "report", obj_id=TEMPLATE_REPORT_ID, specification=report_spec(), module="")
+    store.add(templates_id, "Dashboard template", "dashboard", obj_id=TEMPLATE_DASHBOARD_ID, specification="{}", module="")
+
+
+def generate(shape: TreeShape, tag: str) -> GeneratedTrees:
+    """Dev tree of ``shape`` and a prod tree holding its folders and the prod share of its tagged objects."""
+    rng = random.Random(shape.seed)
+    dev, prod = MockContentStore(), MockContentStore()
+    for store in (dev, prod):
+        add_admin_tree(store)
+    description = DESCRIPTION_PREFIXES[0]
+    counts = {"folders": 0, "objects": 0}
+    tagged = {"report": 0, "dashboard": 0, "module": 0}
+
+    def add_object(dev_parent: str, prod_parent: str, main_folder: str, path: List[str], index: int, module_name: str) -> None:
+        counts["objects"] += 1
+        roll = rng.random()
+        obj_type = "report" if roll < 0.75 else "dashboard" if roll < 0.95 else "module"
+        name = f"{obj_type.capitalize()} {'/'.join(path) or main_folder} #{index}"
+        is_tagged = rng.randrange(shape.tagged_every) == 0
+        dev_name = f"{name} {tag}" if is_tagged else name
+        if obj_type == "module":
+            fields = {"defaultDescription": description, "moduleJson": module_json(name)}
+        else:
+            uses_module = is_tagged and obj_type == "report" and rng.randrange(shape.module_ref_every) == 0
+            use_spec = [{"searchPath": module_search_path(main_folder, path, module_name)}] if uses_module else []
+            spec = report_spec() if obj_type == "report" else '{"widgets": {}}'
+            fields = {"defaultDescription": description, "specification": spec, "module": "", "moduleJson": {"useSpec": use_spec}}
+        dev.add(dev_parent, dev_name, obj_type, **fields)
+        if is_tagged:
+            tagged[obj_type] += 1
+            if rng.random() < shape.prod_share:
+                prod.add(prod_parent, name, obj_type, **dict(fields, defaultDescription=""))
+
+    def add_folder(dev_parent: str, prod_parent: str, main_folder: str, path: List[str], depth: int) -> None:
+        # Every folder holds an untagged data module that tagged reports may reference.
+        module_name = f"Data module {'/'.join(path) or main_folder}"
+        dev.add(dev_parent, module_name, "module", defaultDescription=description, moduleJson=module_json(module_name))
+        prod.add(prod_parent, module_name, "module", defaultDescription=description, moduleJson=module_json(module_name))
+        for index in range(shape.objects_per_folder):
+            add_object(dev_parent, prod_parent, main_folder, path, index, module_name)
+        if depth == shape.depth:
+            return
+        for index in range(shape.fanout):
+            folder_name = f"Folder {depth + 1}.{index}"
+            counts["folders"] += 1
+            dev_child = dev.add(dev_parent, folder_name, "folder")
+            prod_child = prod.add(prod_parent, folder_name, "folder")
+            add_folder(dev_child, prod_child, main_folder, path + [folder_name], depth + 1)
+
+    for main_folder in shape.main_folders:
+        counts["folders"] += 1
+        add_folder(dev.add(ROOT_FOLDER_ID, main_folder, "folder"), prod.add(ROOT_FOLDER_ID, main_folder, "folder"), main_folder, [], 0)
+
+    dev.reset_calls()
+    prod.reset_calls()
+    return GeneratedTrees(dev=dev, prod=prod, folders=counts["folders"], objects=counts["objects"], tagged=tagged)
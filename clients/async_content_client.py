@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+import instrumentation
+from clients.content_client import PATH_FIELDS
+from clients.folder_index import FolderIndex
+from clients.transport import IDEMPOTENT_METHODS, RetryPolicy, retry_statuses
+from session import AUTH_FAILURE_STATUSES, AUTH_HEADER, SessionData
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncContentClient:
+    """Awaitable twin of ``ContentClient`` built on aiohttp.
+
+    All requests of one environment go through a single ``aiohttp.ClientSession``
+    whose connector holds at most ``pool_size`` connections. The session is opened
+    lazily inside the running event loop; call ``close()`` (or use ``async with``)
+    when the run is done. Idempotent requests are retried per ``retry_policy``; a
+    rejected passport is renewed through the session's factory and the request replayed.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        session_data: SessionData,
+        pool_size: int = 20,
+        folder_index: Optional[FolderIndex] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        self.base_url = base_url
+        self.session_data = session_data
+        self._load_auth()
+        self.verify = session_data.session.verify
+        self.pool_size = pool_size
+        self.folder_index = folder_index if folder_index is not None else FolderIndex()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(retries=0, backoff_factor=0)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._listing_locks: Dict[str, asyncio.Lock] = {}
+        self._auth_lock = asyncio.Lock()
+
+    def _load_auth(self) -> None:
+        # requests silently drops headers set to None; aiohttp refuses them.
+        self.headers = {key: value for key, value in self.session_data.headers.items() if value is not None}
+        self.cookies = dict(self.session_data.cookies)
+
+    async def _reauthenticate(self, rejected_headers: Dict[str, str]) -> bool:
+        factory = self.session_data.factory
+        if factory is None:
+            return False
+        async with self._auth_lock:
+            # Requests rejected together share one login.
+            if self.headers.get(AUTH_HEADER) == rejected_headers.get(AUTH_HEADER):
+                logger.info(f"Session for {self.base_url} was rejected, logging in again")
+                await asyncio.to_thread(factory.refresh, self.session_data)
+                self._load_auth()
+                if self._session is not None:
+                    self._session.cookie_jar.update_cookies(self.cookies)
+        return True
+
+    async def __aenter__(self) -> "AsyncContentClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ssl=None if self.verify else False)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookies=self.cookies,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _request(self, method: str, url: str, payload: Any = None) -> Any:
+        delays = self.retry_policy.delays() if method in IDEMPOTENT_METHODS else iter(())
+        reauthenticated = False
+        while True:
+            headers = self.headers
+            instrumentation.note_call(self.base_url)
+            started = time.perf_counter()
+            try:
+                async with self._get_session().request(method, url, json=payload, headers=headers) as response:
+                    if response.status in AUTH_FAILURE_STATUSES and not reauthenticated:
+                        reauthenticated = True
+                        if await self._reauthenticate(headers):
+                            continue
+                    if response.status in retry_statuses(method):
+                        delay = next(delays, None)
+                        if delay is not None:
+                            await asyncio.sleep(self.retry_policy.retry_after(response.headers.get("Retry-After"), delay))
+                            continue
+                    response.raise_for_status()
+                    body = await response.read()
+                metrics = instrumentation.active()
+                if metrics is not None:
+                    sent = len(json.dumps(payload)) if payload is not None else 0
+                    metrics.record_request(self.base_url, method, url, time.perf_counter() - started, len(body), sent)
+                return json.loads(body) if body else None
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                delay = next(delays, None)
+                if delay is None:
+                    raise
+                logger.warning(f"{method} {url} failed ({exc!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def get_folder_items(self, folder_id: str, fields: str = "*") -> List[Dict[str, Any]]:
+        url = f"{self.base_url}/content/{folder_id}/items?fields={fields}"
+        data = await self._request("GET", url)
+        items = data.get("content", [])
+        self.folder_index.store(folder_id, items)
+        return items
+
+    async def _ensure_listing(self, folder_id: str) -> None:
+        if folder_id in self.folder_index:
+            return
+        lock = self._listing_locks.setdefault(folder_id, asyncio.Lock())
+        async with lock:
+            if folder_id not in self.folder_index:
+                await self.get_folder_items(folder_id, fields=PATH_FIELDS)
+
+    async def find_folder_id(self, parent_id: str, folder_name: str) -> Optional[str]:
+        await self._ensure_listing(parent_id)
+        return self.folder_index.lookup(parent_id, folder_name, "folder")
+
+    async def get_object_spec(self, obj_id: str, obj_type: str):
+        if obj_type == "module":
+            url = f"{self.base_url}/modules/{obj_id}"
+        else:
+            url = f"{self.base_url}/content/{obj_id}?fields=specification"
+        data = await self._request("GET", url)
+        if obj_type == "module":
+            return data
+        spec = data.get("fields", {}).get("specification")
+        if spec is None:
+            raise ValueError("Specification not found in response")
+        return spec
+
+    async def get_object_description(self, obj_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"{self.base_url}/content/{obj_id}?fields=description")
+
+    async def get_content(self, obj_id: str, fields: str = "*") -> Dict[str, Any]:
+        return await self._request("GET", f"{self.base_url}/content/{obj_id}?fields={fields}")
+
+    async def get_fields(self, obj_id: str, fields: str) -> Dict[str, Any]:
+        data = await self.get_content(obj_id, fields=fields)
+        return data.get("fields", data)
+
+    async def ensure_fields(self, obj: Dict[str, Any], fields: str) -> Dict[str, Any]:
+        missing = [field for field in fields.split(",") if field not in obj]
+        if missing:
+            values = await self.get_fields(obj["id"], ",".join(missing))
+            for field in missing:
+                obj[field] = values.get(field)
+        return obj
+
+    async def copy_object(self, source_id: str, dest_id: str, recursive: bool = True) -> str:
+        payload = {"source_id": source_id, "destination_id": dest_id, "recursive": recursive}
+        new_obj = await self._request("POST", f"{self.base_url}/content/copy", payload)
+        self.folder_index.invalidate(dest_id)
+        logger.info(f"Object {source_id} copied to {dest_id}, new ID: {new_obj['id']}")
+        return new_obj["id"]
+
+    async def update_object(self, obj_id: str, data: Dict[str, Any]) -> None:
+        await self._request("PUT", f"{self.base_url}/content/{obj_id}", data)
+        if "defaultName" in data and "type" in data:
+            self.folder_index.rename(obj_id, data["defaultName"], data["type"])
+        logger.info(f"Object {obj_id} updated")
+
+    async def update_module_spec(self, obj_id: str, spec: Dict[str, Any]) -> None:
+        await self._request("PUT", f"{self.base_url}/modules/{obj_id}", spec)
+        logger.info(f"Module spec {obj_id} updated")
+
+    async def create_module(self, folder_id: str, data: Dict[str, Any]) -> str:
+        new_obj = await self._request("POST", f"{self.base_url}/modules?location={folder_id}", data)
+        self.folder_index.invalidate(folder_id)
+        return (new_obj or {}).get("id", "")
+
+    async def find_object_in_path(self, root_id: str, path: List[str], name: str, obj_type: str) -> Optional[str]:
+        current_id = root_id
+        for folder_name in path:
+            current_id = await self.find_folder_id(current_id, folder_name)
+            if not current_id:
+                return None
+        if not current_id:
+            return None
+        await self._ensure_listing(current_id)
+        logger.info(f"Searching for object '{name}' (type: {obj_type}) in path {path}")
+        return self.folder_index.lookup(current_id, name, obj_type)
+
+    async def rename_object(self, obj_id: str, new_name: str, obj_type: str) -> None:
+        data = {"defaultName": new_name, "type": obj_type}
+        await self._request("PUT", f"{self.base_url}/content/{obj_id}", data)
+        self.folder_index.rename(obj_id, new_name, obj_type)
+        logger.info(f"Object {obj_id} renamed to {new_name} with type {obj_type}")
+
+    async def get_module(self, obj_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"{self.base_url}/modules/{obj_id}")
+
+    async def get_module_id(self, folder_id: str, module_name: str) -> str:
+        data = await self._request("GET", f"{self.base_url}/content/{folder_id}/items")
+        items = data["content"]
+        module_id = next((item["id"] for item in items if item["defaultName"] == module_name), None)
+        if not module_id:
+            raise ValueError(f"Module {module_name} not found in folder {folder_id}")
+        return module_id
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import mmap
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_VERSION = 1
+BUNDLE_MAGIC = b"CGBUNDLE"
+# Index offset, index length and the magic again; the last bytes of every bundle.
+TRAILER = struct.Struct("<QQ8s")
+# Blob name of an object's ``get_module`` payload; its payload fields keep their own names.
+MODULE_BLOB = "module_json"
+
+# Module lookup (root folder id, folder path, name, type) -> object id.
+Location = Tuple[str, Tuple[str, ...], str, str]
+
+
+def _encode(value: Any, sort_keys: bool = False) -> bytes:
+    return json.dumps(value, ensure_ascii=False, sort_keys=sort_keys).encode("utf-8")
+
+
+class BundleWriter:
+    """Writes a release bundle: zlib-compressed JSON blobs followed by an index.
+
+    Blobs are addressed by the SHA-256 of their canonical JSON and written once, straight to
+    the file as ``put`` is called, so an export never holds more than the payloads
+    in flight and identical specifications or modules are stored a single time.
+    ``close`` appends the compressed index (metadata and blob hashes of every
+    object, module lookups, blob offsets) and the trailer pointing at it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(BUNDLE_MAGIC)
+        self._end = len(BUNDLE_MAGIC)
+        self._blobs: Dict[str, Tuple[int, int]] = {}
+        self._objects: Dict[str, Dict[str, Any]] = {}
+        self._locations: List[list] = []
+        self._lock = threading.Lock()
+
+    def put(self, value: Any) -> str:
+        """Store ``value`` unless the bundle already has it; returns its hash."""
+        # Hashed with sorted keys so key order does not defeat deduplication; stored as given.
+        digest = hashlib.sha256(_encode(value, sort_keys=True)).hexdigest()
+        with self._lock:
+            if digest in self._blobs:
+                return digest
+        compressed = zlib.compress(_encode(value))
+        with self._lock:
+            if digest not in self._blobs:
+                self._file.write(compressed)
+                self._blobs[digest] = (self._end, len(compressed))
+                self._end += len(compressed)
+        return digest
+
+    def add_object(self, content: Dict[str, Any], blobs: Dict[str, str]) -> None:
+        """Record an object's content fields and the hashes of its payloads, merged into what it already has."""
+        with self._lock:
+            entry = self._objects.setdefault(content["id"], {"content": {}, "blobs": {}})
+            entry["content"].update(content)
+            entry["blobs"].update(blobs)
+
+    def add_location(self, location: Location, obj_id: str) -> None:
+        root_id, path, name, obj_type = location
+        with self._lock:
+            self._locations.append([root_id, list(path), name, obj_type, obj_id])
+
+    def close(self, tagged: List[str], **header) -> None:
+        """Write the index of the ``tagged`` object ids (in deployment order) and ``header`` fields."""
+        with self._lock:
+            index = dict(
+                header,
+                version=BUNDLE_VERSION,
+                created=round(time.time(), 3),
+                tagged=tagged,
+                objects=self._objects,
+                locations=self._locations,
+                blobs={digest: list(span) for digest, span in self._blobs.items()},
+            )
+            data = zlib.compress(_encode(index))
+            self._file.write(data)
+            self._file.write(TRAILER.pack(self._end, len(data), BUNDLE_MAGIC))
+            self._file.close()
+        logger.info(f"Bundle {self.path}: {len(tagged)} objects, {len(self._blobs)} blobs, {self._end / (1024 * 1024):.1f} MB")
+
+
+class ReleaseBundle:
+    """Read side of a bundle written by ``BundleWriter``.
+
+    The file is memory-mapped and only the index is decoded up front; each blob is
+    decompressed when asked for, so the payloads of a release stay on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as bundle_file:
+            self._map = mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < len(BUNDLE_MAGIC) + TRAILER.size or self._map[: len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a release bundle")
+        offset, length, magic = TRAILER.unpack(self._map[-TRAILER.size:])
+        if magic != BUNDLE_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is incomplete; the export writing it did not finish")
+        index = json.loads(zlib.decompress(self._map[offset:offset + length]))
+        if index.get("version") != BUNDLE_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} has bundle version {index.get('version')}, expected {BUNDLE_VERSION}")
+        self.source: str = index["source"]
+        self.tag: str = index["tag"]
+        self.main_folders: Dict[str, str] = index["main_folders"]
+        self.created: float = index["created"]
+        self._tagged: List[str] = index["tagged"]
+        self._objects: Dict[str, Dict[str, Any]] = index["objects"]
+        self._blobs: Dict[str, List[int]] = index["blobs"]
+        self._locations: Dict[Location, str] = {
+            (root_id, tuple(path), name, obj_type): obj_id for root_id, path, name, obj_type, obj_id in index["locations"]
+        }
+
+    def __len__(self) -> int:
+        return len(self._tagged)
+
+    def objects(self) -> Iterator[Dict[str, Any]]:
+        """Content fields of the tagged objects, with ``full_path``, in the order they were discovered."""
+        for obj_id in self._tagged:
+            yield dict(self._objects[obj_id]["content"])
+
+    def content(self, obj_id: str) -> Dict[str, Any]:
+        return self._objects[obj_id]["content"]
+
+    def payload(self, obj_id: str, name: str) -> Any:
+        """Decode one payload blob of an object; KeyError if the bundle has none."""
+        digest = self._objects[obj_id]["blobs"][name]
+        offset, length = self._blobs[digest]
+        return json.loads(zlib.decompress(self._map[offset:offset + length]))
+
+    def has_payload(self, obj_id: str, name: str) -> bool:
+        return name in self._objects.get(obj_id, {}).get("blobs", {})
+
+    def locate(self, location: Location) -> Optional[str]:
+        return self._locations.get(location)
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class BundleContentClient:
+    """Read-only stand-in for the dev ``ContentClient``, answering from a release bundle.
+
+    It serves what the validator and migrator read from dev: modules, content and
+    payload fields, and the module lookups of report search paths. An object the
+    bundle does not hold raises KeyError, like a missing object would fail on dev.
+    """
+
+    def __init__(self, bundle: ReleaseBundle):
+        self.bundle = bundle
+        self.base_url = f"bundle:{bundle.path}"
+
+    def get_module(self, obj_id: str) -> Dict[str, Any]:
+        return self.bundle.payload(obj_id, MODULE_BLOB)
+
+    def get_content(self, obj_id: str, fields: str = "*") -> Dict[str, Any]:
+        content = self.bundle.content(obj_id)
+        names = list(content) if fields == "*" else fields.split(",")
+        values = {}
+        for name in names:
+            if self.bundle.has_payload(obj_id, name):
+                values[name] = self.bundle.payload(obj_id, name)
+            elif name in content:
+                values[name] = content[name]
+        return values
+
+    def get_fields(self, obj_id: str, fields: str) -> Dict[str, Any]:
+        return self.get_content(obj_id, fields=fields)
+
+    def ensure_fields(self, obj: Dict[str, Any], fields: str) -> Dict[str, Any]:
+        missing = [field for field in fields.split(",") if field not in obj]
+        if missing:
+            values = self.get_fields(obj["id"], ",".join(missing))
+            for field in missing:
+                obj[field] = values.get(field)
+        return obj
+
+    def find_object_in_path(self, root_id: str, path: List[str], name: str, obj_type: str) -> Optional[str]:
+        return self.bundle.locate((root_id, tuple(path), name, obj_type))
+
+    def rename_object(self, obj_id: str, new_name: str, obj_type: str) -> None:
+        # Dev is not reachable from an import; its tags stay until a regular run finds the objects unchanged.
+        logger.info(f"Not renaming {obj_id} to {new_name}: the tag is removed in dev by a regular run")
@@ -1,42 +1,181 @@
+import json
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import quote
 
 import requests
 
-from session import SessionData
+import instrumentation
+from clients.folder_index import FolderIndex
+from clients.http_cache import ResponseCache
+from clients.transport import AdaptiveLimiter, timed_request
+from session import AUTH_FAILURE_STATUSES, SessionData, SessionPool
 
 
 logger = logging.getLogger(__name__)
 
+# Field projections for folder listings and content GETs. Listings used only to
+# resolve paths need nothing beyond PATH_FIELDS; report payloads are fetched on demand.
+PATH_FIELDS = "id,type,defaultName"
+DISCOVERY_FIELDS = "id,type,defaultName,defaultDescription,modificationTime"
+REPORT_PAYLOAD_FIELDS = "specification,module"
+SEARCH_FIELDS = f"{DISCOVERY_FIELDS},ancestors"
+
 
 class ContentClient:
-    def __init__(self, base_url: str, session_data: SessionData):
+    def __init__(
+        self,
+        base_url: str,
+        session_data: Union[SessionData, SessionPool],
+        folder_index: Optional[FolderIndex] = None,
+        cache: Optional[ResponseCache] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ):
         self.base_url = base_url
-        self.headers = session_data.headers
-        self.cookies = session_data.cookies
-        self.session = session_data.session
+        self.sessions = session_data if isinstance(session_data, SessionPool) else SessionPool(session_data)
+        self.folder_index = folder_index if folder_index is not None else FolderIndex()
+        self.cache = cache
+        self.limiter = limiter
+        self._listing_locks: Dict[str, threading.Lock] = {}
+        self._listing_locks_guard = threading.Lock()
+        self._modification_times: Dict[str, str] = {}
+
+    def _send(self, method: str, url: str, extra_headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        """Send one request on a leased session; a rejected passport is renewed and the request replayed once."""
+        with self.sessions.lease() as session_data:
+            response = self._send_on(session_data, method, url, extra_headers, **kwargs)
+            if response.status_code in AUTH_FAILURE_STATUSES and self.sessions.reauthenticate(session_data):
+                response = self._send_on(session_data, method, url, extra_headers, **kwargs)
+        return response
+
+    def _send_on(
+        self,
+        session_data: SessionData,
+        method: str,
+        url: str,
+        extra_headers: Optional[Dict[str, str]],
+        **kwargs,
+    ) -> requests.Response:
+        headers = dict(session_data.headers, **extra_headers) if extra_headers else session_data.headers
+        instrumentation.note_call(self.base_url)
+        metrics = instrumentation.active()
+        started = time.perf_counter() if metrics is not None else 0.0
+        response = timed_request(
+            session_data.session,
+            self.limiter,
+            method,
+            url,
+            headers=headers,
+            cookies=session_data.cookies,
+            verify=self.sessions.verify,
+            **kwargs,
+        )
+        if metrics is not None:
+            metrics.record_request(
+                self.base_url,
+                method,
+                url,
+                time.perf_counter() - started,
+                len(response.content),
+                len(response.request.body or b""),
+            )
+        return response
+
+    def _send_get(self, url: str, extra_headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        return self._send("GET", url, extra_headers)
+
+    def _get_json(self, url: str, obj_id: Optional[str] = None) -> Any:
+        """GET ``url`` through the response cache, if one is configured.
+
+        A cached body is returned without a request when ``obj_id`` has the same
+        ``modificationTime`` in the latest listing as when the body was stored;
+        otherwise it is revalidated with If-None-Match / If-Modified-Since.
+        """
+        if self.cache is None:
+            response = self._send_get(url)
+            response.raise_for_status()
+            return response.json()
+
+        modification_time = self._modification_times.get(obj_id) if obj_id else None
+        entry = self.cache.lookup(url)
+        conditional: Dict[str, str] = {}
+        if entry is not None:
+            if modification_time is not None and entry.modification_time == modification_time:
+                body = self.cache.read(url)
+                if body is not None:
+                    return json.loads(body)
+            if entry.etag:
+                conditional["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                conditional["If-Modified-Since"] = entry.last_modified
 
-    def get_folder_items(self, folder_id: str) -> List[Dict[str, Any]]:
-        url = f"{self.base_url}/content/{folder_id}/items?fields=*"
-        response = self.session.get(url, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
+        response = self._send_get(url, conditional)
+        if response.status_code == 304:
+            body = self.cache.read(url)
+            if body is not None:
+                return json.loads(body)
+            response = self._send_get(url)
         response.raise_for_status()
-        return response.json().get("content", [])
+        self.cache.store(
+            url,
+            response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            modification_time=modification_time,
+        )
+        return response.json()
 
-    def find_folder_id(self, parent_id: str, folder_name: str) -> Optional[str]:
-        items = self.get_folder_items(parent_id)
+    def _forget(self, obj_id: str) -> None:
+        """Drop cached responses of an object this client just wrote."""
+        self._modification_times.pop(obj_id, None)
+        if self.cache is not None:
+            self.cache.invalidate_prefix(f"{self.base_url}/content/{obj_id}?")
+            self.cache.invalidate_prefix(f"{self.base_url}/content/{obj_id}/items")
+            self.cache.invalidate(f"{self.base_url}/modules/{obj_id}")
+
+    def get_folder_items(self, folder_id: str, fields: str = "*") -> List[Dict[str, Any]]:
+        url = f"{self.base_url}/content/{folder_id}/items?fields={fields}"
+        items = self._get_json(url).get("content", [])
         for item in items:
-            if item.get("type") == "folder" and item.get("defaultName") == folder_name:
-                return item["id"]
-        return None
+            if item.get("modificationTime"):
+                self._modification_times[item["id"]] = item["modificationTime"]
+        self.folder_index.store(folder_id, items)
+        return items
+
+    def search_by_name(self, text: str, types: List[str], fields: str = SEARCH_FIELDS) -> List[Dict[str, Any]]:
+        """Objects of ``types`` whose name contains ``text``, found by the content service search.
+
+        The service may match more loosely (case, word stems); callers filter the hits.
+        """
+        url = f"{self.base_url}/search?query={quote(text)}&type={','.join(types)}&fields={fields}"
+        items = self._get_json(url).get("content", [])
+        for item in items:
+            if item.get("modificationTime"):
+                self._modification_times[item["id"]] = item["modificationTime"]
+        return items
+
+    def _ensure_listing(self, folder_id: str) -> None:
+        if folder_id in self.folder_index:
+            return
+        # Concurrent lookups of the same folder share one listing request.
+        with self._listing_locks_guard:
+            lock = self._listing_locks.setdefault(folder_id, threading.Lock())
+        with lock:
+            if folder_id not in self.folder_index:
+                self.get_folder_items(folder_id, fields=PATH_FIELDS)
+
+    def find_folder_id(self, parent_id: str, folder_name: str) -> Optional[str]:
+        self._ensure_listing(parent_id)
+        return self.folder_index.lookup(parent_id, folder_name, "folder")
 
     def get_object_spec(self, obj_id: str, obj_type: str):
         if obj_type == "module":
             url = f"{self.base_url}/modules/{obj_id}"
         else:
             url = f"{self.base_url}/content/{obj_id}?fields=specification"
-        response = self.session.get(url, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
-        response.raise_for_status()
-        data = response.json()
+        data = self._get_json(url, obj_id)
         if obj_type == "module":
             return data
         spec = data.get("fields", {}).get("specification")
@@ -46,41 +185,59 @@ class ContentClient:
 
     def get_object_description(self, obj_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/content/{obj_id}?fields=description"
-        response = self.session.get(url, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
-        response.raise_for_status()
-        return response.json()
+        return self._get_json(url, obj_id)
 
-    def get_content(self, obj_id: str) -> Dict[str, Any]:
-        url = f"{self.base_url}/content/{obj_id}?fields=*"
-        response = self.session.get(url, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
-        response.raise_for_status()
-        return response.json()
+    def get_content(self, obj_id: str, fields: str = "*") -> Dict[str, Any]:
+        url = f"{self.base_url}/content/{obj_id}?fields={fields}"
+        return self._get_json(url, obj_id)
+
+    def get_fields(self, obj_id: str, fields: str) -> Dict[str, Any]:
+        """Values of the listed content fields of an object."""
+        data = self.get_content(obj_id, fields=fields)
+        return data.get("fields", data)
+
+    def ensure_fields(self, obj: Dict[str, Any], fields: str) -> Dict[str, Any]:
+        """Fetch the listed fields of ``obj`` that it does not carry yet and store them on it."""
+        missing = [field for field in fields.split(",") if field not in obj]
+        if missing:
+            values = self.get_fields(obj["id"], ",".join(missing))
+            for field in missing:
+                obj[field] = values.get(field)
+        return obj
 
     def copy_object(self, source_id: str, dest_id: str, recursive: bool = True) -> str:
         url = f"{self.base_url}/content/copy"
         payload = {"source_id": source_id, "destination_id": dest_id, "recursive": recursive}
-        response = self.session.post(url, json=payload, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
+        response = self._send("POST", url, json=payload)
         response.raise_for_status()
+        self.folder_index.invalidate(dest_id)
+        self._forget(dest_id)
         new_obj = response.json()
         logger.info(f"Object {source_id} copied to {dest_id}, new ID: {new_obj['id']}")
         return new_obj["id"]
 
     def update_object(self, obj_id: str, data: Dict[str, Any]) -> None:
         url = f"{self.base_url}/content/{obj_id}"
-        response = self.session.put(url, json=data, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
+        response = self._send("PUT", url, json=data)
         response.raise_for_status()
+        self._forget(obj_id)
+        if "defaultName" in data and "type" in data:
+            self.folder_index.rename(obj_id, data["defaultName"], data["type"])
         logger.info(f"Object {obj_id} updated")
 
     def update_module_spec(self, obj_id: str, spec: Dict[str, Any]) -> None:
         url = f"{self.base_url}/modules/{obj_id}"
-        response = self.session.put(url, json=spec, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
+        response = self._send("PUT", url, json=spec)
         response.raise_for_status()
+        self._forget(obj_id)
         logger.info(f"Module spec {obj_id} updated")
 
     def create_module(self, folder_id: str, data: Dict[str, Any]) -> str:
         url = f"{self.base_url}/modules?location={folder_id}"
-        response = self.session.post(url, json=data, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
+        response = self._send("POST", url, json=data)
         response.raise_for_status()
+        self.folder_index.invalidate(folder_id)
+        self._forget(folder_id)
         new_obj = response.json()
         return new_obj.get("id", "")
 
@@ -92,31 +249,26 @@ class ContentClient:
                 return None
         if not current_id:
             return None
-        items = self.get_folder_items(current_id)
+        self._ensure_listing(current_id)
         logger.info(f"Searching for object '{name}' (type: {obj_type}) in path {path}")
-        for item in items:
-            if item["type"] == obj_type and item["defaultName"] == name:
-                return item["id"]
-        return None
+        return self.folder_index.lookup(current_id, name, obj_type)
 
     def rename_object(self, obj_id: str, new_name: str, obj_type: str) -> None:
         url = f"{self.base_url}/content/{obj_id}"
         data = {"defaultName": new_name, "type": obj_type}
-        response = self.session.put(url, json=data, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
+        response = self._send("PUT", url, json=data)
         response.raise_for_status()
+        self._forget(obj_id)
+        self.folder_index.rename(obj_id, new_name, obj_type)
         logger.info(f"Object {obj_id} renamed to {new_name} with type {obj_type}")
 
     def get_module(self, obj_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/modules/{obj_id}"
-        response = self.session.get(url, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
-        response.raise_for_status()
-        return response.json()
+        return self._get_json(url, obj_id)
 
     def get_module_id(self, folder_id: str, module_name: str) -> str:
         folder_items_url = f"{self.base_url}/content/{folder_id}/items"
-        response = self.session.get(folder_items_url, headers=self.headers, cookies=self.cookies, verify=self.session.verify)
-        response.raise_for_status()
-        items = response.json()["content"]
+        items = self._get_json(folder_items_url)["content"]
         module_id = next((item["id"] for item in items if item["defaultName"] == module_name), None)
         if not module_id:
             raise ValueError(f"Module {module_name} not found in folder {folder_id}")
@@ -0,0 +1,82 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class FolderIndex:
+    """Run-scoped map of folder listings: folder id -> {(defaultName, type): id}.
+
+    Only the first item with a given name and type is kept, which matches the
+    first-match semantics of the original linear scans. All methods are safe to
+    call from concurrent crawler and migration workers.
+    """
+
+    def __init__(self):
+        self._listings: Dict[str, Dict[Tuple[str, str], str]] = {}
+        self._parents: Dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, folder_id: str) -> bool:
+        with self._lock:
+            return folder_id in self._listings
+
+    def store(self, folder_id: str, items: List[Dict[str, Any]]) -> Dict[Tuple[str, str], str]:
+        listing: Dict[Tuple[str, str], str] = {}
+        for item in items:
+            key = (item.get("defaultName"), item.get("type"))
+            if key not in listing:
+                listing[key] = item["id"]
+        with self._lock:
+            self._invalidate(folder_id)
+            for obj_id in listing.values():
+                self._parents[obj_id] = folder_id
+            self._listings[folder_id] = listing
+        return listing
+
+    def listing(self, folder_id: str) -> Optional[Dict[Tuple[str, str], str]]:
+        with self._lock:
+            listing = self._listings.get(folder_id)
+            return dict(listing) if listing is not None else None
+
+    def lookup(self, folder_id: str, name: str, obj_type: str) -> Optional[str]:
+        with self._lock:
+            listing = self._listings.get(folder_id)
+            if listing is None:
+                return None
+            return listing.get((name, obj_type))
+
+    def invalidate(self, folder_id: str) -> None:
+        with self._lock:
+            self._invalidate(folder_id)
+
+    def _invalidate(self, folder_id: str) -> None:
+        listing = self._listings.pop(folder_id, None)
+        if listing is None:
+            return
+        for obj_id in listing.values():
+            if self._parents.get(obj_id) == folder_id:
+                del self._parents[obj_id]
+
+    def rename(self, obj_id: str, new_name: str, obj_type: str) -> None:
+        with self._lock:
+            self._rename(obj_id, new_name, obj_type)
+
+    def _rename(self, obj_id: str, new_name: str, obj_type: str) -> None:
+        parent_id = self._parents.get(obj_id)
+        if parent_id is None:
+            return
+        listing = self._listings.get(parent_id)
+        if listing is None:
+            return
+        stale_keys = [key for key, item_id in listing.items() if item_id == obj_id]
+        for key in stale_keys:
+            del listing[key]
+        if (new_name, obj_type) in listing:
+            # Another object already owns the name; only a fresh listing can tell which one wins.
+            logger.debug(f"Folder index entry for {parent_id} invalidated after rename of {obj_id}")
+            self._invalidate(parent_id)
+            return
+        listing[(new_name, obj_type)] = obj_id
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+# Index changes since the last ``flush``, one JSON line each, so a run that dies keeps what it cached.
+JOURNAL_FILE = "index.journal"
+
+
+@dataclass
+class CacheEntry:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    modification_time: Optional[str]
+    size: int
+
+
+class ResponseCache:
+    """On-disk cache of GET response bodies keyed by URL.
+
+    Bodies live in one file per URL under ``directory``; validators (ETag,
+    Last-Modified and the content store ``modificationTime``) are kept in an
+    index. Every change to it is appended to a journal as it happens and
+    ``flush`` folds the journal into the index file. Entries are evicted least
+    recently used first once the bodies exceed ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _body_path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def _load(self) -> None:
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        indexed = True
+        try:
+            with open(index_path, encoding="utf-8") as index_file:
+                raw = json.load(index_file)
+        except FileNotFoundError:
+            raw, indexed = [], False
+        except (OSError, ValueError) as exc:
+            logger.warning(f"HTTP cache index {index_path} is unreadable, starting empty: {exc}")
+            raw, indexed = [], False
+        entries = {url: fields for url, fields in raw}
+        journaled = self._replay_journal(entries)
+        for url, fields in entries.items():
+            if os.path.exists(self._body_path(url)):
+                self._entries[url] = CacheEntry(**fields)
+                self._size += fields["size"]
+        known = {os.path.basename(self._body_path(url)) for url in self._entries}
+        for name in os.listdir(self.directory):
+            if name in (INDEX_FILE, JOURNAL_FILE) or name in known:
+                continue
+            # Without an index or journal nothing says which bodies are stale, so only unfinished writes go.
+            if indexed or journaled or name.endswith(".tmp"):
+                os.remove(os.path.join(self.directory, name))
+
+    def _replay_journal(self, entries: Dict[str, dict]) -> bool:
+        """Apply the journaled changes to ``entries``; False when there is no journal."""
+        journal_path = os.path.join(self.directory, JOURNAL_FILE)
+        try:
+            with open(journal_path, encoding="utf-8") as journal_file:
+                lines = journal_file.readlines()
+        except FileNotFoundError:
+            return False
+        for line in lines:
+            try:
+                change = json.loads(line)
+            except ValueError:
+                # The last line of a run that died while appending it.
+                continue
+            if change[0] == "put":
+                entries.pop(change[1], None)
+                entries[change[1]] = change[2]
+            else:
+                entries.pop(change[1], None)
+        return True
+
+    def _journal(self, *change) -> None:
+        # Called with the lock held, so the journal order matches the index.
+        with open(os.path.join(self.directory, JOURNAL_FILE), "a", encoding="utf-8") as journal_file:
+            journal_file.write(json.dumps(change) + "\n")
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def read(self, url: str) -> Optional[bytes]:
+        try:
+            with open(self._body_path(url), "rb") as body_file:
+                return body_file.read()
+        except FileNotFoundError:
+            self.invalidate(url)
+            return None
+
+    def store(
+        self,
+        url: str,
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        modification_time: Optional[str] = None,
+    ) -> None:
+        if not (etag or last_modified or modification_time) or len(body) > self.max_bytes:
+            return
+        path = self._body_path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as body_file:
+            body_file.write(body)
+        os.replace(tmp_path, path)
+        with self._lock:
+            previous = self._entries.pop(url, None)
+            if previous is not None:
+                self._size -= previous.size
+            entry = CacheEntry(etag, last_modified, modification_time, len(body))
+            self._entries[url] = entry
+            self._size += len(body)
+            self._journal("put", url, asdict(entry))
+            evicted = self._evict()
+        for evicted_url in evicted:
+            self._remove_body(evicted_url)
+
+    def _evict(self) -> list:
+        evicted = []
+        while self._size > self.max_bytes and self._entries:
+            url, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+            self._journal("drop", url)
+            evicted.append(url)
+        return evicted
+
+    def _remove_body(self, url: str) -> None:
+        try:
+            os.remove(self._body_path(url))
+        except FileNotFoundError:
+            pass
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is not None:
+                self._size -= entry.size
+                self._journal("drop", url)
+        if entry is not None:
+            self._remove_body(url)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        with self._lock:
+            urls = [url for url in self._entries if url.startswith(prefix)]
+        for url in urls:
+            self.invalidate(url)
+
+    def flush(self) -> None:
+        """Write the index file, in least recently used order, and start a new journal."""
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        tmp_path = f"{index_path}.tmp"
+        with self._lock:
+            raw = [[url, asdict(entry)] for url, entry in self._entries.items()]
+            with open(tmp_path, "w", encoding="utf-8") as index_file:
+                json.dump(raw, index_file)
+            os.replace(tmp_path, index_path)
+            try:
+                os.remove(os.path.join(self.directory, JOURNAL_FILE))
+            except FileNotFoundError:
+                pass
+        logger.info(f"HTTP cache flushed: {len(raw)} entries, {self._size} bytes in {self.directory}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size}
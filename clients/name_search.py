@@ -0,0 +1,49 @@
+import json
+import logging
+from typing import Any, Dict, Iterable, List
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalNameSearch:
+    """In-memory stand-in for the content service name search.
+
+    Built from a flat dump of a content store: one dict per object with at least
+    ``id``, ``type``, ``defaultName`` and ``parentId``. ``search_by_name`` answers
+    like ``ContentClient.search_by_name``, including ``ancestors`` ordered from the
+    root down to the parent folder.
+    """
+
+    def __init__(self, items: Iterable[Dict[str, Any]]):
+        self._items = {item["id"]: item for item in items}
+
+    @classmethod
+    def from_file(cls, path: str) -> "LocalNameSearch":
+        with open(path, encoding="utf-8") as dump_file:
+            items = json.load(dump_file)
+        logger.info(f"Local name search loaded {len(items)} objects from {path}")
+        return cls(items)
+
+    def _ancestors(self, item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ancestors = []
+        seen = {item["id"]}
+        parent = self._items.get(item.get("parentId"))
+        while parent is not None and parent["id"] not in seen:
+            seen.add(parent["id"])
+            ancestors.append({"id": parent["id"], "type": parent["type"], "defaultName": parent["defaultName"]})
+            parent = self._items.get(parent.get("parentId"))
+        ancestors.reverse()
+        return ancestors
+
+    def search_by_name(self, text: str, types: List[str], fields: str) -> List[Dict[str, Any]]:
+        wanted = fields.split(",")
+        hits = []
+        for item in self._items.values():
+            if item["type"] not in types or text not in (item.get("defaultName") or ""):
+                continue
+            hit = {field: item.get(field) for field in wanted if field != "ancestors"}
+            if "ancestors" in wanted:
+                hit["ancestors"] = self._ancestors(item)
+            hits.append(hit)
+        return hits
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean the server wants fewer requests; they also shrink the adaptive limit.
+THROTTLE_STATUSES = frozenset({429, 503})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Cognos answers a rejected specification update with 500, so a PUT is only retried when the
+# server turned it away before handling it (or on a connection error).
+WRITE_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# POST (copy, module creation) is not idempotent and is never retried.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT"})
+
+
+def retry_statuses(method: str) -> frozenset:
+    """Response statuses after which a ``method`` request is retried."""
+    return WRITE_RETRY_STATUSES if method.upper() == "PUT" else RETRY_STATUSES
+
+
+class _MethodRetry(Retry):
+    """urllib3 ``Retry`` that takes its status list from ``retry_statuses`` for each method."""
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code not in retry_statuses(method):
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_retry_after(self, response) -> Optional[float]:
+        # A server asking for a longer pause than the backoff cap gets the cap, so no worker stalls unbounded.
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, self.backoff_max)
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how patiently idempotent requests are retried."""
+
+    retries: int
+    backoff_factor: float
+    max_backoff: float = 30.0
+
+    def urllib3_retry(self) -> Retry:
+        return _MethodRetry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            backoff_max=self.max_backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            # The final response is handed back so callers keep raising through raise_for_status().
+            raise_on_status=False,
+        )
+
+    def retry_after(self, header: Optional[str], delay: float) -> float:
+        """Sleep before a retry the server asked to delay by ``header`` seconds, capped like the backoff."""
+        if header and header.isdigit():
+            return min(float(header), self.max_backoff)
+        return delay
+
+    def delays(self) -> Iterator[float]:
+        """Sleep before each retry, matching urllib3's exponential backoff."""
+        for attempt in range(self.retries):
+            yield 0.0 if attempt == 0 else min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+
+
+def mount_transport(session: requests.Session, policy: RetryPolicy, pool_size: int) -> None:
+    """Mount a keep-alive pool of ``pool_size`` connections per host with ``policy`` retries on ``session``."""
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=policy.urllib3_retry())
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+class AdaptiveLimiter:
+    """AIMD cap on the requests in flight to one server.
+
+    The limit grows by about one slot per limit's worth of healthy responses and is
+    multiplied by ``decrease_ratio`` when a response is throttled, fails or takes
+    longer than ``latency_target`` seconds. Decreases are spaced by at least one
+    such latency, so a burst of slow responses counts as one congestion signal.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        latency_target: float,
+        minimum: int = 1,
+        decrease_ratio: float = 0.5,
+    ):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.latency_target = latency_target
+        self.decrease_ratio = decrease_ratio
+        self.limit = float(max(self.minimum, self.maximum // 2))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, congested: bool) -> None:
+        now = time.monotonic()
+        latency = now - started
+        with self._condition:
+            self._in_flight -= 1
+            previous = int(self.limit)
+            if congested or latency > self.latency_target:
+                if now - self._last_decrease >= max(latency, self.latency_target):
+                    self.limit = max(self.minimum, self.limit * self.decrease_ratio)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            if int(self.limit) != previous:
+                logger.debug(f"Concurrency limit {previous} -> {int(self.limit)} (latency {latency:.2f}s)")
+            self._condition.notify_all()
+
+
+def timed_request(
+    session: requests.Session,
+    limiter: Optional[AdaptiveLimiter],
+    method: str,
+    url: str,
+    **kwargs,
+) -> requests.Response:
+    """``session.request`` inside a limiter slot; errors and throttling responses count as congestion."""
+    if limiter is None:
+        return session.request(method, url, **kwargs)
+    started = limiter.acquire()
+    congested = True
+    try:
+        response = session.request(method, url, **kwargs)
+        congested = response.status_code in THROTTLE_STATUSES
+        return response
+    finally:
+        limiter.release(started, congested)
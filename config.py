@@ -1,11 +1,11 @@
 import json
 import os
-from dataclasses import dataclass
-from typing import Dict, List
+from dataclasses import dataclass, field, fields, replace
+from typing import Dict, List, Optional
 
 
 # Defaults preserved from the original script. Override via environment variables.
-DEFAULT_DEV_URL = "url" \"
+DEFAULT_DEV_URL = "url"
 DEFAULT_PROD_URL = "url"
 DEFAULT_NAMESPACE = "****"
 DEFAULT_USERNAME = "****"
@@ -23,6 +23,20 @@ DEFAULT_BACKUP_SUBFOLDERS = {
 }
 DEFAULT_TEMPLATE_REPORT_ID = "i89740B1A4FE54835B1EB17AFB3618D22"
 DEFAULT_TEMPLATE_DASHBOARD_ID = "i4AA85B4F0F64440AA020BF583B360483"
+DEFAULT_CRAWL_WORKERS = 8
+DEFAULT_MIGRATION_WORKERS = 4
+DEFAULT_HTTP_POOL_SIZE = 20
+DEFAULT_HTTP_CACHE_DIR = ".http_cache"
+DEFAULT_HTTP_CACHE_MAX_MB = 512
+DEFAULT_VALIDATION_PROCESSES = 0
+DEFAULT_STREAM_QUEUE_SIZE = 100
+DEFAULT_DISCOVERY_MODE = "crawl"
+DEFAULT_SNAPSHOT_MAX_AGE_HOURS = 168
+DEFAULT_HTTP_RETRIES = 5
+DEFAULT_HTTP_BACKOFF = 0.5
+DEFAULT_HTTP_LATENCY_TARGET = 2.0
+DEFAULT_SESSION_POOL_SIZE = 4
+DEFAULT_BACKUP_MANIFEST_DIR = "backup_manifests"
 
 
 def _load_json_or_default(env_var: str, default):
@@ -52,13 +66,83 @@ class EnvironmentConfig:
     template_report_id: str
     template_dashboard_id: str
     tag: str
+    # Label of the environment in logs, per-target results and per-target journal file names.
+    name: str = ""
     verify_ssl: bool = False
+    crawl_workers: int = DEFAULT_CRAWL_WORKERS
+    migration_workers: int = DEFAULT_MIGRATION_WORKERS
+    http_pool_size: int = DEFAULT_HTTP_POOL_SIZE
+    # The response cache is shared by both environments; prod bypasses it by default so writes never
+    # start from a cached read.
+    http_cache: bool = False
+    http_cache_dir: str = DEFAULT_HTTP_CACHE_DIR
+    http_cache_max_mb: int = DEFAULT_HTTP_CACHE_MAX_MB
+    # 0 validates specs in-process; N > 0 runs the CPU-bound checks on N worker processes.
+    validation_processes: int = DEFAULT_VALIDATION_PROCESSES
+    # Discovered objects buffered ahead of the migration stage in --stream mode.
+    stream_queue_size: int = DEFAULT_STREAM_QUEUE_SIZE
+    # "crawl" lists every folder under the main folders; "search" asks the content service for
+    # tagged names and falls back to crawling if the search fails.
+    discovery_mode: str = DEFAULT_DISCOVERY_MODE
+    # Content store dump answering "search" mode locally instead of the service (testing).
+    search_index_file: Optional[str] = None
+    # Folder tree snapshot for incremental crawls; None lists every folder on every run.
+    snapshot_file: Optional[str] = None
+    snapshot_max_age_hours: float = DEFAULT_SNAPSHOT_MAX_AGE_HOURS
+    # Retries of idempotent requests (GET/PUT) on connection errors, 429 and 5xx, with exponential backoff.
+    http_retries: int = DEFAULT_HTTP_RETRIES
+    http_backoff: float = DEFAULT_HTTP_BACKOFF
+    # Requests in flight adapt between 1 and http_pool_size, shrinking when responses exceed this latency (s).
+    adaptive_concurrency: bool = True
+    http_latency_target: float = DEFAULT_HTTP_LATENCY_TARGET
+    # Authenticated sessions per environment, logged in on demand as concurrent requests need them.
+    session_pool_size: int = DEFAULT_SESSION_POOL_SIZE
+    # Per-endpoint and per-stage request metrics written at the end of a run; None disables recording.
+    metrics_report: Optional[str] = None
+    metrics_prometheus: Optional[str] = None
+    # Append-only record of each object's migration steps; required by --resume.
+    journal_file: Optional[str] = None
+    # Where discovered objects' specifications are spilled during a run; None uses the system temp directory.
+    spec_store_dir: Optional[str] = None
+    # Where each run records the backups it made in a target, for --rollback; None keeps no record.
+    backup_manifest_dir: Optional[str] = DEFAULT_BACKUP_MANIFEST_DIR
 
 
 @dataclass
 class AppConfig:
     dev: EnvironmentConfig
+    # The first of ``targets``; with a single target the run works as before.
     prod: EnvironmentConfig
+    targets: List[EnvironmentConfig] = field(default_factory=list)
+
+
+def _load_targets(prod: EnvironmentConfig, dev_name: str) -> List[EnvironmentConfig]:
+    """Targets from TARGETS, a JSON list of EnvironmentConfig fields overriding the prod settings.
+
+    Every entry needs a unique ``name`` other than ``dev_name``; without TARGETS the only target is prod.
+    """
+    raw = os.getenv("TARGETS")
+    if not raw:
+        return [prod]
+    try:
+        entries = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"TARGETS is not valid JSON: {exc}") from exc
+    known = {config_field.name for config_field in fields(EnvironmentConfig)}
+    targets = []
+    for entry in entries:
+        unknown = set(entry) - known
+        if unknown:
+            raise ValueError(f"Unknown fields in TARGETS entry {entry.get('name')}: {sorted(unknown)}")
+        if not entry.get("name"):
+            raise ValueError("Every TARGETS entry needs a name")
+        if entry["name"] == dev_name:
+            raise ValueError(f"TARGETS entry {dev_name} has the name of the dev environment")
+        targets.append(replace(prod, **entry))
+    names = [target.name for target in targets]
+    if not targets or len(set(names)) != len(names):
+        raise ValueError(f"TARGETS needs at least one entry and unique names, got {names}")
+    return targets
 
 
 def load_config() -> AppConfig:
@@ -79,14 +163,40 @@ def load_config() -> AppConfig:
         "template_dashboard_id": os.getenv("TEMPLATE_DASHBOARD_ID", DEFAULT_TEMPLATE_DASHBOARD_ID),
         "tag": os.getenv("TAG", DEFAULT_TAG),
         "verify_ssl": verify_ssl,
+        "crawl_workers": int(os.getenv("CRAWL_WORKERS", DEFAULT_CRAWL_WORKERS)),
+        "migration_workers": int(os.getenv("MIGRATION_WORKERS", DEFAULT_MIGRATION_WORKERS)),
+        "http_pool_size": int(os.getenv("HTTP_POOL_SIZE", DEFAULT_HTTP_POOL_SIZE)),
+        "http_cache_dir": os.getenv("HTTP_CACHE_DIR", DEFAULT_HTTP_CACHE_DIR),
+        "http_cache_max_mb": int(os.getenv("HTTP_CACHE_MAX_MB", DEFAULT_HTTP_CACHE_MAX_MB)),
+        "validation_processes": int(os.getenv("VALIDATION_PROCESSES", DEFAULT_VALIDATION_PROCESSES)),
+        "stream_queue_size": int(os.getenv("STREAM_QUEUE_SIZE", DEFAULT_STREAM_QUEUE_SIZE)),
+        "discovery_mode": os.getenv("DISCOVERY_MODE", DEFAULT_DISCOVERY_MODE).lower(),
+        "search_index_file": os.getenv("SEARCH_INDEX_FILE"),
+        "snapshot_file": os.getenv("DISCOVERY_SNAPSHOT"),
+        "snapshot_max_age_hours": float(os.getenv("SNAPSHOT_MAX_AGE_HOURS", DEFAULT_SNAPSHOT_MAX_AGE_HOURS)),
+        "http_retries": int(os.getenv("HTTP_RETRIES", DEFAULT_HTTP_RETRIES)),
+        "http_backoff": float(os.getenv("HTTP_BACKOFF", DEFAULT_HTTP_BACKOFF)),
+        "adaptive_concurrency": os.getenv("ADAPTIVE_CONCURRENCY", "true").lower() == "true",
+        "http_latency_target": float(os.getenv("HTTP_LATENCY_TARGET", DEFAULT_HTTP_LATENCY_TARGET)),
+        "session_pool_size": int(os.getenv("SESSION_POOL_SIZE", DEFAULT_SESSION_POOL_SIZE)),
+        "metrics_report": os.getenv("METRICS_REPORT"),
+        "metrics_prometheus": os.getenv("METRICS_PROMETHEUS"),
+        "journal_file": os.getenv("MIGRATION_JOURNAL"),
+        "spec_store_dir": os.getenv("SPEC_STORE_DIR"),
+        "backup_manifest_dir": os.getenv("BACKUP_MANIFEST_DIR", DEFAULT_BACKUP_MANIFEST_DIR) or None,
     }
 
     dev = EnvironmentConfig(
         base_url=os.getenv("DEV_URL", DEFAULT_DEV_URL),
+        name="dev",
+        http_cache=os.getenv("HTTP_CACHE", "true").lower() == "true",
         **shared,
     )
     prod = EnvironmentConfig(
         base_url=os.getenv("PROD_URL", DEFAULT_PROD_URL),
+        name="prod",
+        http_cache=os.getenv("PROD_HTTP_CACHE", "false").lower() == "true",
         **shared,
     )
-    return AppConfig(dev=dev, prod=prod)
+    targets = _load_targets(prod, dev.name)
+    return AppConfig(dev=dev, prod=targets[0], targets=targets)
@@ -0,0 +1,202 @@
+"""Opt-in run instrumentation: counts, bytes and latency per endpoint kind and per stage.
+
+Nothing is recorded until ``enable()`` is called; until then every hook returns
+after a single ``None`` check. Request bytes are also charged to the innermost
+``stage`` active in the calling context; use ``submit`` to carry that context
+into thread pool workers. Independently of that, ``count_calls`` counts the
+requests made in its context per target server.
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+_current: Optional["RunMetrics"] = None
+_stage: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("instrumentation_stage", default=None)
+_calls: contextvars.ContextVar[Optional[Counter]] = contextvars.ContextVar("instrumentation_calls", default=None)
+
+
+def endpoint_kind(method: str, url: str) -> str:
+    path = urlsplit(url).path
+    if path.endswith("/session"):
+        return "session"
+    if path.endswith("/items"):
+        return "folder_items"
+    if path.endswith("/content/copy"):
+        return "copy"
+    if path.endswith("/search"):
+        return "search"
+    if method == "POST" and path.endswith("/modules"):
+        return "create"
+    if method == "PUT":
+        return "update"
+    if "/modules/" in path:
+        return "module_get"
+    if "/content/" in path:
+        return "content_get"
+    return "other"
+
+
+class _Series:
+    __slots__ = ("count", "requests", "bytes_in", "bytes_out", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.samples: List[float] = []
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        summary: Dict[str, Any] = {
+            "count": self.count,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "total_seconds": round(sum(ordered), 6),
+        }
+        for percentile in PERCENTILES:
+            # Nearest-rank percentile.
+            rank = max(0, -(-percentile * len(ordered) // 100) - 1)
+            summary[f"p{percentile}_seconds"] = round(ordered[rank], 6) if ordered else None
+        return summary
+
+
+class RunMetrics:
+    """Thread-safe accumulator for one run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._endpoints: Dict[Tuple[str, str], _Series] = {}
+        self._stages: Dict[str, _Series] = {}
+
+    def record_request(self, target: str, method: str, url: str, seconds: float, bytes_in: int, bytes_out: int) -> None:
+        stage = _stage.get()
+        with self._lock:
+            series = self._endpoints.setdefault((target, endpoint_kind(method, url)), _Series())
+            series.count += 1
+            series.bytes_in += bytes_in
+            series.bytes_out += bytes_out
+            series.samples.append(seconds)
+            if stage is not None:
+                stage_series = self._stages.setdefault(stage, _Series())
+                stage_series.requests += 1
+                stage_series.bytes_in += bytes_in
+                stage_series.bytes_out += bytes_out
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            series = self._stages.setdefault(name, _Series())
+            series.count += 1
+            series.samples.append(seconds)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints: Dict[str, Dict[str, Any]] = {}
+            for (target, kind), series in sorted(self._endpoints.items()):
+                endpoints.setdefault(target, {})[kind] = series.summary()
+            stages = {}
+            for name, series in sorted(self._stages.items()):
+                stages[name] = dict(series.summary(), requests=series.requests)
+        return {"run_seconds": round(time.time() - self.started, 3), "endpoints": endpoints, "stages": stages}
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+        logger.info(f"Instrumentation report written to {path}")
+
+    def write_prometheus(self, path: str) -> None:
+        report = self.report()
+        lines = []
+        for metric, key, kind in (
+            ("cognos_deploy_requests_total", "count", "counter"),
+            ("cognos_deploy_request_bytes_in_total", "bytes_in", "counter"),
+            ("cognos_deploy_request_bytes_out_total", "bytes_out", "counter"),
+            ("cognos_deploy_request_seconds_total", "total_seconds", "counter"),
+        ):
+            lines.append(f"# TYPE {metric} {kind}")
+            for target, kinds in report["endpoints"].items():
+                for endpoint, summary in kinds.items():
+                    lines.append(f'{metric}{{target="{target}",endpoint="{endpoint}"}} {summary[key]}')
+        lines.append("# TYPE cognos_deploy_request_seconds summary")
+        for target, kinds in report["endpoints"].items():
+            for endpoint, summary in kinds.items():
+                for percentile in PERCENTILES:
+                    value = summary[f"p{percentile}_seconds"]
+                    labels = f'target="{target}",endpoint="{endpoint}",quantile="{percentile / 100}"'
+                    lines.append(f"cognos_deploy_request_seconds{{{labels}}} {value if value is not None else 'NaN'}")
+        lines.append("# TYPE cognos_deploy_stage_seconds_total counter")
+        for name, summary in report["stages"].items():
+            lines.append(f'cognos_deploy_stage_seconds_total{{stage="{name}"}} {summary["total_seconds"]}')
+        lines.append("# TYPE cognos_deploy_stage_runs_total counter")
+        for name, summary in report["stages"].items():
+            lines.append(f'cognos_deploy_stage_runs_total{{stage="{name}"}} {summary["count"]}')
+        with open(path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write("\n".join(lines) + "\n")
+        logger.info(f"Prometheus metrics written to {path}")
+
+
+def enable() -> RunMetrics:
+    global _current
+    _current = RunMetrics()
+    return _current
+
+
+def disable() -> None:
+    global _current
+    _current = None
+
+
+def active() -> Optional[RunMetrics]:
+    return _current
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    metrics = _current
+    if metrics is None:
+        yield
+        return
+    token = _stage.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.record_stage(name, time.perf_counter() - started)
+        _stage.reset(token)
+
+
+def submit(pool: Executor, fn: Callable[..., Any], *args) -> Future:
+    """``pool.submit`` that keeps the caller's stage for the worker."""
+    if _current is None:
+        return pool.submit(fn, *args)
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+@contextmanager
+def count_calls() -> Iterator[Counter]:
+    """Counter of the requests sent in this context, by target base URL."""
+    counter: Counter = Counter()
+    token = _calls.set(counter)
+    try:
+        yield counter
+    finally:
+        _calls.reset(token)
+
+
+def note_call(target: str) -> None:
+    counter = _calls.get()
+    if counter is not None:
+        counter[target] += 1
@@ -1,14 +1,31 @@
+import argparse
 import logging
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional
 
 import requests
 
+import instrumentation
+from clients.bundle import BundleContentClient, BundleWriter, ReleaseBundle
 from clients.content_client import ContentClient
-from config import load_config
+from clients.http_cache import ResponseCache
+from clients.name_search import LocalNameSearch
+from clients.transport import AdaptiveLimiter
+from config import AppConfig, EnvironmentConfig, load_config
+from services.backup import BackupManifest, rollback
 from services.discovery import DiscoveryService
+from services.export import BundleExport
+from services.fanout import FanOutDeployment, TargetResult
+from services.journal import MigrationJournal
 from services.migrator import Migrator
+from services.pipeline import MigrationPipeline
+from services.snapshot import TreeSnapshot
+from services.spec_store import ObjectRecord, SpecStore
+from services.startup import Startup, target_folders
 from services.validator import Validator
-from session import SessionFactory
+from session import SessionFactory, SessionPool
 
 
 warnings.filterwarnings("ignore", category=requests.packages.urllib3.exceptions.InsecureRequestWarning)
@@ -17,34 +34,362 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
-def main():
-    config = load_config()
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Deploy tagged Cognos objects from dev to prod")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="validate and migrate objects while the dev crawl is still running",
+    )
+    parser.add_argument(
+        "--full-rescan",
+        action="store_true",
+        help="ignore the discovery snapshot and list every dev folder (the snapshot is rewritten)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the last run recorded in MIGRATION_JOURNAL instead of starting a new one",
+    )
+    parser.add_argument(
+        "--rollback",
+        metavar="MANIFEST",
+        help="restore every object in a backup manifest written by an earlier run, then exit",
+    )
+    parser.add_argument(
+        "--export",
+        metavar="BUNDLE",
+        help="write the tagged dev objects to a release bundle instead of deploying them",
+    )
+    parser.add_argument(
+        "--import",
+        dest="import_bundle",
+        metavar="BUNDLE",
+        help="deploy the release in a bundle written by --export, without connecting to dev",
+    )
+    return parser.parse_args()
+
+
+def build_limiter(env: EnvironmentConfig) -> Optional[AdaptiveLimiter]:
+    if not env.adaptive_concurrency:
+        return None
+    return AdaptiveLimiter(env.http_pool_size, env.http_latency_target)
+
+
+def connect(env: EnvironmentConfig, cache: Optional[ResponseCache]) -> ContentClient:
+    session = SessionPool(SessionFactory(env).create(), env.session_pool_size)
+    return ContentClient(
+        env.base_url,
+        session,
+        cache=cache if env.http_cache else None,
+        limiter=build_limiter(env),
+    )
+
+
+def print_target_results(results: List[TargetResult]) -> None:
+    for result in results:
+        status = f"failed: {result.error}" if result.error else "ok"
+        print(f"Target {result.name} ({status}, {result.seconds:.1f}s): migrated {result.migrated}")
+        if result.unchanged:
+            print(f"  unchanged in {result.name}, backup and update skipped: {result.unchanged}")
+        for obj_id, calls in result.api_calls.items():
+            print(f"  API calls for {calls['path']}/{calls['name']} ({obj_id}): dev {calls['dev']}, prod {calls['prod']}")
+
+
+def open_journals(args: argparse.Namespace, config: AppConfig) -> Dict[str, MigrationJournal]:
+    """Journal of each target by name; with several targets each gets MIGRATION_JOURNAL.<target name>."""
+    if not config.dev.journal_file:
+        return {}
+    if len(config.targets) == 1:
+        return {config.prod.name: MigrationJournal(config.dev.journal_file, resume=args.resume)}
+    return {
+        target.name: MigrationJournal(f"{config.dev.journal_file}.{target.name}", resume=args.resume)
+        for target in config.targets
+    }
+
+
+def open_manifests(config: AppConfig, journals: Dict[str, MigrationJournal]) -> Dict[str, BackupManifest]:
+    """Backup manifest of each target; a resumed run keeps adding to the one its journal names."""
+    if not config.dev.backup_manifest_dir:
+        return {}
+    manifests = {}
+    for target in config.targets:
+        journal = journals.get(target.name)
+        if journal is not None and journal.resumed and journal.manifest_path:
+            manifest = BackupManifest.reopen(journal.manifest_path, target.name, target.base_url)
+        else:
+            manifest = BackupManifest.for_run(config.dev.backup_manifest_dir, target.name, target.base_url)
+            if journal is not None:
+                journal.manifest_path = manifest.path
+        manifests[target.name] = manifest
+    return manifests
+
+
+def run_rollback(config: AppConfig, path: str) -> None:
+    """Restore the target a manifest was written for; exits non-zero if any object could not be restored."""
+    manifest = BackupManifest.load(path)
+    target = next((target for target in config.targets if target.name == manifest.target), None)
+    if target is None or target.base_url != manifest.base_url:
+        raise SystemExit(f"{path} was written for {manifest.target} at {manifest.base_url}, which is not a configured target")
+    logger.info(f"Rolling back {len(manifest.entries)} backups in {target.name} from {path}")
+    # Restores read the backup copies straight from the server, never from the response cache.
+    result = rollback(connect(target, None), manifest, target.migration_workers)
+    print(f"Restored in {target.name}: {result.restored}")
+    if result.failed:
+        names = {entry.prod_id: entry.name for entry in manifest.entries}
+        for prod_id, error in result.failed.items():
+            print(f"Not restored: {names[prod_id]} ({prod_id}): {error}")
+        raise SystemExit(1)
+
 
-    dev_session = SessionFactory(config.dev).create()
-    prod_session = SessionFactory(config.prod).create()
+def journaled_objects(journals: Dict[str, MigrationJournal], spec_store: SpecStore) -> Optional[List[ObjectRecord]]:
+    """Objects of a resumed run whose discovery had finished for every target, or None if dev must be crawled."""
+    if not journals or not all(journal.discovery_complete for journal in journals.values()):
+        return None
+    first = next(iter(journals.values()))
+    return [ObjectRecord.from_item(obj, spec_store) for obj in first.discovered]
 
-    dev_client = ContentClient(config.dev.base_url, dev_session)
-    prod_client = ContentClient(config.prod.base_url, prod_session)
 
-    dev_discovery = DiscoveryService(dev_client, config.dev)
-    prod_discovery = DiscoveryService(prod_client, config.prod)
+def bundled_objects(bundle: ReleaseBundle, spec_store: SpecStore) -> List[ObjectRecord]:
+    return [ObjectRecord.from_item(obj, spec_store) for obj in bundle.objects()]
 
-    dev_main_folders = dev_discovery.find_main_folders()
-    prod_main_folders = prod_discovery.find_main_folders()
-    prod_backup_folders = prod_discovery.find_backup_folders()
 
-    objects_to_migrate = []
-    for folder_name, folder_id in dev_main_folders.items():
-        objects_to_migrate.extend(dev_discovery.recursive_search_objects(folder_id, [folder_name]))
+def export(
+    path: str,
+    config: AppConfig,
+    dev_client: ContentClient,
+    find_objects: Callable[[], List[dict]],
+    dev_main_folders: Dict[str, str],
+) -> None:
+    """Write the tagged dev objects to the release bundle at ``path``; nothing is deployed or renamed."""
+    objects = find_objects()
+    for item in objects:
+        print(item["defaultName"])
+    BundleExport(dev_client, config.dev, BundleWriter(path)).run(objects, dev_main_folders)
+    print(f"Exported {len(objects)} objects to {path}; deploy them with --import {path}")
+
 
-    for item in objects_to_migrate:
+def fan_out(
+    config: AppConfig,
+    startup: Startup,
+    dev_client: ContentClient,
+    find_objects: Callable[[], List[dict]],
+    dev_main_folders: Dict[str, str],
+    journals: Dict[str, MigrationJournal],
+    manifests: Dict[str, BackupManifest],
+    spec_store: SpecStore,
+    validation_pool: Optional[ProcessPoolExecutor],
+) -> List[TargetResult]:
+    """Deploy one dev discovery (or bundle) to every configured target."""
+    objects = journaled_objects(journals, spec_store)
+    if objects is None:
+        objects = find_objects()
+        for journal in journals.values():
+            objects = journal.record_discovery(objects, spec_store)
+    for item in objects:
         print(item["defaultName"])
 
-    validator = Validator(dev_client, prod_client, config.dev)
-    migrator = Migrator(dev_client, prod_client, config.dev, config.prod, validator)
+    deployment = FanOutDeployment(
+        dev_client,
+        config.dev,
+        config.targets,
+        startup,
+        spec_store,
+        validation_executor=validation_pool,
+        journals=journals,
+        manifests=manifests,
+    )
+    return deployment.run(objects, dev_main_folders)
+
+
+def deploy(
+    args: argparse.Namespace,
+    config: AppConfig,
+    startup: Startup,
+    dev_client: ContentClient,
+    find_objects: Callable[[], List[dict]],
+    dev_discovery: Optional[DiscoveryService],
+    dev_main_folders: Dict[str, str],
+    journal: Optional[MigrationJournal],
+    manifest: Optional[BackupManifest],
+    spec_store: SpecStore,
+    validation_pool: Optional[ProcessPoolExecutor],
+) -> None:
+    """Deploy to the single target ``config.prod``, optionally streaming ``dev_discovery`` into the migration."""
+    prod = startup.environment(config.prod.name)
+    startup.report(startup.names)
+    prod_main_folders, prod_backup_folders = target_folders(prod, journal, dev_main_folders)
+    # A resumed run whose discovery had finished takes its objects from the journal instead of crawling.
+    resumed_objects = journaled_objects({prod.config.name: journal} if journal is not None else {}, spec_store)
 
-    results_deploy = migrator.migrate_objects(objects_to_migrate, dev_main_folders, prod_main_folders, prod_backup_folders)
+    validator = Validator(dev_client, prod.client, config.dev, executor=validation_pool)
+    migrator = Migrator(
+        dev_client, prod.client, config.dev, config.prod, validator, journal=journal, manifest=manifest, spec_store=spec_store
+    )
+
+    if args.stream:
+        if resumed_objects is not None:
+            discovered = iter(resumed_objects)
+        else:
+            discovered = dev_discovery.stream_objects(dev_main_folders, config.dev.stream_queue_size)
+            if journal is not None:
+                discovered = journal.track(discovered, spec_store)
+        results_deploy = MigrationPipeline(migrator).run(
+            discovered, dev_main_folders, prod_main_folders, prod_backup_folders
+        )
+    else:
+        if resumed_objects is not None:
+            objects_to_migrate = resumed_objects
+        else:
+            objects_to_migrate = find_objects()
+            if journal is not None:
+                objects_to_migrate = journal.record_discovery(objects_to_migrate, spec_store)
+
+        for item in objects_to_migrate:
+            print(item["defaultName"])
+
+        results_deploy = migrator.migrate_objects(
+            objects_to_migrate, dev_main_folders, prod_main_folders, prod_backup_folders
+        )
     print(results_deploy)
+    if migrator.unchanged:
+        print(f"Unchanged in prod, backup and update skipped: {migrator.unchanged}")
+    for obj_id, calls in migrator.api_calls.items():
+        print(f"API calls for {calls['path']}/{calls['name']} ({obj_id}): dev {calls['dev']}, prod {calls['prod']}")
+
+
+def main():
+    args = parse_args()
+    config = load_config()
+    if args.resume and not config.dev.journal_file:
+        raise SystemExit("--resume needs MIGRATION_JOURNAL to point at the journal of the run to continue")
+    if args.stream and len(config.targets) > 1:
+        raise SystemExit("--stream deploys to a single target; drop it or list one entry in TARGETS")
+    if args.stream and args.import_bundle:
+        raise SystemExit("--stream overlaps the dev crawl with the deployment; an --import has no crawl to overlap")
+    if args.export and (args.import_bundle or args.resume):
+        raise SystemExit("--export only reads dev; it cannot be combined with --import or --resume")
+    if args.rollback:
+        run_rollback(config, args.rollback)
+        return
+    bundle = None
+    if args.import_bundle:
+        bundle = ReleaseBundle(args.import_bundle)
+        if bundle.tag != config.dev.tag:
+            raise SystemExit(f"{args.import_bundle} holds objects tagged {bundle.tag!r}, not {config.dev.tag!r}")
+        logger.info(f"Importing {len(bundle)} objects exported from {bundle.source}")
+    metrics = None
+    if config.dev.metrics_report or config.dev.metrics_prometheus:
+        metrics = instrumentation.enable()
+
+    cache = None
+    if config.dev.http_cache or any(target.http_cache for target in config.targets):
+        cache = ResponseCache(config.dev.http_cache_dir, config.dev.http_cache_max_mb * 1024 * 1024)
+
+    journals = {} if args.export else open_journals(args, config)
+    manifests = {} if args.export else open_manifests(config, journals)
+    resumed = [journal for journal in journals.values() if journal.resumed]
+    # Dev and every target log in and find their main folders at the same time; resumed runs have theirs journaled.
+    # An export only needs dev and an import everything but dev.
+    known_main_folders = {name for name, journal in journals.items() if journal.resumed}
+    if resumed:
+        known_main_folders.add(config.dev.name)
+    environments = [config.dev] + config.targets
+    if args.export:
+        environments = [config.dev]
+    elif bundle is not None:
+        environments = config.targets
+    startup = Startup(environments, lambda env: connect(env, cache), known_main_folders)
+    spec_store = SpecStore(config.dev.spec_store_dir)
+
+    dev_discovery = dev_snapshot = None
+    if bundle is not None:
+        # Dev reads are answered from the bundle instead of the dev server.
+        dev_client = BundleContentClient(bundle)
+        dev_main_folders = bundle.main_folders
+        find_objects = partial(bundled_objects, bundle, spec_store)
+    else:
+        dev = startup.environment(config.dev.name)
+        dev_main_folders = resumed[0].folders[0] if resumed else dev.main_folders
+        dev_search = LocalNameSearch.from_file(config.dev.search_index_file) if config.dev.search_index_file else None
+        if config.dev.snapshot_file:
+            dev_snapshot = TreeSnapshot(
+                config.dev.snapshot_file,
+                config.dev.base_url,
+                config.dev.tag,
+                config.dev.snapshot_max_age_hours,
+                full_rescan=args.full_rescan,
+            )
+        dev_discovery = DiscoveryService(
+            dev.client,
+            config.dev,
+            search=dev_search,
+            snapshot=dev_snapshot,
+            spec_store=spec_store,
+        )
+        dev_client = dev.client
+        find_objects = partial(dev_discovery.find_tagged_objects, dev_main_folders)
+
+    validation_pool = None
+    if config.dev.validation_processes > 0:
+        validation_pool = ProcessPoolExecutor(max_workers=config.dev.validation_processes)
+    try:
+        if args.export:
+            export(args.export, config, dev_client, find_objects, dev_main_folders)
+        elif len(config.targets) > 1:
+            if bundle is None:
+                startup.report([config.dev.name])
+            results = fan_out(
+                config,
+                startup,
+                dev_client,
+                find_objects,
+                dev_main_folders,
+                journals,
+                manifests,
+                spec_store,
+                validation_pool,
+            )
+            print_target_results(results)
+        else:
+            journal = journals.get(config.prod.name)
+            manifest = manifests.get(config.prod.name)
+            deploy(
+                args,
+                config,
+                startup,
+                dev_client,
+                find_objects,
+                dev_discovery,
+                dev_main_folders,
+                journal,
+                manifest,
+                spec_store,
+                validation_pool,
+            )
+    finally:
+        # Metrics first: they matter most for a run that failed.
+        if metrics is not None:
+            if config.dev.metrics_report:
+                metrics.write_json(config.dev.metrics_report)
+            if config.dev.metrics_prometheus:
+                metrics.write_prometheus(config.dev.metrics_prometheus)
+        for journal in journals.values():
+            journal.close()
+        for manifest in manifests.values():
+            manifest.close()
+            if manifest.entries:
+                print(f"Backups of {manifest.target} recorded in {manifest.path}; undo with --rollback {manifest.path}")
+        if bundle is not None:
+            bundle.close()
+        if cache is not None:
+            cache.flush()
+        spec_store.close()
+        if validation_pool is not None:
+            validation_pool.shutdown()
+    # Only a finished crawl is worth remembering.
+    if dev_snapshot is not None:
+        dev_snapshot.save()
 
 
 if __name__ == "__main__":
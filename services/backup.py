@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+import instrumentation
+from clients.content_client import ContentClient
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+# Fields restored from a backup copy of a report or dashboard.
+RESTORED_FIELDS = "specification,module,defaultDescription"
+
+
+@dataclass
+class BackupEntry:
+    prod_id: str
+    backup_id: str
+    type: str
+    name: str
+    dev_id: Optional[str] = None
+
+
+class BackupManifest:
+    """JSON-lines record of the backups a run made in one target: prod id -> backup copy id.
+
+    The file starts with a header naming the target and gets one line per backup,
+    flushed as it is made, so the manifest is usable for ``rollback`` even when the
+    run dies part-way. It is only created once there is something to record; a
+    resumed run appends to the manifest it started with (see ``reopen``).
+    """
+
+    def __init__(self, path: str, target: str, base_url: str):
+        self.path = path
+        self.target = target
+        self.base_url = base_url
+        self.entries: List[BackupEntry] = []
+        self._file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_run(cls, directory: str, target: str, base_url: str) -> "BackupManifest":
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        return cls(os.path.join(directory, f"{target}-{stamp}.jsonl"), target, base_url)
+
+    @classmethod
+    def reopen(cls, path: str, target: str, base_url: str) -> "BackupManifest":
+        """The manifest of a resumed run, with the entries it already has; empty if it was never written."""
+        if not os.path.exists(path):
+            return cls(path, target, base_url)
+        manifest = cls.load(path)
+        if manifest.target != target or manifest.base_url != base_url:
+            raise ValueError(f"{path} was written for {manifest.target} at {manifest.base_url}, not {target} at {base_url}")
+        return manifest
+
+    @classmethod
+    def load(cls, path: str) -> "BackupManifest":
+        with open(path, encoding="utf-8") as manifest_file:
+            lines = [json.loads(line) for line in manifest_file if line.strip()]
+        if not lines or lines[0].get("version") != MANIFEST_VERSION:
+            raise ValueError(f"{path} is not a backup manifest")
+        manifest = cls(path, lines[0]["target"], lines[0]["base_url"])
+        manifest.entries = [BackupEntry(**line) for line in lines[1:]]
+        return manifest
+
+    def record(self, entry: BackupEntry) -> None:
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+                self._file = open(self.path, "a", encoding="utf-8")
+                if not exists:
+                    header = {"version": MANIFEST_VERSION, "target": self.target, "base_url": self.base_url}
+                    self._file.write(json.dumps(dict(header, created=round(time.time(), 3))) + "\n")
+                logger.info(f"Recording backups of {self.target} in {self.path}")
+            self.entries.append(entry)
+            self._file.write(json.dumps(asdict(entry), ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+@dataclass
+class RollbackResult:
+    restored: List[str] = field(default_factory=list)
+    # Prod object id -> error, for entries that could not be restored.
+    failed: Dict[str, str] = field(default_factory=dict)
+
+
+def restore_object(client: ContentClient, entry: BackupEntry) -> None:
+    """Put the content of ``entry``'s backup copy back onto the prod object it was taken from."""
+    if entry.type == "module":
+        module, prod_module = client.get_module(entry.backup_id), client.get_module(entry.prod_id)
+        # The copy has a label and identifier of its own; the prod module keeps its.
+        module["label"] = prod_module["label"]
+        module["identifier"] = prod_module["identifier"]
+        client.update_module_spec(entry.prod_id, module)
+        fields: Dict[str, Any] = client.get_fields(entry.backup_id, "defaultDescription")
+        client.update_object(entry.prod_id, {"type": entry.type, "defaultDescription": fields.get("defaultDescription")})
+        return
+    fields = client.get_fields(entry.backup_id, RESTORED_FIELDS)
+    payload = {name: fields.get(name) for name in RESTORED_FIELDS.split(",")}
+    client.update_object(entry.prod_id, dict(payload, type=entry.type))
+
+
+def rollback(client: ContentClient, manifest: BackupManifest, workers: int) -> RollbackResult:
+    """Restore every object of ``manifest`` from its backup, ``workers`` at a time.
+
+    An object whose restore fails is reported in the result; the others still run.
+    Objects the release created are not in the manifest and are left as they are.
+    """
+    # The first backup of an object is the state from before the release.
+    entries: Dict[str, BackupEntry] = {}
+    for entry in manifest.entries:
+        entries.setdefault(entry.prod_id, entry)
+    result = RollbackResult()
+    lock = threading.Lock()
+
+    def restore(entry: BackupEntry) -> None:
+        try:
+            with instrumentation.stage("rollback"):
+                restore_object(client, entry)
+        except Exception as exc:
+            logger.error(f"Could not restore {entry.name} ({entry.prod_id}) from {entry.backup_id}: {exc}")
+            with lock:
+                result.failed[entry.prod_id] = str(exc)
+            return
+        logger.info(f"Restored {entry.name} ({entry.prod_id}) from {entry.backup_id}")
+        with lock:
+            result.restored.append(entry.name)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(restore, entries.values()))
+    return result
@@ -0,0 +1,28 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable
+
+# Module fields that the migrator always takes from prod, so they never count as a change.
+MODULE_IGNORED_FIELDS = ("label", "identifier")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.replace("\r\n", "\n").strip()
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def content_hash(payload: Dict[str, Any], ignore: Iterable[str] = ()) -> str:
+    """SHA-256 of a canonical JSON form of ``payload``.
+
+    Keys are sorted, string values have line endings and surrounding whitespace
+    normalized, and top-level keys in ``ignore`` are dropped.
+    """
+    ignored = set(ignore)
+    normalized = _normalize({key: value for key, value in payload.items() if key not in ignored})
+    canonical = json.dumps(normalized, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -1,22 +1,114 @@
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import queue
+import threading
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Union
 
-from clients.content_client import ContentClient
+import requests
+
+import instrumentation
+from clients.content_client import DISCOVERY_FIELDS, SEARCH_FIELDS, ContentClient
+from clients.name_search import LocalNameSearch
 from config import EnvironmentConfig
+from services.snapshot import TreeSnapshot
+from services.spec_store import ObjectRecord, SpecStore
+from services.steps import Step, arun_steps, run_steps
+
+if TYPE_CHECKING:
+    from clients.async_content_client import AsyncContentClient
 
 
 logger = logging.getLogger(__name__)
 
+TAGGED_TYPES = ["report", "dashboard", "module"]
+
+
+class _StreamClosed(Exception):
+    pass
+
+
+class LazyFolders(Mapping):
+    """Folder ids looked up by ``load`` the first time any of them is read.
+
+    Concurrent readers share the one lookup; ``on_load`` is called once with the
+    ids found, before any reader sees them. A failed lookup is retried by the next read.
+    """
+
+    def __init__(self, load: Callable[[], Dict[str, str]], on_load: Optional[Callable[[Dict[str, str]], None]] = None):
+        self._load = load
+        self._on_load = on_load
+        self._folders: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def _resolve(self) -> Dict[str, str]:
+        if self._folders is None:
+            with self._lock:
+                if self._folders is None:
+                    folders = self._load()
+                    if self._on_load is not None:
+                        self._on_load(folders)
+                    self._folders = folders
+        return self._folders
+
+    @property
+    def loaded(self) -> bool:
+        return self._folders is not None
+
+    def __getitem__(self, key: str) -> str:
+        return self._resolve()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._resolve())
+
+    def __len__(self) -> int:
+        return len(self._resolve())
+
 
 class DiscoveryService:
-    def __init__(self, client: ContentClient, config: EnvironmentConfig):
+    """Finds main folders, backup folders and tagged objects.
+
+    Methods prefixed with ``a`` are the awaitable variants for an ``AsyncContentClient``.
+    In "search" discovery mode tagged objects are found through ``search`` (the
+    client's name search unless a ``LocalNameSearch`` is given) instead of a crawl.
+    With a ``snapshot`` the threaded crawl skips folders unchanged since the last run.
+    With a ``spec_store`` tagged objects are returned as compact ``ObjectRecord``s
+    whose payload fields are kept on disk.
+    """
+
+    def __init__(
+        self,
+        client: Union[ContentClient, "AsyncContentClient"],
+        config: EnvironmentConfig,
+        search: Optional[LocalNameSearch] = None,
+        snapshot: Optional[TreeSnapshot] = None,
+        spec_store: Optional[SpecStore] = None,
+    ):
         self.client = client
         self.config = config
+        self.search = search if search is not None else client
+        self.snapshot = snapshot
+        self.spec_store = spec_store
+
+    def _record(self, item: dict) -> Union[dict, ObjectRecord]:
+        if self.spec_store is None:
+            return item
+        return ObjectRecord.from_item(item, self.spec_store)
 
     def find_main_folders(self) -> Dict[str, str]:
+        return run_steps(self._main_folder_steps())
+
+    async def afind_main_folders(self) -> Dict[str, str]:
+        return await arun_steps(self._main_folder_steps())
+
+    def _main_folder_steps(self) -> Step[Dict[str, str]]:
+        folder_ids = yield tuple(
+            partial(self.client.find_folder_id, self.config.root_folder_id, name) for name in self.config.main_folders
+        )
         main_folder_ids = {}
-        for folder_name in self.config.main_folders:
-            folder_id = self.client.find_folder_id(self.config.root_folder_id, folder_name)
+        for folder_name, folder_id in zip(self.config.main_folders, folder_ids):
             if folder_id:
                 main_folder_ids[folder_name] = folder_id
             else:
@@ -24,34 +116,254 @@ class DiscoveryService:
         return main_folder_ids
 
     def find_backup_folders(self) -> Dict[str, str]:
-        admin_id = self.client.find_folder_id(self.config.root_folder_id, self.config.admin_folder_name)
+        return run_steps(self._backup_folder_steps())
+
+    async def afind_backup_folders(self) -> Dict[str, str]:
+        return await arun_steps(self._backup_folder_steps())
+
+    def _backup_folder_steps(self) -> Step[Dict[str, str]]:
+        admin_id = yield partial(self.client.find_folder_id, self.config.root_folder_id, self.config.admin_folder_name)
         if not admin_id:
             raise ValueError(f"Admin folder '{self.config.admin_folder_name}' not found")
-        backup_id = self.client.find_folder_id(admin_id, self.config.backup_folder_name)
+        backup_id = yield partial(self.client.find_folder_id, admin_id, self.config.backup_folder_name)
         if not backup_id:
             raise ValueError(f"Backup folder '{self.config.backup_folder_name}' not found")
+        sub_folders = list(self.config.backup_subfolders.items())
+        sub_ids = yield tuple(partial(self.client.find_folder_id, backup_id, sub_name) for _, sub_name in sub_folders)
         backup_sub_ids: Dict[str, str] = {}
-        for obj_type, sub_name in self.config.backup_subfolders.items():
-            sub_id = self.client.find_folder_id(backup_id, sub_name)
+        for (obj_type, sub_name), sub_id in zip(sub_folders, sub_ids):
             if sub_id:
                 backup_sub_ids[obj_type] = sub_id
             else:
                 logger.warning(f"Backup subfolder '{sub_name}' not found")
         return backup_sub_ids
 
+    def backup_folders_on_demand(self, on_load: Optional[Callable[[Dict[str, str]], None]] = None) -> LazyFolders:
+        """``find_backup_folders`` put off until the first backup needs a folder."""
+
+        def load() -> Dict[str, str]:
+            with instrumentation.stage("discovery"):
+                folders = self.find_backup_folders()
+            logger.info(f"Backup folders found in {self.client.base_url}: {sorted(folders)}")
+            return folders
+
+        return LazyFolders(load, on_load)
+
+    def find_tagged_objects(self, main_folders: Dict[str, str]) -> List[dict]:
+        """Tagged objects under ``main_folders``, each with its ``full_path``."""
+        with instrumentation.stage("discovery"):
+            if self.config.discovery_mode == "search":
+                objects = self._search_tagged(main_folders)
+                if objects is not None:
+                    return objects
+            objects: List[dict] = []
+            for folder_name, folder_id in main_folders.items():
+                objects.extend(self.recursive_search_objects(folder_id, [folder_name]))
+            return objects
+
+    def _search_tagged(self, main_folders: Dict[str, str]) -> Optional[List[dict]]:
+        """Tagged objects from the name search, or None when the search is unavailable."""
+        try:
+            hits = self.search.search_by_name(self.config.tag, TAGGED_TYPES, SEARCH_FIELDS)
+        except (requests.RequestException, ValueError) as exc:
+            logger.warning(f"Name search failed, falling back to crawling: {exc}")
+            return None
+        main_folder_names = {folder_id: folder_name for folder_name, folder_id in main_folders.items()}
+        objects = []
+        for hit in hits:
+            if hit.get("type") not in TAGGED_TYPES or self.config.tag not in (hit.get("defaultName") or ""):
+                continue
+            full_path = self._path_from_ancestors(hit.pop("ancestors", None) or [], main_folder_names)
+            if full_path is None:
+                continue
+            hit["full_path"] = full_path
+            objects.append(self._record(hit))
+        logger.info(f"Name search found {len(objects)} tagged objects under main folders ({len(hits)} hits)")
+        return objects
+
+    @staticmethod
+    def _path_from_ancestors(ancestors: List[dict], main_folder_names: Dict[str, str]) -> Optional[List[str]]:
+        """Folder path below a main folder, as the crawler would record it, or None if the hit is elsewhere."""
+        for position, ancestor in enumerate(ancestors):
+            if ancestor.get("id") in main_folder_names:
+                below = ancestors[position + 1 :]
+                # The crawler only descends into folders, so objects nested in anything else are not discovered.
+                if any(folder.get("type") != "folder" for folder in below):
+                    return None
+                return [main_folder_names[ancestor["id"]]] + [folder["defaultName"] for folder in below]
+        return None
+
     def recursive_search_objects(self, folder_id: str, path: Optional[List[str]] = None) -> List[dict]:
         if path is None:
             path = []
+        listings: Dict[str, List[dict]] = {}
+        self._crawl(folder_id, listings.__setitem__)
         objects_to_migrate: List[dict] = []
-        items = self.client.get_folder_items(folder_id)
-        for item in items:
+        self._collect(folder_id, path, listings, objects_to_migrate)
+        return objects_to_migrate
+
+    async def arecursive_search_objects(self, folder_id: str, path: Optional[List[str]] = None) -> List[dict]:
+        if path is None:
+            path = []
+        listings = await self._acrawl(folder_id)
+        objects_to_migrate: List[dict] = []
+        self._collect(folder_id, path, listings, objects_to_migrate)
+        return objects_to_migrate
+
+    def stream_objects(self, main_folders: Dict[str, str], max_queued: int) -> Iterator[dict]:
+        """Yield tagged objects of all ``main_folders`` while the crawl is still running.
+
+        The crawl runs on a background thread and hands objects over through a queue
+        of at most ``max_queued`` entries, so a slow consumer pauses the crawl instead
+        of letting objects pile up. Objects come in discovery order rather than the
+        depth-first order of ``recursive_search_objects``; ``full_path`` is set as usual.
+        In "search" discovery mode the search hits are yielded instead.
+        """
+        if self.config.discovery_mode == "search":
+            objects = self._search_tagged(main_folders)
+            if objects is not None:
+                yield from objects
+                return
+
+        found: "queue.Queue" = queue.Queue(maxsize=max(1, max_queued))
+        stop = threading.Event()
+
+        def put(entry: tuple) -> None:
+            while not stop.is_set():
+                try:
+                    found.put(entry, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            raise _StreamClosed()
+
+        def produce() -> None:
+            try:
+                with instrumentation.stage("discovery"):
+                    for folder_name, folder_id in main_folders.items():
+                        paths = {folder_id: [folder_name]}
+
+                        def on_listing(parent_id: str, items: List[dict], paths=paths) -> None:
+                            path = paths[parent_id]
+                            for item in items:
+                                if item["type"] == "folder":
+                                    paths.setdefault(item["id"], path + [item["defaultName"]])
+                                else:
+                                    item["full_path"] = path
+                                    put(("object", self._record(item)))
+
+                        self._crawl(folder_id, on_listing)
+                put(("done", None))
+            except _StreamClosed:
+                return
+            except Exception as exc:
+                try:
+                    put(("error", exc))
+                except _StreamClosed:
+                    return
+
+        producer = threading.Thread(target=produce, name="discovery-stream", daemon=True)
+        producer.start()
+        try:
+            while True:
+                kind, value = found.get()
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            stop.set()
+            producer.join()
+
+    def _is_relevant(self, item: dict) -> bool:
+        if item["type"] == "folder":
+            return True
+        return item["type"] in ["report", "dashboard", "module"] and self.config.tag in item["defaultName"]
+
+    def _crawl(self, root_id: str, on_listing: Callable[[str, List[dict]], None]) -> None:
+        """Breadth-first listing of the tree under ``root_id`` with at most ``crawl_workers`` folders in flight.
+
+        Listings are projected to DISCOVERY_FIELDS and only folders and tagged
+        objects are kept; report payloads are loaded later by ``ensure_fields``.
+        ``on_listing`` gets each folder's listing on the calling thread, before any
+        of its subfolders is requested.
+
+        With a snapshot, a subfolder that held neither subfolders nor tagged
+        objects and whose modification time has not moved is answered from it,
+        without a listing request.
+        """
+        seen = {root_id}
+        folder_times: Dict[str, Optional[str]] = {root_id: None}
+        with ThreadPoolExecutor(max_workers=max(1, self.config.crawl_workers)) as pool:
+            pending = {instrumentation.submit(pool, self.client.get_folder_items, root_id, DISCOVERY_FIELDS): root_id}
+            reused: List[tuple] = []
+
+            def schedule(folder_id: str) -> None:
+                listing = None
+                if self.snapshot is not None:
+                    listing = self.snapshot.reuse(folder_id, folder_times[folder_id])
+                if listing is None:
+                    pending[instrumentation.submit(pool, self.client.get_folder_items, folder_id, DISCOVERY_FIELDS)] = folder_id
+                else:
+                    reused.append((folder_id, listing, True))
+
+            def handle(folder_id: str, items: List[dict], from_snapshot: bool = False) -> None:
+                items = [item for item in items if self._is_relevant(item)]
+                if self.snapshot is not None:
+                    self.snapshot.record(folder_id, folder_times[folder_id], items, reused=from_snapshot)
+                on_listing(folder_id, items)
+                for item in items:
+                    if item["type"] == "folder" and item["id"] not in seen:
+                        seen.add(item["id"])
+                        folder_times[item["id"]] = item.get("modificationTime")
+                        schedule(item["id"])
+
+            while pending or reused:
+                while reused:
+                    handle(*reused.pop())
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder_id = pending.pop(future)
+                    handle(folder_id, future.result())
+
+    async def _acrawl(self, root_id: str) -> Dict[str, List[dict]]:
+        listings: Dict[str, List[dict]] = {}
+        seen = {root_id}
+        limit = asyncio.Semaphore(max(1, self.config.crawl_workers))
+
+        async def visit(folder_id: str) -> None:
+            async with limit:
+                items = await self.client.get_folder_items(folder_id, DISCOVERY_FIELDS)
+            items = [item for item in items if self._is_relevant(item)]
+            listings[folder_id] = items
+            children = [item["id"] for item in items if item["type"] == "folder" and item["id"] not in seen]
+            seen.update(children)
+            await asyncio.gather(*(visit(child_id) for child_id in children))
+
+        await visit(root_id)
+        return listings
+
+    def _collect(
+        self,
+        folder_id: str,
+        path: List[str],
+        listings: Dict[str, List[dict]],
+        objects_to_migrate: List[dict],
+    ) -> None:
+        # Replays the crawled listings depth-first so the result order matches a serial walk.
+        for item in listings.get(folder_id, []):
             current_path = path + [item["defaultName"]]
             if item["type"] == "folder":
-                objects_to_migrate.extend(self.recursive_search_objects(item["id"], current_path))
-            elif item["type"] in ["report", "dashboard", "module"] and self.config.tag in item["defaultName"]:
+                self._collect(item["id"], current_path, listings, objects_to_migrate)
+            else:
                 item["full_path"] = current_path[:-1]
-                objects_to_migrate.append(item)
-        return objects_to_migrate
+                objects_to_migrate.append(self._record(item))
 
     def find_object_in_path(self, root_id: str, path: List[str], name: str, obj_type: str) -> Optional[str]:
         return self.client.find_object_in_path(root_id, path, name, obj_type)
+
+    async def afind_object_in_path(self, root_id: str, path: List[str], name: str, obj_type: str) -> Optional[str]:
+        return await self.client.find_object_in_path(root_id, path, name, obj_type)
@@ -0,0 +1,82 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set, Tuple
+
+import instrumentation
+from clients.bundle import MODULE_BLOB, BundleWriter, Location
+from clients.content_client import DISCOVERY_FIELDS, REPORT_PAYLOAD_FIELDS, ContentClient
+from config import EnvironmentConfig
+from services.spec_store import ObjectRecord
+from services.validator import get_module_paths
+
+
+logger = logging.getLogger(__name__)
+
+
+class BundleExport:
+    """Writes the tagged objects of dev, and what deploying them reads from dev, to a release bundle.
+
+    Reports and dashboards get their payload fields, reports and modules their
+    module, and every module a report's search paths name gets its module, content
+    and location, so ``BundleContentClient`` can answer the validator and migrator
+    without dev. Objects are fetched ``migration_workers`` at a time and their
+    payloads written to the bundle as they arrive.
+    """
+
+    def __init__(self, client: ContentClient, config: EnvironmentConfig, writer: BundleWriter):
+        self.client = client
+        self.config = config
+        self.writer = writer
+        self._modules: Set[Tuple[Location, str]] = set()
+        self._modules_lock = threading.Lock()
+
+    def run(self, objects: List[dict], main_folders: Dict[str, str]) -> None:
+        def export(obj: dict) -> None:
+            with instrumentation.stage("export"):
+                self._export_object(obj, main_folders)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.config.migration_workers)) as pool:
+            list(pool.map(export, objects))
+        self.writer.close(
+            [obj["id"] for obj in objects],
+            source=self.client.base_url,
+            tag=self.config.tag,
+            main_folders=main_folders,
+        )
+
+    def _export_object(self, obj: dict, main_folders: Dict[str, str]) -> None:
+        content = {field: obj[field] for field in ObjectRecord.FIELDS if field in obj}
+        blobs = {}
+        if obj["type"] in ("report", "dashboard"):
+            fields = self.client.get_fields(obj["id"], REPORT_PAYLOAD_FIELDS)
+            for name in REPORT_PAYLOAD_FIELDS.split(","):
+                blobs[name] = self.writer.put(fields.get(name))
+        if obj["type"] in ("report", "module"):
+            module = self.client.get_module(obj["id"])
+            blobs[MODULE_BLOB] = self.writer.put(module)
+            if obj["type"] == "report":
+                for paths in get_module_paths(module):
+                    self._export_used_module(paths, main_folders)
+        self.writer.add_object(content, blobs)
+        logger.info(f"Exported {obj['type']} {obj['defaultName']}")
+
+    def _export_used_module(self, paths: List[str], main_folders: Dict[str, str]) -> None:
+        if not paths or paths[-1] == "Empty" or not main_folders.get(paths[0]):
+            return
+        location = (main_folders[paths[0]], tuple(paths[1:-1]), paths[-1], "module")
+        module_id = self.client.find_object_in_path(location[0], list(location[1]), location[2], location[3])
+        if not module_id:
+            logger.warning(f"Module {paths[-1]} not found in DEV at path {paths}")
+            return
+        with self._modules_lock:
+            if (location, module_id) in self._modules:
+                return
+            self._modules.add((location, module_id))
+        self.writer.add_location(location, module_id)
+        module = self.client.get_module(module_id)
+        content = self.client.get_content(module_id, fields=DISCOVERY_FIELDS)
+        self.writer.add_object(
+            {field: content[field] for field in ObjectRecord.FIELDS if field in content},
+            {MODULE_BLOB: self.writer.put(module)},
+        )
@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import instrumentation
+from clients.content_client import ContentClient
+from config import EnvironmentConfig
+from services.backup import BackupManifest
+from services.journal import MigrationJournal
+from services.migrator import Migrator
+from services.spec_store import SpecStore
+from services.startup import Startup, target_folders
+from services.validator import Validator
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TargetResult:
+    """Outcome of deploying to one target; ``error`` is set when the target failed part-way or not at all."""
+
+    name: str
+    migrated: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    api_calls: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+class SharedDevReads:
+    """Dev client wrapper that fetches each module and content projection once for all targets.
+
+    Responses are kept in ``store`` rather than in memory, and every caller gets its
+    own decoded copy, so targets can change what they read without affecting each
+    other. Concurrent reads of the same object share one request. Everything else
+    goes to the wrapped client; a rename drops what was kept for the object.
+    """
+
+    def __init__(self, client: ContentClient, store: SpecStore):
+        self._client = client
+        self._store = store
+        self._kept: Set[Tuple[str, str]] = set()
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def _read(self, obj_id: str, key: str, load: Callable[[], Any]) -> Any:
+        with self._guard:
+            lock = self._locks.setdefault((obj_id, key), threading.Lock())
+        with lock:
+            if (obj_id, key) not in self._kept:
+                self._store.put(obj_id, key, load())
+                self._kept.add((obj_id, key))
+            return self._store.get(obj_id, key)
+
+    def get_module(self, obj_id: str) -> Dict[str, Any]:
+        return self._read(obj_id, "dev:module", lambda: self._client.get_module(obj_id))
+
+    def get_content(self, obj_id: str, fields: str = "*") -> Dict[str, Any]:
+        return self._read(obj_id, f"dev:content:{fields}", lambda: self._client.get_content(obj_id, fields=fields))
+
+    def get_fields(self, obj_id: str, fields: str) -> Dict[str, Any]:
+        data = self.get_content(obj_id, fields=fields)
+        return data.get("fields", data)
+
+    def ensure_fields(self, obj: Dict[str, Any], fields: str) -> Dict[str, Any]:
+        missing = [name for name in fields.split(",") if name not in obj]
+        if missing:
+            values = self.get_fields(obj["id"], ",".join(missing))
+            for name in missing:
+                obj[name] = values.get(name)
+        return obj
+
+    def rename_object(self, obj_id: str, new_name: str, obj_type: str) -> None:
+        self._client.rename_object(obj_id, new_name, obj_type)
+        with self._guard:
+            self._kept = {key for key in self._kept if key[0] != obj_id}
+
+
+@dataclass
+class _TargetRun:
+    result: TargetResult
+    migrator: Optional[Migrator] = None
+
+
+class FanOutDeployment:
+    """Deploys one dev extraction to several target environments at the same time.
+
+    Dev is read once: all targets share ``dev_client`` through ``SharedDevReads``.
+    Each target waits for its own login in ``startup``, then validates, backs up and
+    deploys on its own thread with its own client, optional journal and backup
+    manifest, and a target that fails is reported in its ``TargetResult`` without stopping the
+    others. The dev tag is removed at the end, and only from objects deployed to
+    every target, so a rerun picks up whatever a failed target missed.
+    """
+
+    def __init__(
+        self,
+        dev_client: ContentClient,
+        dev_config: EnvironmentConfig,
+        targets: List[EnvironmentConfig],
+        startup: Startup,
+        spec_store: SpecStore,
+        validation_executor: Optional[Executor] = None,
+        journals: Optional[Dict[str, MigrationJournal]] = None,
+        manifests: Optional[Dict[str, BackupManifest]] = None,
+    ):
+        self.dev = SharedDevReads(dev_client, spec_store)
+        self.spec_store = spec_store
+        self.dev_config = dev_config
+        self.targets = targets
+        self.startup = startup
+        self.validation_executor = validation_executor
+        self.journals = journals or {}
+        self.manifests = manifests or {}
+
+    def run(self, objects: List[dict], dev_main_folders: Dict[str, str]) -> List[TargetResult]:
+        with ThreadPoolExecutor(max_workers=len(self.targets), thread_name_prefix="target") as pool:
+            futures = [
+                instrumentation.submit(pool, self._deploy, target, objects, dev_main_folders) for target in self.targets
+            ]
+            runs = [future.result() for future in futures]
+        self._rename_in_dev(runs)
+        return [run.result for run in runs]
+
+    def _deploy(self, target: EnvironmentConfig, objects: List[dict], dev_main_folders: Dict[str, str]) -> _TargetRun:
+        run = _TargetRun(TargetResult(name=target.name))
+        started = time.perf_counter()
+        try:
+            environment = self.startup.environment(target.name)
+            journal = self.journals.get(target.name)
+            prod_main_folders, prod_backup_folders = target_folders(environment, journal, dev_main_folders)
+            validator = Validator(self.dev, environment.client, self.dev_config, executor=self.validation_executor)
+            run.migrator = Migrator(
+                self.dev,
+                environment.client,
+                self.dev_config,
+                target,
+                validator,
+                journal=journal,
+                defer_dev_renames=True,
+                manifest=self.manifests.get(target.name),
+                spec_store=self.spec_store,
+            )
+            run.result.migrated = run.migrator.migrate_objects(
+                objects, dev_main_folders, prod_main_folders, prod_backup_folders
+            )
+            run.result.unchanged = run.migrator.unchanged
+        except Exception as exc:
+            logger.exception(f"Deployment to {target.name} failed")
+            run.result.error = f"{type(exc).__name__}: {exc}"
+        if run.migrator is not None:
+            run.result.api_calls = run.migrator.api_calls
+        run.result.seconds = time.perf_counter() - started
+        logger.info(f"Target {target.name} finished in {run.result.seconds:.1f}s: {len(run.result.migrated)} migrated")
+        return run
+
+    def _rename_in_dev(self, runs: List[_TargetRun]) -> None:
+        if any(run.migrator is None for run in runs):
+            logger.warning("A target failed before deploying anything; every tagged object stays tagged in dev")
+            return
+        queued = [{entry[0]["id"]: entry for entry in run.migrator.pending_dev_renames()} for run in runs]
+        everywhere = set(queued[0]).intersection(*queued[1:])
+        left = set().union(*queued) - everywhere
+        if left:
+            logger.warning(f"{len(left)} objects were not deployed to every target and stay tagged in dev")
+        runs[0].migrator.finish([queued[0][obj_id] for obj_id in everywhere])
+        for run, entries in zip(runs[1:], queued[1:]):
+            run.migrator.finish([entries[obj_id] for obj_id in everywhere], rename_in_dev=False)
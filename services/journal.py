@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from services.spec_store import ObjectRecord, SpecStore
+
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+
+# Steps of one object, in the order they are reached. REJECTED and DONE end an object.
+VALIDATED = "validated"
+REJECTED = "rejected"
+BACKED_UP = "backed_up"
+CREATED = "created"
+DEPLOYED = "deployed"
+DONE = "done"
+FINAL_STEPS = frozenset({REJECTED, DONE})
+
+# (dev main folders, prod main folders, prod backup folders); the backup folders may still be unknown.
+RunFolders = Tuple[Dict[str, str], Dict[str, str], Optional[Mapping[str, str]]]
+
+
+@dataclass
+class ObjectProgress:
+    """Last journaled step of one dev object and what the run had learned about it by then."""
+
+    step: str
+    prod_id: Optional[str] = None
+    is_new: Optional[bool] = None
+    outcome: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.step in FINAL_STEPS
+
+
+class MigrationJournal:
+    """Append-only JSON-lines record of a migration run, used to resume it after a crash.
+
+    A run starts with a ``run`` line holding the folder ids it resolved (backup
+    folders looked up later get a ``backup_folders`` line of their own) and the
+    ``manifest_path`` of its backup manifest, if it has one, followed by
+    one ``discovered`` line per tagged object, a ``discovery_complete`` line once the
+    crawl finished, and one ``step`` line each time an object passes a step
+    (validated, backed up, created, deployed, done). Every line is flushed when it is
+    written, so a crash loses at most the step that was in flight. Opening with
+    ``resume`` replays the last run in the file; otherwise a new run is appended.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.folders: Optional[RunFolders] = None
+        # Backup manifest of the run; set before ``start_run`` to journal it, read back on resume.
+        self.manifest_path: Optional[str] = None
+        self.discovered: List[dict] = []
+        self.discovery_complete = False
+        self._progress: Dict[str, ObjectProgress] = {}
+        self._lock = threading.Lock()
+        self.resumed = resume and self._load()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self) -> bool:
+        try:
+            with open(self.path, encoding="utf-8") as journal_file:
+                lines = journal_file.readlines()
+        except FileNotFoundError:
+            logger.warning(f"No journal at {self.path}, starting a new run")
+            return False
+        records = []
+        for number, line in enumerate(lines, 1):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Only the line being written when the previous run died can be cut short.
+                logger.warning(f"Skipping unreadable journal line {number} in {self.path}")
+        starts = [index for index, record in enumerate(records) if record.get("event") == "run"]
+        if not starts or records[starts[-1]].get("version") != JOURNAL_VERSION:
+            logger.warning(f"Journal {self.path} holds no resumable run, starting a new run")
+            return False
+        header = records[starts[-1]]
+        self.folders = (header["dev_main_folders"], header["prod_main_folders"], header["prod_backup_folders"])
+        self.manifest_path = header.get("manifest_path")
+        for record in records[starts[-1] + 1:]:
+            self._apply(record)
+        done = sum(1 for progress in self._progress.values() if progress.done)
+        logger.info(
+            f"Resuming run from {self.path}: {len(self.discovered)} objects discovered"
+            f"{'' if self.discovery_complete else ' (discovery unfinished)'}, {done} finished, "
+            f"{len(self._progress) - done} in progress"
+        )
+        return True
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        event = record.get("event")
+        if event == "discovered":
+            self.discovered.append(record["object"])
+        elif event == "discovery_complete":
+            self.discovery_complete = True
+        elif event == "backup_folders" and self.folders is not None:
+            self.folders = (self.folders[0], self.folders[1], record["folders"])
+        elif event == "step":
+            previous = self._progress.get(record["id"])
+            self._progress[record["id"]] = ObjectProgress(
+                step=record["step"],
+                prod_id=record.get("prod_id", previous.prod_id if previous else None),
+                is_new=record.get("is_new", previous.is_new if previous else None),
+                outcome=record.get("outcome"),
+            )
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        record["at"] = round(time.time(), 3)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._apply(record)
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def start_run(self, folders: RunFolders) -> None:
+        """Start a new run; backup folders that are not a plain dict yet are left to ``record_backup_folders``."""
+        dev_main_folders, prod_main_folders, prod_backup_folders = folders
+        if not isinstance(prod_backup_folders, dict):
+            prod_backup_folders = None
+        self.folders = (dev_main_folders, prod_main_folders, prod_backup_folders)
+        self._append(
+            {
+                "event": "run",
+                "version": JOURNAL_VERSION,
+                "dev_main_folders": dev_main_folders,
+                "prod_main_folders": prod_main_folders,
+                "prod_backup_folders": prod_backup_folders,
+                "manifest_path": self.manifest_path,
+            }
+        )
+
+    def record_backup_folders(self, folders: Dict[str, str]) -> None:
+        self._append({"event": "backup_folders", "folders": folders})
+
+    def record_discovery(self, objects: Iterable[dict], store: Optional[SpecStore] = None) -> List[dict]:
+        """Journal a finished discovery; returns it together with objects an earlier attempt of this run found."""
+        return list(self.track(objects, store))
+
+    def track(self, objects: Iterable[dict], store: Optional[SpecStore] = None) -> Iterator[Union[dict, ObjectRecord]]:
+        """Journal objects as discovery yields them.
+
+        Objects journaled by an earlier attempt of this run that the crawl no longer
+        finds (their dev rename was already done) are yielded at the end, so the run
+        still reports them; with a ``store`` they are records in it like the crawled
+        ones, otherwise plain dicts.
+        """
+        known = {obj["id"] for obj in self.discovered}
+        seen = set()
+        for obj in objects:
+            seen.add(obj["id"])
+            if obj["id"] not in known:
+                self._append({"event": "discovered", "object": dict(obj)})
+                known.add(obj["id"])
+            yield obj
+        for obj in list(self.discovered):
+            if obj["id"] not in seen:
+                yield ObjectRecord.from_item(obj, store) if store is not None else dict(obj)
+        if not self.discovery_complete:
+            self._append({"event": "discovery_complete"})
+
+    def progress(self, dev_id: str) -> Optional[ObjectProgress]:
+        with self._lock:
+            return self._progress.get(dev_id)
+
+    def record(self, dev_id: str, step: str, **fields) -> None:
+        self._append(dict({"event": "step", "id": dev_id, "step": step}, **fields))
+
+    def close(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
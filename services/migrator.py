@@ -1,28 +1,98 @@
+import asyncio
 import logging
-from typing import Dict, List
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
-from clients.content_client import ContentClient
+import instrumentation
+from clients.content_client import REPORT_PAYLOAD_FIELDS, ContentClient
 from config import EnvironmentConfig
-from services.validator import Validator
+from services.backup import BackupEntry, BackupManifest
+from services.diff import MODULE_IGNORED_FIELDS, content_hash
+from services.journal import BACKED_UP, CREATED, DEPLOYED, DONE, REJECTED, VALIDATED, MigrationJournal
+from services.path_resolver import ObjectKey, PathResolver, ResolvedPaths
+from services.scheduler import DependencyScheduler
+from services.spec_store import PLANNED_MODULE, PlannedModules, SpecStore
+from services.steps import Step, arun_steps, run_steps
+from services.validator import Validator, get_module_paths
+
+if TYPE_CHECKING:
+    from clients.async_content_client import AsyncContentClient
 
 
 logger = logging.getLogger(__name__)
 
+MIGRATED = "migrated"
+UNCHANGED = "unchanged"
+# Content fields compared against prod before an existing report or dashboard is overwritten.
+COMPARED_FIELDS = "specification,module,defaultDescription"
+
+# (dev object, original name, outcome) of a deployed object whose dev tag is still to be removed.
+DevRename = Tuple[dict, str, str]
+# Key of a module a report uses (see ``Migrator.plan``) and its name as the search path spells it.
+ModuleRef = Tuple[Tuple[str, ...], str]
+
 
 class Migrator:
+    """Deploys tagged dev objects to prod.
+
+    ``migrate_objects`` works with ``ContentClient`` instances and ``amigrate_objects``
+    with ``AsyncContentClient`` instances (the validator must use the same kind).
+    With a ``journal``, objects it records as finished are skipped and half-done
+    objects continue from their last recorded step. After a run ``api_calls`` holds
+    the dev and prod requests each object took, by its dev id, with its name and
+    folder path (dev names repeat across folders). With
+    ``defer_dev_renames`` the dev tag is left in place and the queued renames are
+    left to the caller (see ``FanOutDeployment``).
+
+    Callers that schedule objects themselves (see ``MigrationPipeline``) use the
+    per-object API: ``module_key`` and ``plan`` for the dependencies,
+    ``migrate_one`` for each object, then ``finish`` and ``collect_results``.
+
+    Before a batch is deployed, every prod object it would overwrite is validated
+    and, if it passes, backed up at once (objects identical to dev are only
+    compared); objects waiting on tagged modules of the batch are validated and
+    backed up when their turn comes instead. With a ``manifest`` each backup is
+    recorded there for ``services.backup.rollback``.
+    """
+
     def __init__(
         self,
-        dev_client: ContentClient,
-        prod_client: ContentClient,
+        dev_client: Union[ContentClient, "AsyncContentClient"],
+        prod_client: Union[ContentClient, "AsyncContentClient"],
         dev_config: EnvironmentConfig,
         prod_config: EnvironmentConfig,
         validator: Validator,
+        journal: Optional[MigrationJournal] = None,
+        defer_dev_renames: bool = False,
+        manifest: Optional[BackupManifest] = None,
+        spec_store: Optional[SpecStore] = None,
     ):
         self.dev_client = dev_client
         self.prod_client = prod_client
         self.dev_config = dev_config
         self.prod_config = prod_config
         self.validator = validator
+        self.journal = journal
+        self.defer_dev_renames = defer_dev_renames
+        self.manifest = manifest
+        self.unchanged: List[str] = []
+        self.api_calls: Dict[str, Dict[str, Any]] = {}
+        self._api_calls_lock = threading.Lock()
+        # Deployed objects whose dev tag is still to be removed.
+        self._dev_renames: List[DevRename] = []
+        # Prod paths of the current batch, resolved up front; lookups outside it go to the client.
+        self._resolved = ResolvedPaths()
+        # Dev id -> whether the pre-deploy snapshot backed the prod object up (False: identical to dev).
+        self._snapshot_results: Dict[str, bool] = {}
+        # Dev id -> validation outcome of the objects the snapshot validated before backing them up.
+        self._snapshot_validation: Dict[str, bool] = {}
+        # Report modules read by ``plan``, kept for validation; on disk with a ``spec_store``, apart from other targets'.
+        self._planned = PlannedModules(spec_store, f"{PLANNED_MODULE}:{prod_config.name}")
+        # Dev id -> (dev module, prod module) read for the backup comparison of a changed module, reused by its update.
+        self._compared_modules: Dict[str, Tuple[dict, dict]] = {}
 
     def migrate_objects(
         self,
@@ -31,33 +101,432 @@ class Migrator:
         prod_main_folders: Dict[str, str],
         prod_backup_folders: Dict[str, str],
     ) -> List[str]:
-        migrated = []
         ordered_objects = sorted(objects_to_migrate, key=lambda x: x["type"] != "module")
+        finished, pending = self._split_journaled(ordered_objects)
+        dependencies = self._build_dependencies(pending)
+        self._resolved = PathResolver(self.prod_client, self.prod_config.migration_workers).resolve(
+            self._target_keys(pending, prod_main_folders)
+        )
+        self._snapshot(self._independent(pending, dependencies), dev_main_folders, prod_main_folders, prod_backup_folders)
+
+        tasks = {
+            index: partial(self.migrate_one, obj, dev_main_folders, prod_main_folders, prod_backup_folders)
+            for index, obj in enumerate(pending)
+        }
+        try:
+            outcomes = DependencyScheduler(self.prod_config.migration_workers).run(tasks, dependencies)
+        finally:
+            # Objects deployed before a failure still lose their tag.
+            if not self.defer_dev_renames:
+                self.finish()
+        return self._collect_with_journaled(finished, pending, outcomes)
+
+    async def amigrate_objects(
+        self,
+        objects_to_migrate: List[dict],
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+    ) -> List[str]:
+        ordered_objects = sorted(objects_to_migrate, key=lambda x: x["type"] != "module")
+        finished, pending = self._split_journaled(ordered_objects)
+        dependencies = await self._abuild_dependencies(pending)
+        self._resolved = await PathResolver(self.prod_client, self.prod_config.migration_workers).aresolve(
+            self._target_keys(pending, prod_main_folders)
+        )
+        await self._asnapshot(self._independent(pending, dependencies), dev_main_folders, prod_main_folders, prod_backup_folders)
+
+        tasks = {
+            index: partial(self.amigrate_one, obj, dev_main_folders, prod_main_folders, prod_backup_folders)
+            for index, obj in enumerate(pending)
+        }
+        try:
+            outcomes = await DependencyScheduler(self.prod_config.migration_workers).arun(tasks, dependencies)
+        finally:
+            # Objects deployed before a failure still lose their tag.
+            if not self.defer_dev_renames:
+                await self.afinish()
+        return self._collect_with_journaled(finished, pending, outcomes)
+
+    def module_key(self, obj: dict) -> Tuple[str, ...]:
+        """Key under which reports in ``plan`` refer to the module ``obj``."""
+        return self._module_key(obj.get("full_path", []), obj["defaultName"])
+
+    def plan(self, obj: dict) -> List[ModuleRef]:
+        """Modules the report ``obj`` uses; its dev module is read once and kept for its validation."""
+        module = self.dev_client.get_module(obj["id"])
+        self._planned.put(obj["id"], module)
+        return self._used_module_keys(module)
+
+    async def aplan(self, obj: dict) -> List[ModuleRef]:
+        module = await self.dev_client.get_module(obj["id"])
+        self._planned.put(obj["id"], module)
+        return self._used_module_keys(module)
+
+    def migrate_one(
+        self,
+        obj: dict,
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+    ) -> Optional[str]:
+        """Validate and deploy one object once the modules it uses are done; MIGRATED, UNCHANGED or None.
+
+        Its dev rename is queued for ``finish`` and its requests are added to ``api_calls``.
+        """
+        logger.info(f"Migrating object: {obj['defaultName']} (type: {obj['type']}, id: {obj['id']})")
+        with instrumentation.count_calls() as calls:
+            outcome = self._migrate_object(obj, dev_main_folders, prod_main_folders, prod_backup_folders)
+        self._record_calls(obj, calls)
+        return outcome
+
+    async def amigrate_one(
+        self,
+        obj: dict,
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+    ) -> Optional[str]:
+        logger.info(f"Migrating object: {obj['defaultName']} (type: {obj['type']}, id: {obj['id']})")
+        with instrumentation.count_calls() as calls:
+            outcome = await self._amigrate_object(obj, dev_main_folders, prod_main_folders, prod_backup_folders)
+        self._record_calls(obj, calls)
+        return outcome
+
+    @staticmethod
+    def _independent(pending: List[dict], dependencies: Dict[int, Set[int]]) -> List[dict]:
+        """Pending objects that wait on no tagged module, so validating them does not depend on the batch."""
+        return [obj for index, obj in enumerate(pending) if not dependencies.get(index)]
+
+    def _overwritten(self, pending: List[dict], prod_main_folders: Dict[str, str]) -> List[Tuple[dict, str, str, bool]]:
+        """(dev object, prod id, original name, already validated) of the pending objects that exist in prod and are not backed up yet."""
+        overwritten = []
+        for obj in pending:
+            progress = self.journal.progress(obj["id"]) if self.journal is not None else None
+            if progress is not None:
+                if progress.step == VALIDATED and not progress.is_new and progress.prod_id:
+                    original_name = obj["defaultName"].replace(self.dev_config.tag, "").strip()
+                    overwritten.append((obj, progress.prod_id, original_name, True))
+                continue
+            key = self._target_key(obj, prod_main_folders)
+            prod_id = self._resolved.objects.get(key) if key is not None else None
+            if prod_id:
+                overwritten.append((obj, prod_id, key[2], False))
+        return overwritten
+
+    def _snapshot(
+        self,
+        pending: List[dict],
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+    ) -> None:
+        """Validate and back up every prod object the batch is about to overwrite, in parallel and before any deployment."""
+        overwritten = self._overwritten(pending, prod_main_folders)
+        if not overwritten:
+            return
+
+        def back_up(target: Tuple[dict, str, str, bool]) -> Tuple[str, Optional[bool]]:
+            dev_obj = target[0]
+            with instrumentation.count_calls() as calls, instrumentation.stage("backup"):
+                steps = self._snapshot_steps(*target, self.validator.validate, dev_main_folders, prod_main_folders, prod_backup_folders)
+                changed = run_steps(steps)
+            self._record_calls(dev_obj, calls)
+            return dev_obj["id"], changed
+
+        with ThreadPoolExecutor(max_workers=max(1, self.prod_config.migration_workers)) as pool:
+            self._keep_snapshot(pool.map(back_up, overwritten))
+
+    async def _asnapshot(
+        self,
+        pending: List[dict],
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+    ) -> None:
+        overwritten = self._overwritten(pending, prod_main_folders)
+        if not overwritten:
+            return
+        limit = asyncio.Semaphore(max(1, self.prod_config.migration_workers))
+
+        async def back_up(target: Tuple[dict, str, str, bool]) -> Tuple[str, Optional[bool]]:
+            dev_obj = target[0]
+            async with limit:
+                with instrumentation.count_calls() as calls, instrumentation.stage("backup"):
+                    steps = self._snapshot_steps(*target, self.validator.avalidate, dev_main_folders, prod_main_folders, prod_backup_folders)
+                    changed = await arun_steps(steps)
+            self._record_calls(dev_obj, calls)
+            return dev_obj["id"], changed
+
+        self._keep_snapshot(await asyncio.gather(*(back_up(target) for target in overwritten)))
+
+    def _snapshot_steps(
+        self,
+        dev_obj: dict,
+        prod_obj_id: str,
+        original_name: str,
+        validated: bool,
+        validate: Callable[..., Any],
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+    ) -> Step[Optional[bool]]:
+        """Validate an overwritten object unless the journal has it validated, then back it up; None when it is rejected."""
+        if not validated:
+            with instrumentation.stage("validation"):
+                planned = self._planned.take(dev_obj["id"])
+                is_ok = yield partial(validate, dev_obj, dev_main_folders, prod_main_folders, is_new=False, module=planned)
+            self._snapshot_validation[dev_obj["id"]] = is_ok
+            if not is_ok:
+                return None
+        return (yield from self._back_up_steps(dev_obj, prod_obj_id, original_name, prod_backup_folders))
+
+    def _keep_snapshot(self, results: Iterable[Tuple[str, Optional[bool]]]) -> None:
+        self._snapshot_results = {dev_id: changed for dev_id, changed in results if changed is not None}
+        rejected = sum(not is_ok for is_ok in self._snapshot_validation.values())
+        backed_up = sum(self._snapshot_results.values())
+        unchanged = len(self._snapshot_results) - backed_up
+        logger.info(
+            f"Snapshot before deployment: {backed_up} prod objects backed up, {unchanged} identical to dev, "
+            f"{rejected} rejected by validation"
+        )
+
+    def _back_up_steps(self, dev_obj: dict, prod_obj_id: str, original_name: str, prod_backup_folders: Dict[str, str]) -> Step[bool]:
+        """Copy an existing prod object to its backup folder; False, without a copy, when it matches dev."""
+        obj_type = dev_obj["type"]
+        if obj_type == "module":
+            module, prod_module, prod_fields = yield (
+                partial(self.dev_client.get_module, dev_obj["id"]),
+                partial(self.prod_client.get_module, prod_obj_id),
+                partial(self.prod_client.get_fields, prod_obj_id, "defaultDescription"),
+            )
+            dev_hash, prod_hash = self._module_hashes(module, dev_obj.get("defaultDescription"), prod_module, prod_fields)
+        else:
+            yield partial(self.dev_client.ensure_fields, dev_obj, REPORT_PAYLOAD_FIELDS)
+            prod_fields = yield partial(self.prod_client.get_fields, prod_obj_id, COMPARED_FIELDS)
+            dev_hash, prod_hash = self._content_hashes(dev_obj, prod_fields)
+        if dev_hash == prod_hash:
+            logger.info(f"{original_name} is unchanged in prod (hash {dev_hash[:12]}), skipping backup and update")
+            return False
+        if obj_type == "module":
+            self._compared_modules[dev_obj["id"]] = (module, prod_module)
+
+        backup_dest_id = prod_backup_folders.get(obj_type)
+        if backup_dest_id:
+            backup_id = yield partial(self.prod_client.copy_object, prod_obj_id, backup_dest_id)
+            self._record_backup(dev_obj, prod_obj_id, backup_id, original_name)
+        else:
+            logger.warning(f"No backup folder for {obj_type}")
+        return True
+
+    def _record_backup(self, dev_obj: dict, prod_obj_id: str, backup_id: str, original_name: str) -> None:
+        if self.manifest is not None:
+            self.manifest.record(
+                BackupEntry(prod_id=prod_obj_id, backup_id=backup_id, type=dev_obj["type"], name=original_name, dev_id=dev_obj["id"])
+            )
+
+    def _split_journaled(self, ordered_objects: List[dict]) -> Tuple[List[Tuple[dict, Optional[str]]], List[dict]]:
+        """Objects the journal records as finished, with their outcomes, and the objects still to migrate."""
+        if self.journal is None:
+            return [], ordered_objects
+        finished, pending = [], []
         for obj in ordered_objects:
-            logger.info(f"Migrating object: {obj['defaultName']} (type: {obj['type']}, id: {obj['id']})")
-            if self._migrate_object(obj, dev_main_folders, prod_main_folders, prod_backup_folders):
-                migrated.append(obj["defaultName"])
-        return migrated
+            progress = self.journal.progress(obj["id"])
+            if progress is not None and progress.done:
+                finished.append((obj, progress.outcome))
+            else:
+                pending.append(obj)
+        if finished:
+            logger.info(f"{len(finished)} objects already finished according to the journal, {len(pending)} left")
+        return finished, pending
+
+    def _collect_with_journaled(
+        self,
+        finished: List[Tuple[dict, Optional[str]]],
+        pending: List[dict],
+        outcomes: Dict[int, Optional[str]],
+    ) -> List[str]:
+        objects = [obj for obj, _ in finished] + pending
+        merged = {index: outcome for index, (_, outcome) in enumerate(finished)}
+        merged.update((len(finished) + index, outcome) for index, outcome in outcomes.items())
+        return self.collect_results(objects, merged)
+
+    def _record_calls(self, dev_obj: dict, calls: Counter) -> None:
+        with self._api_calls_lock:
+            entry = self.api_calls.get(dev_obj["id"])
+            if entry is None:
+                entry = self.api_calls[dev_obj["id"]] = {
+                    "name": dev_obj["defaultName"],
+                    "path": "/".join(dev_obj.get("full_path", [])),
+                    "dev": 0,
+                    "prod": 0,
+                }
+            entry["dev"] += calls[self.dev_client.base_url]
+            entry["prod"] += calls[self.prod_client.base_url]
+
+    def _defer_dev_rename(self, dev_obj: dict, original_name: str, outcome: str) -> None:
+        self._dev_renames.append((dev_obj, original_name, outcome))
 
-    def _resolve_folder_path(self, root_id: str, path: List[str]) -> str:
+    def pending_dev_renames(self) -> List[DevRename]:
+        """The deferred dev renames ``finish`` has not handled yet, as (dev object, original name, outcome)."""
+        return list(self._dev_renames)
+
+    def finish(self, renames: Optional[List[DevRename]] = None, rename_in_dev: bool = True) -> None:
+        """Remove the tag from ``renames``, by default every object deployed since the last call, in parallel.
+
+        Each object is journaled as done once its tag is gone. Without ``rename_in_dev``
+        the objects are only journaled, for a target whose dev tags another migrator removes.
+        """
+        if renames is None:
+            renames, self._dev_renames = self._dev_renames, []
+        else:
+            handled = {dev_obj["id"] for dev_obj, _, _ in renames}
+            self._dev_renames = [entry for entry in self._dev_renames if entry[0]["id"] not in handled]
+        if not renames:
+            return
+        if not rename_in_dev:
+            for dev_obj, _, outcome in renames:
+                self._journal(dev_obj, DONE, outcome=outcome)
+            return
+
+        def rename(entry: DevRename) -> None:
+            dev_obj, original_name, outcome = entry
+            with instrumentation.count_calls() as calls, instrumentation.stage("deploy"):
+                self.dev_client.rename_object(dev_obj["id"], original_name, dev_obj["type"])
+            self._record_calls(dev_obj, calls)
+            self._journal(dev_obj, DONE, outcome=outcome)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.dev_config.migration_workers)) as pool:
+            list(pool.map(rename, renames))
+        logger.info(f"Removed the tag from {len(renames)} dev objects")
+
+    async def afinish(self) -> None:
+        renames, self._dev_renames = self._dev_renames, []
+        if not renames:
+            return
+        limit = asyncio.Semaphore(max(1, self.dev_config.migration_workers))
+
+        async def rename(entry: DevRename) -> None:
+            dev_obj, original_name, outcome = entry
+            async with limit:
+                with instrumentation.count_calls() as calls, instrumentation.stage("deploy"):
+                    await self.dev_client.rename_object(dev_obj["id"], original_name, dev_obj["type"])
+            self._record_calls(dev_obj, calls)
+            self._journal(dev_obj, DONE, outcome=outcome)
+
+        await asyncio.gather(*(rename(entry) for entry in renames))
+        logger.info(f"Removed the tag from {len(renames)} dev objects")
+
+    def _journal(self, dev_obj: dict, step: str, **fields) -> None:
+        if self.journal is not None:
+            self.journal.record(dev_obj["id"], step, **fields)
+
+    def collect_results(self, ordered_objects: List[dict], outcomes: Dict[int, Optional[str]]) -> List[str]:
+        """Names of migrated objects; objects found identical in prod go to ``self.unchanged`` instead."""
+        self.unchanged = [obj["defaultName"] for index, obj in enumerate(ordered_objects) if outcomes[index] == UNCHANGED]
+        return [obj["defaultName"] for index, obj in enumerate(ordered_objects) if outcomes[index] == MIGRATED]
+
+    def _module_key(self, path: List[str], name: str) -> Tuple[str, ...]:
+        return tuple(path) + (name.replace(self.dev_config.tag, "").strip(),)
+
+    def _build_dependencies(self, ordered_objects: List[dict]) -> Dict[int, Set[int]]:
+        """Map each object index to the indexes of the tagged modules it must wait for.
+
+        Reports depend on the tagged modules named in their ``useSpec`` search paths.
+        Dashboards keep waiting for every tagged module, since their module
+        references are not resolved here.
+        """
+        if not any(obj["type"] == "module" for obj in ordered_objects):
+            return {}
+        reports = [index for index, obj in enumerate(ordered_objects) if obj["type"] == "report"]
+
+        def used_keys(index: int) -> List[Tuple[str, ...]]:
+            # Reduced to module keys right away so the report modules of a release are never all held at once;
+            # the module itself waits for the report's validation (on disk with a ``spec_store``).
+            return [key for key, _ in self.plan(ordered_objects[index])]
+
+        with ThreadPoolExecutor(max_workers=max(1, self.prod_config.migration_workers)) as pool:
+            report_keys = list(pool.map(used_keys, reports))
+        return self._dependencies_from(ordered_objects, dict(zip(reports, report_keys)))
+
+    async def _abuild_dependencies(self, ordered_objects: List[dict]) -> Dict[int, Set[int]]:
+        if not any(obj["type"] == "module" for obj in ordered_objects):
+            return {}
+        reports = [index for index, obj in enumerate(ordered_objects) if obj["type"] == "report"]
+        limit = asyncio.Semaphore(max(1, self.prod_config.migration_workers))
+
+        async def used_keys(index: int) -> List[Tuple[str, ...]]:
+            async with limit:
+                return [key for key, _ in await self.aplan(ordered_objects[index])]
+
+        report_keys = await asyncio.gather(*(used_keys(index) for index in reports))
+        return self._dependencies_from(ordered_objects, dict(zip(reports, report_keys)))
+
+    def _dependencies_from(
+        self,
+        ordered_objects: List[dict],
+        report_keys: Dict[int, List[Tuple[str, ...]]],
+    ) -> Dict[int, Set[int]]:
+        modules = {
+            self.module_key(obj): index
+            for index, obj in enumerate(ordered_objects)
+            if obj["type"] == "module"
+        }
+        dependencies: Dict[int, Set[int]] = {}
+        for index, keys in report_keys.items():
+            dependencies[index] = {modules[key] for key in keys if key in modules}
+
+        all_modules = set(modules.values())
+        for index, obj in enumerate(ordered_objects):
+            if obj["type"] == "dashboard":
+                dependencies[index] = all_modules
+        return dependencies
+
+    def _used_module_keys(self, module: dict) -> List[ModuleRef]:
+        """Keys of the modules named in a report's ``useSpec`` search paths, with each raw module name."""
+        return [
+            (self._module_key(paths[:-1], paths[-1]), paths[-1])
+            for paths in get_module_paths(module)
+            if paths and paths[-1] != "Empty"
+        ]
+
+    def _target_key(self, dev_obj: dict, prod_main_folders: Dict[str, str]) -> Optional[ObjectKey]:
+        """Prod lookup key of an object, or None where ``_locate`` would refuse it."""
+        full_path = dev_obj.get("full_path", [])
+        if dev_obj["type"] not in ["report", "dashboard", "module"] or not full_path:
+            return None
+        if full_path[0] not in self.dev_config.main_folders or not prod_main_folders.get(full_path[0]):
+            return None
+        original_name = dev_obj["defaultName"].replace(self.dev_config.tag, "").strip()
+        return prod_main_folders[full_path[0]], tuple(full_path[1:]), original_name, dev_obj["type"]
+
+    def _target_keys(self, ordered_objects: List[dict], prod_main_folders: Dict[str, str]) -> List[ObjectKey]:
+        keys = (self._target_key(obj, prod_main_folders) for obj in ordered_objects)
+        return [key for key in keys if key is not None]
+
+    def _find_prod_object_steps(self, root_id: str, path: List[str], name: str, obj_type: str) -> Step[Optional[str]]:
+        key = (root_id, tuple(path), name, obj_type)
+        if key in self._resolved.objects:
+            return self._resolved.objects[key]
+        return (yield partial(self.prod_client.find_object_in_path, root_id, path, name, obj_type))
+
+    def _resolve_folder_steps(self, root_id: str, path: List[str]) -> Step[str]:
+        # A path the resolver found missing is walked again so the error names the missing segment.
+        if resolved_id := self._resolved.folders.get((root_id, tuple(path))):
+            return resolved_id
         current_id = root_id
         for segment in path:
-            current_id = self.prod_client.find_folder_id(current_id, segment)
+            current_id = yield partial(self.prod_client.find_folder_id, current_id, segment)
             if not current_id:
                 raise ValueError(f"Prod path not found for segment {segment} in {path}")
         return current_id
 
-    def _migrate_object(
-        self,
-        dev_obj: dict,
-        dev_main_folders: Dict[str, str],
-        prod_main_folders: Dict[str, str],
-        prod_backup_folders: Dict[str, str],
-    ) -> bool:
+    def _locate(self, dev_obj: dict, prod_main_folders: Dict[str, str]) -> Optional[Tuple[str, List[str], str]]:
+        """Original name, dev full path and prod main folder id of an object, or None if it cannot be deployed."""
         obj_type = dev_obj["type"]
         if obj_type not in ["report", "dashboard", "module"]:
             logger.warning(f"Unsupported type {obj_type} for object {dev_obj['id']}")
-            return False
+            return None
 
         original_name = dev_obj["defaultName"].replace(self.dev_config.tag, "").strip()
         full_path = dev_obj.get("full_path", [])
@@ -65,67 +534,164 @@ class Migrator:
 
         if main_folder_name not in self.dev_config.main_folders:
             logger.warning(f"Object {dev_obj['id']} not in main folders")
-            return False
+            return None
 
         prod_folder_id = prod_main_folders.get(main_folder_name)
         if not prod_folder_id:
             logger.error(f"Prod main folder {main_folder_name} not found")
-            return False
+            return None
+        return original_name, full_path, prod_folder_id
 
-        prod_obj_id = self.prod_client.find_object_in_path(prod_folder_id, full_path[1:], original_name, obj_type)
-        is_new = prod_obj_id is None
+    @staticmethod
+    def _content_hashes(dev_obj: dict, prod_fields: Dict) -> Tuple[str, str]:
+        dev_payload = {field: dev_obj.get(field) for field in COMPARED_FIELDS.split(",")}
+        prod_payload = {field: prod_fields.get(field) for field in COMPARED_FIELDS.split(",")}
+        return content_hash(dev_payload), content_hash(prod_payload)
 
-        is_ok = self.validator.validate(dev_obj, dev_main_folders, prod_main_folders, is_new=is_new)
-        if not is_ok:
-            logger.info(f"Validation failed for {original_name}, skipping migration")
-            return False
+    @staticmethod
+    def _module_hashes(module: dict, dev_description: Optional[str], prod_module: dict, prod_fields: Dict) -> Tuple[str, str]:
+        dev_payload = dict(module, defaultDescription=dev_description)
+        prod_payload = dict(prod_module, defaultDescription=prod_fields.get("defaultDescription"))
+        return (
+            content_hash(dev_payload, ignore=MODULE_IGNORED_FIELDS),
+            content_hash(prod_payload, ignore=MODULE_IGNORED_FIELDS),
+        )
+
+    def _migrate_object(
+        self,
+        dev_obj: dict,
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+    ) -> Optional[str]:
+        """Deploy one object; returns MIGRATED, UNCHANGED or None when it was not deployed.
+
+        The dev rename that removes the tag is queued for ``finish``. With a
+        journal every step is recorded once it is done, and an object a previous
+        attempt left half-done continues after its last recorded step.
+        """
+        steps = self._migrate_steps(dev_obj, dev_main_folders, prod_main_folders, prod_backup_folders, self.validator.validate)
+        return run_steps(steps)
+
+    async def _amigrate_object(
+        self,
+        dev_obj: dict,
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+    ) -> Optional[str]:
+        steps = self._migrate_steps(dev_obj, dev_main_folders, prod_main_folders, prod_backup_folders, self.validator.avalidate)
+        return await arun_steps(steps)
+
+    def _migrate_steps(
+        self,
+        dev_obj: dict,
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+        validate: Callable[..., Any],
+    ) -> Step[Optional[str]]:
+        progress = self.journal.progress(dev_obj["id"]) if self.journal is not None else None
+        if progress is not None and progress.done:
+            return progress.outcome
+        located = self._locate(dev_obj, prod_main_folders)
+        if located is None:
+            return None
+        original_name, full_path, prod_folder_id = located
+        obj_type = dev_obj["type"]
+
+        if progress is None:
+            with instrumentation.stage("resolution"):
+                prod_obj_id = yield from self._find_prod_object_steps(prod_folder_id, full_path[1:], original_name, obj_type)
+            is_new = prod_obj_id is None
+
+            # Objects the snapshot backed up were validated before it.
+            is_ok = self._snapshot_validation.pop(dev_obj["id"], None)
+            if is_ok is None:
+                with instrumentation.stage("validation"):
+                    planned = self._planned.take(dev_obj["id"])
+                    is_ok = yield partial(validate, dev_obj, dev_main_folders, prod_main_folders, is_new=is_new, module=planned)
+            if not is_ok:
+                logger.info(f"Validation failed for {original_name}, skipping migration")
+                self._journal(dev_obj, REJECTED)
+                return None
+            self._journal(dev_obj, VALIDATED, prod_id=prod_obj_id, is_new=is_new)
+            step = VALIDATED
+        else:
+            prod_obj_id, is_new, step = progress.prod_id, progress.is_new, progress.step
+            self._planned.take(dev_obj["id"])
+            logger.info(f"Resuming {original_name} after step {step}")
+            if step == DEPLOYED:
+                outcome = progress.outcome or MIGRATED
+                self._defer_dev_rename(dev_obj, original_name, outcome)
+                return outcome
 
         logger.info(f"Is new object: {is_new}. Prod object ID: {prod_obj_id}")
 
         dev_description = dev_obj.get("defaultDescription")
 
         if obj_type == "report":
+            yield partial(self.dev_client.ensure_fields, dev_obj, REPORT_PAYLOAD_FIELDS)
             dev_spec = dev_obj["specification"]
             dev_module = dev_obj["module"]
         else:
             dev_spec = None
             dev_module = None
+        module = prod_module = None
 
-        if is_new:
-            prod_target_folder_id = self._resolve_folder_path(prod_folder_id, full_path[1:])
-            if obj_type == "module":
-                module = self.dev_client.get_module(dev_obj["id"])
-                module["label"] = original_name
-                self.prod_client.create_module(prod_target_folder_id, module)
-                prod_obj_id = self.prod_client.get_module_id(prod_target_folder_id, original_name)
-                payload = {"type": obj_type, "defaultDescription": dev_description}
-                self.prod_client.update_object(prod_obj_id, payload)
-            else:
-                template_id = (
-                    self.prod_config.template_report_id if obj_type == "report" else self.prod_config.template_dashboard_id
-                )
-                prod_obj_id = self.prod_client.copy_object(template_id, prod_target_folder_id, recursive=False)
-                self.prod_client.rename_object(prod_obj_id, original_name, obj_type)
-                payload = {"type": obj_type, "specification": dev_spec, "module": dev_module, "defaultDescription": dev_description}
-                self.prod_client.update_object(prod_obj_id, payload)
-        else:
-            backup_dest_id = prod_backup_folders.get(obj_type)
-            if backup_dest_id:
-                self.prod_client.copy_object(prod_obj_id, backup_dest_id)
-            else:
-                logger.warning(f"No backup folder for {obj_type}")
-
-            if obj_type == "module":
-                module = self.dev_client.get_module(dev_obj["id"])
-                prod_module = self.prod_client.get_module(prod_obj_id)
-                module["label"] = prod_module["label"]
-                module["identifier"] = prod_module["identifier"]
-                self.prod_client.update_module_spec(prod_obj_id, module)
-                payload = {"type": obj_type, "defaultDescription": dev_description}
-                self.prod_client.update_object(prod_obj_id, payload)
-            else:
-                payload = {"type": obj_type, "specification": dev_spec, "module": dev_module, "defaultDescription": dev_description}
-                self.prod_client.update_object(prod_obj_id, payload)
+        if is_new and step == VALIDATED:
+            with instrumentation.stage("resolution"):
+                prod_target_folder_id = yield from self._resolve_folder_steps(prod_folder_id, full_path[1:])
+            with instrumentation.stage("deploy"):
+                if obj_type == "module":
+                    module = yield partial(self.dev_client.get_module, dev_obj["id"])
+                    module["label"] = original_name
+                    prod_obj_id = yield partial(self.prod_client.create_module, prod_target_folder_id, module)
+                    if not prod_obj_id:
+                        # Only when the server did not return the new module's id.
+                        prod_obj_id = yield partial(self.prod_client.get_module_id, prod_target_folder_id, original_name)
+                else:
+                    template_id = (
+                        self.prod_config.template_report_id if obj_type == "report" else self.prod_config.template_dashboard_id
+                    )
+                    prod_obj_id = yield partial(self.prod_client.copy_object, template_id, prod_target_folder_id, recursive=False)
+            self._journal(dev_obj, CREATED, prod_id=prod_obj_id)
+            step = CREATED
 
-        self.dev_client.rename_object(dev_obj["id"], original_name, obj_type)
-        return True
+        if not is_new and step == VALIDATED:
+            # Objects outside the batch snapshot (streamed ones, or ones it could not resolve) are backed up here.
+            changed = self._snapshot_results.pop(dev_obj["id"], None)
+            if changed is None:
+                with instrumentation.stage("backup"):
+                    changed = yield from self._back_up_steps(dev_obj, prod_obj_id, original_name, prod_backup_folders)
+            if not changed:
+                self._journal(dev_obj, DEPLOYED, outcome=UNCHANGED)
+                self._defer_dev_rename(dev_obj, original_name, UNCHANGED)
+                return UNCHANGED
+            self._journal(dev_obj, BACKED_UP)
+            step = BACKED_UP
+
+        if step in (CREATED, BACKED_UP):
+            with instrumentation.stage("deploy"):
+                if obj_type == "module":
+                    if step == BACKED_UP:
+                        module, prod_module = self._compared_modules.pop(dev_obj["id"], (None, None))
+                        if module is None:
+                            module, prod_module = yield (
+                                partial(self.dev_client.get_module, dev_obj["id"]),
+                                partial(self.prod_client.get_module, prod_obj_id),
+                            )
+                        module["label"] = prod_module["label"]
+                        module["identifier"] = prod_module["identifier"]
+                        yield partial(self.prod_client.update_module_spec, prod_obj_id, module)
+                    payload = {"type": obj_type, "defaultDescription": dev_description}
+                else:
+                    payload = {"type": obj_type, "specification": dev_spec, "module": dev_module, "defaultDescription": dev_description}
+                    if step == CREATED:
+                        # The copy still carries the template's name; the rename rides along with the update.
+                        payload["defaultName"] = original_name
+                yield partial(self.prod_client.update_object, prod_obj_id, payload)
+            self._journal(dev_obj, DEPLOYED, outcome=MIGRATED)
+
+        self._defer_dev_rename(dev_obj, original_name, MIGRATED)
+        return MIGRATED
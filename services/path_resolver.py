@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple, Union
+
+import instrumentation
+from clients.content_client import ContentClient
+from services.steps import Step, arun_steps, run_steps
+
+if TYPE_CHECKING:
+    from clients.async_content_client import AsyncContentClient
+
+
+logger = logging.getLogger(__name__)
+
+# (root folder id, folder names below the root)
+FolderKey = Tuple[str, Tuple[str, ...]]
+# (root folder id, folder names below the root, object name, object type)
+ObjectKey = Tuple[str, Tuple[str, ...], str, str]
+
+
+@dataclass
+class ResolvedPaths:
+    """Prod folder and object ids resolved before migration; None marks a path or object that does not exist."""
+
+    folders: Dict[FolderKey, Optional[str]] = field(default_factory=dict)
+    objects: Dict[ObjectKey, Optional[str]] = field(default_factory=dict)
+
+
+class PathResolver:
+    """Resolves the target paths of a whole migration set as a trie.
+
+    All distinct folder paths are expanded into their prefixes and resolved one
+    depth at a time, with the folders of a level looked up in parallel. Each
+    folder on a shared prefix is therefore listed once, and the objects are looked
+    up once their folders are known.
+    """
+
+    def __init__(self, client: Union[ContentClient, "AsyncContentClient"], max_workers: int):
+        self.client = client
+        self.max_workers = max(1, max_workers)
+
+    @staticmethod
+    def _prefixes(targets: List[ObjectKey]) -> Dict[FolderKey, Optional[str]]:
+        folders: Dict[FolderKey, Optional[str]] = {}
+        for root_id, path, _, _ in targets:
+            for depth in range(len(path) + 1):
+                folders.setdefault((root_id, path[:depth]), root_id if depth == 0 else None)
+        return folders
+
+    @staticmethod
+    def _levels(folders: Dict[FolderKey, Optional[str]]) -> List[List[FolderKey]]:
+        levels: List[List[FolderKey]] = []
+        for key in folders:
+            depth = len(key[1])
+            if depth:
+                while len(levels) < depth:
+                    levels.append([])
+                levels[depth - 1].append(key)
+        return levels
+
+    def resolve(self, targets: Iterable[ObjectKey]) -> ResolvedPaths:
+        with instrumentation.stage("resolution"), ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            resolved = run_steps(self._resolve_steps(targets), pool=pool)
+        self._log(resolved)
+        return resolved
+
+    async def aresolve(self, targets: Iterable[ObjectKey]) -> ResolvedPaths:
+        with instrumentation.stage("resolution"):
+            resolved = await arun_steps(self._resolve_steps(targets), limit=asyncio.Semaphore(self.max_workers))
+        self._log(resolved)
+        return resolved
+
+    def _resolve_steps(self, targets: Iterable[ObjectKey]) -> Step[ResolvedPaths]:
+        targets = list(dict.fromkeys(targets))
+        resolved = ResolvedPaths(folders=self._prefixes(targets))
+        folders = resolved.folders
+        for level in self._levels(folders):
+            # Folders under a missing parent stay None without a lookup.
+            lookups = [key for key in level if folders[(key[0], key[1][:-1])]]
+            found = yield tuple(partial(self.client.find_folder_id, folders[(key[0], key[1][:-1])], key[1][-1]) for key in lookups)
+            folders.update(zip(lookups, found))
+        resolved.objects = dict.fromkeys(targets)
+        lookups = [key for key in targets if folders[(key[0], key[1])]]
+        found = yield tuple(partial(self.client.find_object_in_path, folders[(key[0], key[1])], [], key[2], key[3]) for key in lookups)
+        resolved.objects.update(zip(lookups, found))
+        return resolved
+
+    @staticmethod
+    def _log(resolved: ResolvedPaths) -> None:
+        missing = sum(1 for folder_id in resolved.folders.values() if folder_id is None)
+        existing = sum(1 for obj_id in resolved.objects.values() if obj_id is not None)
+        logger.info(
+            f"Resolved {len(resolved.folders)} prod folder paths ({missing} missing) and "
+            f"{len(resolved.objects)} objects ({existing} already in prod)"
+        )
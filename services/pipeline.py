@@ -0,0 +1,166 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.migrator import Migrator
+
+
+logger = logging.getLogger(__name__)
+
+# Module keys a report waits for, each with whether the raw name carries the tag.
+ModuleDeps = List[Tuple[Tuple[str, ...], bool]]
+
+
+class MigrationPipeline:
+    """Validates and migrates tagged objects while discovery is still producing them.
+
+    Objects are consumed from any iterable, normally ``DiscoveryService.stream_objects``,
+    and run on ``migration_workers`` threads. Modules start as soon as they arrive. A
+    report is held until every module it uses that has already arrived is done and,
+    while the crawl is still running, until no tagged module it names can still turn
+    up. Dashboards wait for the end of the crawl and for all modules, as they do in
+    ``Migrator.migrate_objects``.
+
+    At most ``max_in_flight`` objects (``migration_workers`` plus the dev
+    ``stream_queue_size``) are planned, queued or migrating at once; taking the
+    next object blocks until one of them is done, which in turn holds up the
+    crawl. Objects held for their modules or for the end of the crawl do not count.
+    """
+
+    def __init__(self, migrator: Migrator):
+        self.migrator = migrator
+        self.max_workers = max(1, migrator.prod_config.migration_workers)
+        self.max_in_flight = self.max_workers + max(0, migrator.dev_config.stream_queue_size)
+
+    def run(
+        self,
+        objects: Iterable[dict],
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        prod_backup_folders: Dict[str, str],
+    ) -> List[str]:
+        self._folders = (dev_main_folders, prod_main_folders, prod_backup_folders)
+        self._state = threading.Condition(threading.RLock())
+        self._received: List[dict] = []
+        self._outcomes: Dict[int, Optional[str]] = {}
+        self._modules: Dict[Tuple[str, ...], int] = {}
+        self._module_indexes: List[int] = []
+        # Objects not started yet: index -> module dependencies, None for "every module".
+        self._held: Dict[int, Optional[ModuleDeps]] = {}
+        self._crawl_done = False
+        self._error: Optional[BaseException] = None
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+
+        iterator = iter(objects)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            self._pool = pool
+            try:
+                for obj in iterator:
+                    if not self._accept(obj):
+                        break
+            except Exception as exc:
+                with self._state:
+                    if self._error is None:
+                        self._error = exc
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+
+            with self._state:
+                self._crawl_done = True
+                self._release()
+                while self._error is None and len(self._outcomes) < len(self._received):
+                    self._state.wait()
+
+        self.migrator.finish()
+        if self._error is not None:
+            raise self._error
+        return self.migrator.collect_results(self._received, self._outcomes)
+
+    def _accept(self, obj: dict) -> bool:
+        logger.info(f"Discovered {obj['defaultName']} (type: {obj['type']}) in {obj.get('full_path', [])}")
+        # The slot stays taken until the object's migration is done or it is held.
+        self._slots.acquire()
+        with self._state:
+            if self._error is not None:
+                self._slots.release()
+                return False
+            index = len(self._received)
+            self._received.append(obj)
+            journal = self.migrator.journal
+            progress = journal.progress(obj["id"]) if journal is not None else None
+            if obj["type"] == "module":
+                self._modules.setdefault(self.migrator.module_key(obj), index)
+                self._module_indexes.append(index)
+            if progress is not None and progress.done:
+                # Finished by an earlier attempt of this run; nothing to plan or start.
+                self._outcomes[index] = progress.outcome
+                self._slots.release()
+                self._release()
+            elif obj["type"] == "module":
+                self._start(index)
+            elif obj["type"] == "report":
+                planning = self._pool.submit(self._plan_report, obj)
+                planning.add_done_callback(lambda future: self._planned(index, future))
+            elif obj["type"] == "dashboard":
+                self._held[index] = None
+                self._slots.release()
+                self._release()
+            else:
+                self._start(index)
+        return True
+
+    def _plan_report(self, obj: dict) -> ModuleDeps:
+        tag = self.migrator.dev_config.tag
+        return [(key, tag in name) for key, name in self.migrator.plan(obj)]
+
+    def _planned(self, index: int, future: Future) -> None:
+        with self._state:
+            try:
+                self._held[index] = future.result()
+            except Exception as exc:
+                if self._error is None:
+                    self._error = exc
+            self._slots.release()
+            self._release()
+            self._state.notify_all()
+
+    def _ready(self, deps: Optional[ModuleDeps]) -> bool:
+        if deps is None:
+            return self._crawl_done and all(index in self._outcomes for index in self._module_indexes)
+        for key, tagged in deps:
+            module_index = self._modules.get(key)
+            if module_index is None:
+                if tagged and not self._crawl_done:
+                    return False
+            elif module_index not in self._outcomes:
+                return False
+        return True
+
+    def _release(self) -> None:
+        if self._error is not None:
+            return
+        for index in [index for index, deps in self._held.items() if self._ready(deps)]:
+            # Called under the state lock, so a held object only starts when a slot is free right now;
+            # the next finished object calls this again.
+            if not self._slots.acquire(blocking=False):
+                return
+            del self._held[index]
+            self._start(index)
+
+    def _start(self, index: int) -> None:
+        task = self._pool.submit(self.migrator.migrate_one, self._received[index], *self._folders)
+        task.add_done_callback(lambda future: self._finished(index, future))
+
+    def _finished(self, index: int, future: Future) -> None:
+        with self._state:
+            try:
+                self._outcomes[index] = future.result()
+            except Exception as exc:
+                if self._error is None:
+                    self._error = exc
+            self._slots.release()
+            self._release()
+            self._state.notify_all()
@@ -0,0 +1,169 @@
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+NAMED_SQL_REFERENCE = re.compile(r"sql_")
+
+
+@dataclass
+class ReportContext:
+    """What the rules know about a report besides its specification."""
+
+    name: str
+    is_new: bool
+    sources: List[str]
+
+
+class ReportRule:
+    """A report check fed by the single streaming parse of ``scan_report``.
+
+    ``tags`` lists the local names of elements (in the report namespace) whose
+    text the rule wants; ``on_root`` sees the root tag and attributes as soon as
+    the root opens. ``evaluate`` runs after the pass and returns one warning per
+    violation.
+    """
+
+    tags: tuple = ()
+
+    def on_root(self, tag: str, attrib: Dict[str, str]) -> None:
+        pass
+
+    def on_element(self, tag: str, text: str) -> None:
+        pass
+
+    def evaluate(self, context: ReportContext) -> List[str]:
+        return []
+
+
+class SqlPresenceRule(ReportRule):
+    tags = ("sqlText",)
+
+    def __init__(self):
+        self.query_count = 0
+
+    def on_element(self, tag: str, text: str) -> None:
+        self.query_count += 1
+
+    def evaluate(self, context: ReportContext) -> List[str]:
+        if context.is_new and self.query_count:
+            return [f"Report {context.name} contains SQL; creation not allowed"]
+        return []
+
+
+class NamedSqlRule(ReportRule):
+    tags = ("sqlText",)
+
+    def __init__(self):
+        self.named_references = 0
+
+    def on_element(self, tag: str, text: str) -> None:
+        if NAMED_SQL_REFERENCE.search(text):
+            self.named_references += 1
+
+    def evaluate(self, context: ReportContext) -> List[str]:
+        return [f"Report {context.name} contains references to named SQL queries"] * self.named_references
+
+
+class GreenplumPageRule(ReportRule):
+    def __init__(self):
+        self.root_attrib: Dict[str, str] = {}
+
+    def on_root(self, tag: str, attrib: Dict[str, str]) -> None:
+        self.root_attrib = dict(attrib)
+
+    def evaluate(self, context: ReportContext) -> List[str]:
+        if "Greenplum" not in context.sources:
+            return []
+        warnings = []
+        if self.root_attrib.get("viewPagesAsTabs") != "bottomLeft":
+            warnings.append(
+                f"Report {context.name} has incorrect page view settings for Greenplum source; expected bottomLeft"
+            )
+        if "paginateHTMLOutput" in self.root_attrib:
+            warnings.append(f"Report {context.name} has HTML pagination enabled for Greenplum source")
+        return warnings
+
+
+def default_report_rules() -> List[ReportRule]:
+    """Fresh rule instances, in the order their warnings are reported."""
+    return [SqlPresenceRule(), NamedSqlRule(), GreenplumPageRule()]
+
+
+class _NotAReport(Exception):
+    pass
+
+
+class _RuleTarget:
+    """expat parser target that dispatches element text to rules without building a tree.
+
+    A wanted element gets all the text inside it, its children's included, once it closes.
+    """
+
+    def __init__(self, rules: List[ReportRule]):
+        self.rules = rules
+        self.by_tag: Dict[str, List[ReportRule]] = {}
+        for rule in rules:
+            for tag in rule.tags:
+                self.by_tag.setdefault(tag, []).append(rule)
+        # Fully qualified tag -> (local tag, rules); filled once the root namespace is known.
+        self.wanted: Optional[Dict[str, tuple]] = None
+        # One entry per open element below the root: (local tag, rules, text parts) if wanted, else None.
+        self.open: List[Optional[tuple]] = []
+        # Text parts of the open wanted elements; character data goes to each of them.
+        self.capturing: List[List[str]] = []
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        if self.wanted is None:
+            self.wanted = {}
+            if tag.startswith("{"):
+                if not tag.endswith("report"):
+                    raise _NotAReport()
+                ns_prefix = tag[: tag.index("}") + 1]
+                self.wanted = {ns_prefix + local: (local, rules) for local, rules in self.by_tag.items()}
+            for rule in self.rules:
+                rule.on_root(tag, attrib)
+            return
+        wanted = self.wanted.get(tag)
+        if wanted is None:
+            self.open.append(None)
+            return
+        parts: List[str] = []
+        self.capturing.append(parts)
+        self.open.append((wanted[0], wanted[1], parts))
+
+    def data(self, data: str) -> None:
+        for parts in self.capturing:
+            parts.append(data)
+
+    def end(self, tag: str) -> None:
+        if not self.open:
+            # The root closes.
+            return
+        element = self.open.pop()
+        if element is not None:
+            local_tag, rules, parts = element
+            self.capturing.pop()
+            text = "".join(parts)
+            for rule in rules:
+                rule.on_element(local_tag, text)
+
+    def close(self) -> None:
+        return None
+
+
+def scan_report(spec_xml: str, rules: List[ReportRule]) -> bool:
+    """Feed ``rules`` from one streaming pass over a report specification.
+
+    Returns False, without reading further, when the root element is namespaced
+    but is not a report. Only elements in the root's namespace are dispatched,
+    as the previous ``findall(".//ns:sqlText")`` did. No element tree is built,
+    so memory stays flat for large specifications.
+    """
+    parser = ET.XMLParser(target=_RuleTarget(rules))
+    try:
+        parser.feed(spec_xml.strip())
+        parser.close()
+    except _NotAReport:
+        return False
+    return True
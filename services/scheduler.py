@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Set, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DependencyScheduler:
+    """Runs keyed tasks on a bounded thread pool, starting each one only after its dependencies finished.
+
+    A dependency that is not one of the scheduled tasks is ignored. If a task raises,
+    no further tasks are started and the first error is re-raised once running tasks
+    have completed.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max(1, max_workers)
+
+    @staticmethod
+    def _normalize(tasks: Dict[Hashable, object], dependencies: Dict[Hashable, Iterable[Hashable]]) -> Dict[Hashable, Set[Hashable]]:
+        return {key: {dep for dep in dependencies.get(key, ()) if dep in tasks and dep != key} for key in tasks}
+
+    @staticmethod
+    def _check_acyclic(waiting: Dict[Hashable, Set[Hashable]]) -> None:
+        remaining = {key: set(deps) for key, deps in waiting.items()}
+        while remaining:
+            ready = [key for key, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle between tasks: {sorted(map(str, remaining))}")
+            for key in ready:
+                del remaining[key]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def run(
+        self,
+        tasks: Dict[Hashable, Callable[[], T]],
+        dependencies: Dict[Hashable, Iterable[Hashable]],
+    ) -> Dict[Hashable, T]:
+        waiting = self._normalize(tasks, dependencies)
+        dependents: Dict[Hashable, Set[Hashable]] = {key: set() for key in tasks}
+        for key, deps in waiting.items():
+            for dep in deps:
+                dependents[dep].add(key)
+
+        results: Dict[Hashable, T] = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {}
+
+            def submit_ready() -> None:
+                # Iterating over ``tasks`` keeps start order stable for tasks that become ready together.
+                for key in tasks:
+                    if key in waiting and not waiting[key]:
+                        del waiting[key]
+                        pending[pool.submit(tasks[key])] = key
+
+            submit_ready()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = pending.pop(future)
+                    try:
+                        results[key] = future.result()
+                    except Exception as exc:
+                        if error is None:
+                            error = exc
+                        continue
+                    for dependent in dependents[key]:
+                        if dependent in waiting:
+                            waiting[dependent].discard(key)
+                if error is None:
+                    submit_ready()
+
+        if error is not None:
+            raise error
+        if waiting:
+            raise ValueError(f"Dependency cycle between tasks: {sorted(map(str, waiting))}")
+        return results
+
+    async def arun(
+        self,
+        tasks: Dict[Hashable, Callable[[], Awaitable[T]]],
+        dependencies: Dict[Hashable, Iterable[Hashable]],
+    ) -> Dict[Hashable, T]:
+        """Awaitable variant of ``run``: at most ``max_workers`` task coroutines run at a time."""
+        waiting = self._normalize(tasks, dependencies)
+        self._check_acyclic(waiting)
+        limit = asyncio.Semaphore(self.max_workers)
+        running: Dict[Hashable, asyncio.Task] = {}
+
+        async def run_one(key: Hashable) -> T:
+            for dep in waiting[key]:
+                await running[dep]
+            async with limit:
+                return await tasks[key]()
+
+        for key in tasks:
+            running[key] = asyncio.ensure_future(run_one(key))
+        try:
+            outcomes = await asyncio.gather(*running.values())
+        except Exception:
+            for task in running.values():
+                task.cancel()
+            raise
+        return dict(zip(running, outcomes))
@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+class TreeSnapshot:
+    """Folder tree seen by the previous discovery run, persisted to ``path``.
+
+    The file holds one row per kept node (id, parent id, type, name, modification
+    time) and, per listed folder, its modification time and when it was last
+    actually listed. ``reuse`` answers the listing of a folder without subfolders
+    from the previous run when the folder's modification time has not moved and
+    the listing is younger than ``max_age_hours``; ``record`` collects this run's listings and ``save`` writes
+    them, so folders that disappeared drop out of the next snapshot. A snapshot
+    written for another server or tag is ignored, as is any snapshot when
+    ``full_rescan`` is set.
+    """
+
+    def __init__(self, path: str, base_url: str, tag: str, max_age_hours: float, full_rescan: bool = False):
+        self.path = path
+        self.base_url = base_url
+        self.tag = tag
+        self.max_age_seconds = max_age_hours * 3600
+        # folder id -> [modification time, listed at]
+        self._previous_folders: Dict[str, list] = {}
+        self._previous_children: Dict[str, List[Dict[str, Any]]] = {}
+        self._folders: Dict[str, list] = {}
+        self._reused = 0
+        self._nodes: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        if full_rescan:
+            logger.info("Full rescan requested, discovery snapshot ignored")
+        else:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as snapshot_file:
+                raw = json.load(snapshot_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Discovery snapshot {self.path} is unreadable, rescanning: {exc}")
+            return
+        if raw.get("version") != SNAPSHOT_VERSION or raw.get("base_url") != self.base_url or raw.get("tag") != self.tag:
+            logger.info(f"Discovery snapshot {self.path} was written for another server or tag, rescanning")
+            return
+        self._previous_folders = raw["folders"]
+        for obj_id, parent_id, obj_type, name, modification_time in raw["nodes"]:
+            self._previous_children.setdefault(parent_id, []).append(
+                {"id": obj_id, "type": obj_type, "defaultName": name, "modificationTime": modification_time}
+            )
+        logger.info(f"Discovery snapshot loaded: {len(self._previous_folders)} folders, {len(raw['nodes'])} nodes")
+
+    def reuse(self, folder_id: str, modification_time: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Previous listing of ``folder_id`` if it was listed at ``modification_time``, else None.
+
+        A folder's modification time only moves when its direct children change,
+        and the times of its subfolders come from its listing, so a listing with
+        subfolders is never reused: its stale subfolder times would hide changes
+        further down. Nor is one with tagged objects, whose tag may be gone without
+        the folder's time moving; checking them would cost more than the listing.
+        """
+        previous = self._previous_folders.get(folder_id)
+        if modification_time is None or previous is None or previous[0] != modification_time:
+            return None
+        if time.time() - previous[1] > self.max_age_seconds:
+            return None
+        if self._previous_children.get(folder_id):
+            return None
+        return []
+
+    def record(
+        self,
+        folder_id: str,
+        modification_time: Optional[str],
+        items: List[Dict[str, Any]],
+        reused: bool = False,
+    ) -> None:
+        with self._lock:
+            # A listing answered from the snapshot keeps its age, so it is listed again once too old.
+            if reused:
+                self._reused += 1
+                listed_at = self._previous_folders[folder_id][1]
+            else:
+                listed_at = time.time()
+            self._folders[folder_id] = [modification_time, listed_at]
+            for item in items:
+                self._nodes[item["id"]] = [
+                    item["id"],
+                    folder_id,
+                    item["type"],
+                    item.get("defaultName"),
+                    item.get("modificationTime"),
+                ]
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._folders:
+                # Nothing was crawled this run (e.g. name search discovery); keep the previous snapshot.
+                return
+            raw = {
+                "version": SNAPSHOT_VERSION,
+                "base_url": self.base_url,
+                "tag": self.tag,
+                # Folders without a known modification time (main folders) are always listed again.
+                "folders": {folder_id: entry for folder_id, entry in self._folders.items() if entry[0] is not None},
+                "nodes": list(self._nodes.values()),
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as snapshot_file:
+            json.dump(raw, snapshot_file, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        logger.info(
+            f"Discovery snapshot saved: {len(raw['folders'])} folders, {len(raw['nodes'])} nodes, "
+            f"{self._reused} listings reused this run"
+        )
@@ -0,0 +1,64 @@
+"""Pure-CPU validation steps.
+
+Everything here takes spec text or module JSON and returns findings without
+touching the network or logging, so it can run in a worker process; the
+validator logs the findings in the main process in the order returned.
+"""
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from services.report_rules import ReportRule, default_report_rules, scan_report
+
+
+NAMED_SQL_PATTERN = re.compile(r"sql_[A-Za-z0-9_]+")
+DESCRIPTION_PREFIXES = ("+ñú?ç‘? ?>ø?ç>ç‘Å:", "+ñú?ç‘?-?>ø?ç>ç‘Å:")
+
+# (logging level, message); every finding fails the object.
+Finding = Tuple[int, str]
+
+
+def get_sources(module: Dict) -> List[str]:
+    sources = []
+    for use_spec in module.get("useSpec", []):
+        if (ancestor := use_spec.get("ancestors")) is not None:
+            sources.append(ancestor[0]["defaultName"])
+    return sources
+
+
+def scan_report_spec(spec_xml: str) -> Optional[List[ReportRule]]:
+    """Report rules fed from ``spec_xml``, or None when the root is not a report."""
+    rules = default_report_rules()
+    if not scan_report(spec_xml, rules):
+        return None
+    return rules
+
+
+def module_findings(obj_name: str, obj_description: str, module: Dict, is_new: bool) -> List[Finding]:
+    findings: List[Finding] = []
+
+    if not obj_description.lower().startswith(DESCRIPTION_PREFIXES):
+        findings.append((logging.INFO, f"Module {obj_name} missing required description prefix"))
+
+    for qobj in module["querySubject"]:
+        if "sqlQuery" in qobj:
+            query = qobj["sqlQuery"]["sqlText"]
+            qname = qobj["label"]
+            if NAMED_SQL_PATTERN.search(query):
+                findings.append((logging.WARNING, f"Module {obj_name} uses named SQL in {qname}"))
+
+    if is_new:
+        if not obj_name.isascii():
+            findings.append((logging.WARNING, f"Module {obj_name} contains non-ASCII characters in name"))
+
+        for qobj in module["querySubject"]:
+            if "sqlQuery" in qobj:
+                qname = qobj["label"]
+                findings.append((logging.WARNING, f"Module {obj_name} contains SQL in {qname}"))
+
+        for source in get_sources(module):
+            if source != "Greenplum":
+                findings.append((logging.WARNING, f"Module {obj_name} uses source {source} instead of Greenplum"))
+                break
+
+    return findings
@@ -0,0 +1,170 @@
+import json
+import logging
+import tempfile
+import threading
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from clients.content_client import REPORT_PAYLOAD_FIELDS
+
+
+logger = logging.getLogger(__name__)
+
+# Store field of a report's ``get_module`` payload read while planning a batch (see ``PlannedModules``).
+PLANNED_MODULE = "planned_module"
+# Fields that can run to megabytes per object; records keep them in the SpecStore.
+SPILLED_FIELDS = frozenset(REPORT_PAYLOAD_FIELDS.split(","))
+
+
+class SpecStore:
+    """Temporary file holding the payload fields of discovered objects.
+
+    Values are appended as JSON and found again through an in-memory index of
+    (object id, field) -> (offset, length), so memory holds only the index while
+    the payloads of a whole release sit on disk. A field written again is appended
+    anew. The file is deleted by ``close`` or when the process exits.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._file = tempfile.TemporaryFile(prefix="cognos-specs-", dir=directory)
+        self._index: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def put(self, obj_id: str, field: str, value: Any) -> None:
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._file.seek(self._end)
+            self._file.write(data)
+            self._index[(obj_id, field)] = (self._end, len(data))
+            self._end += len(data)
+
+    def get(self, obj_id: str, field: str) -> Any:
+        with self._lock:
+            offset, length = self._index[(obj_id, field)]
+            self._file.seek(offset)
+            data = self._file.read(length)
+        return json.loads(data)
+
+    def has(self, obj_id: str, field: str) -> bool:
+        return (obj_id, field) in self._index
+
+    def take(self, obj_id: str, field: str) -> Any:
+        """Read and forget a field in one step; None if it was not stored."""
+        with self._lock:
+            span = self._index.pop((obj_id, field), None)
+            if span is None:
+                return None
+            self._file.seek(span[0])
+            data = self._file.read(span[1])
+        return json.loads(data)
+
+    def discard(self, obj_id: str, field: str) -> bool:
+        """Forget a field; its bytes stay in the file until ``close``. False if it was not stored."""
+        with self._lock:
+            return self._index.pop((obj_id, field), None) is not None
+
+    @property
+    def size(self) -> int:
+        return self._end
+
+    def close(self) -> None:
+        logger.info(f"Spec store held {len(self._index)} fields, {self._end / (1024 * 1024):.1f} MB")
+        self._file.close()
+
+
+class ObjectRecord(MutableMapping):
+    """Discovered object reduced to the fields a run keeps in memory.
+
+    Payload fields (SPILLED_FIELDS) are written to ``store`` when set and read back
+    from it on each access. Records keep the dict interface the services use
+    (``obj["id"]``, ``obj.get(...)``, ``field in obj``, ``obj[field] = value``), so
+    they can stand in for listing dicts; iterating yields only the in-memory fields.
+    """
+
+    __slots__ = ("id", "type", "defaultName", "defaultDescription", "modificationTime", "full_path", "_store")
+    FIELDS = ("id", "type", "defaultName", "defaultDescription", "modificationTime", "full_path")
+
+    def __init__(self, store: SpecStore, obj_id: str, **fields):
+        self._store = store
+        self.id = obj_id
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_item(cls, item: Dict[str, Any], store: SpecStore) -> "ObjectRecord":
+        """Record of a listing item; fields other than FIELDS and SPILLED_FIELDS are dropped."""
+        fields = {key: value for key, value in item.items() if key != "id" and (key in cls.FIELDS or key in SPILLED_FIELDS)}
+        return cls(store, item["id"], **fields)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in SPILLED_FIELDS:
+            try:
+                return self._store.get(self.id, key)
+            except KeyError:
+                raise KeyError(key) from None
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in SPILLED_FIELDS:
+            self._store.put(self.id, key, value)
+        elif key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            raise KeyError(f"{key} is not a field of {type(self).__name__}")
+
+    def __delitem__(self, key: str) -> None:
+        if key in SPILLED_FIELDS:
+            if not self._store.discard(self.id, key):
+                raise KeyError(key)
+            return
+        if key not in self.FIELDS or not hasattr(self, key):
+            raise KeyError(key)
+        delattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in SPILLED_FIELDS:
+            return self._store.has(self.id, key)
+        return key in self.FIELDS and hasattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self.FIELDS if hasattr(self, key))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"ObjectRecord({dict(self)!r})"
+
+
+class PlannedModules:
+    """Report modules a migrator read while planning, by dev id, until validation takes them.
+
+    With a ``store`` they wait on disk under ``field``, so migrators sharing one
+    store (one per fan-out target) each keep their own copy; without one they are
+    held in memory. ``take`` hands a module out once.
+    """
+
+    def __init__(self, store: Optional[SpecStore] = None, field: str = PLANNED_MODULE):
+        self._store = store
+        self._field = field
+        self._modules: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def put(self, obj_id: str, module: Dict[str, Any]) -> None:
+        if self._store is not None:
+            self._store.put(obj_id, self._field, module)
+            return
+        with self._lock:
+            self._modules[obj_id] = module
+
+    def take(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        if self._store is not None:
+            return self._store.take(obj_id, self._field)
+        with self._lock:
+            return self._modules.pop(obj_id, None)
@@ -0,0 +1,99 @@
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Collection, Dict, List, Mapping, Optional, Tuple
+
+import instrumentation
+from clients.content_client import ContentClient
+from config import EnvironmentConfig
+from services.discovery import DiscoveryService
+from services.journal import MigrationJournal
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Environment:
+    """An environment ready for the run: logged in and, unless a journal had them, its main folders found."""
+
+    config: EnvironmentConfig
+    client: ContentClient
+    main_folders: Optional[Dict[str, str]]
+    seconds: float
+    # time.perf_counter() when the environment was ready.
+    ready_at: float
+
+
+class Startup:
+    """Logs into every environment of a run and looks up its main folders, all at once.
+
+    Each environment is opened on its own thread as soon as the ``Startup`` is
+    created, so the login and folder round trips of dev and the targets overlap.
+    ``environment`` waits for one of them, which lets a caller go on as soon as the
+    environments it needs are ready; errors surface there, for that environment only.
+    Environments named in ``known_main_folders`` only log in.
+    """
+
+    def __init__(
+        self,
+        configs: List[EnvironmentConfig],
+        connect: Callable[[EnvironmentConfig], ContentClient],
+        known_main_folders: Collection[str] = (),
+    ):
+        self.started = time.perf_counter()
+        self._connect = connect
+        pool = ThreadPoolExecutor(max_workers=max(1, len(configs)), thread_name_prefix="startup")
+        self._futures: Dict[str, Future] = {
+            config.name: instrumentation.submit(pool, self._open, config, config.name not in known_main_folders)
+            for config in configs
+        }
+        # The submitted environments keep opening; the pool just takes no more work.
+        pool.shutdown(wait=False)
+
+    def _open(self, config: EnvironmentConfig, find_main_folders: bool) -> Environment:
+        started = time.perf_counter()
+        with instrumentation.stage("startup"):
+            client = self._connect(config)
+            main_folders = DiscoveryService(client, config).find_main_folders() if find_main_folders else None
+        ready_at = time.perf_counter()
+        logger.info(f"{config.name} ready in {ready_at - started:.2f}s")
+        return Environment(config=config, client=client, main_folders=main_folders, seconds=ready_at - started, ready_at=ready_at)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._futures)
+
+    def environment(self, name: str) -> Environment:
+        return self._futures[name].result()
+
+    def report(self, names: List[str]) -> None:
+        """Log how long startup took until the named environments were all ready."""
+        environments = [self.environment(name) for name in names]
+        timings = ", ".join(f"{environment.config.name} {environment.seconds:.2f}s" for environment in environments)
+        finished = max(environment.ready_at for environment in environments)
+        logger.info(f"Startup finished in {finished - self.started:.2f}s ({timings})")
+
+
+def target_folders(
+    environment: Environment,
+    journal: Optional[MigrationJournal],
+    dev_main_folders: Dict[str, str],
+) -> Tuple[Dict[str, str], Mapping[str, str]]:
+    """Main and backup folders of a target, taken from ``journal`` when it resumed a run.
+
+    Backup folders nobody has looked up yet are found when the first backup needs
+    them and journaled then. Without a resumed run a new one is started in ``journal``.
+    """
+    resumed = journal is not None and journal.resumed
+    if resumed:
+        _, main_folders, backup_folders = journal.folders
+    else:
+        main_folders, backup_folders = environment.main_folders, None
+    if backup_folders is None:
+        on_load = journal.record_backup_folders if journal is not None else None
+        backup_folders = DiscoveryService(environment.client, environment.config).backup_folders_on_demand(on_load)
+    if journal is not None and not resumed:
+        journal.start_run((dev_main_folders, main_folders, backup_folders))
+    return main_folders, backup_folders
@@ -0,0 +1,88 @@
+"""Service logic written once for ``ContentClient`` and ``AsyncContentClient``.
+
+A step is a generator that does no I/O itself. It yields what it needs and is
+sent the result back (or has the exception thrown in at the ``yield``):
+
+* a zero-argument callable, normally ``functools.partial(client.method, ...)``;
+* a tuple of such callables, run concurrently; the step gets a list of results;
+* an ``Offload``, CPU-bound work for the caller's executor.
+
+``run_steps`` drives a step with a ``ContentClient`` and ``arun_steps`` with an
+``AsyncContentClient``, whose methods return awaitables. Steps compose with
+``yield from``, so the sync and async public methods stay thin wrappers.
+"""
+import asyncio
+import inspect
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Callable, Generator, Optional, Tuple, TypeVar
+
+import instrumentation
+
+
+T = TypeVar("T")
+Step = Generator[Any, Any, T]
+
+
+@dataclass(frozen=True)
+class Offload:
+    """``fn(*args)`` to run in the driver's executor, or inline without one."""
+
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...] = ()
+
+
+def run_steps(step: Step[T], pool: Optional[Executor] = None, executor: Optional[Executor] = None) -> T:
+    """Run ``step`` to completion; concurrent calls go to ``pool`` (in order without one), offloads to ``executor``."""
+    send, error = None, None
+    while True:
+        try:
+            request = step.throw(error) if error is not None else step.send(send)
+        except StopIteration as stop:
+            return stop.value
+        send, error = None, None
+        try:
+            if isinstance(request, Offload):
+                send = executor.submit(request.fn, *request.args).result() if executor else request.fn(*request.args)
+            elif isinstance(request, tuple):
+                if pool is None:
+                    send = [call() for call in request]
+                else:
+                    futures = [instrumentation.submit(pool, call) for call in request]
+                    send = [future.result() for future in futures]
+            else:
+                send = request()
+        except Exception as exc:
+            error = exc
+
+
+async def arun_steps(step: Step[T], limit: Optional[asyncio.Semaphore] = None, executor: Optional[Executor] = None) -> T:
+    """Awaitable ``run_steps``: concurrent calls are gathered, at most ``limit`` at a time."""
+
+    async def call(request: Callable[[], Any]) -> Any:
+        if limit is None:
+            result = request()
+            return await result if inspect.isawaitable(result) else result
+        async with limit:
+            result = request()
+            return await result if inspect.isawaitable(result) else result
+
+    send, error = None, None
+    while True:
+        try:
+            request = step.throw(error) if error is not None else step.send(send)
+        except StopIteration as stop:
+            return stop.value
+        send, error = None, None
+        try:
+            if isinstance(request, Offload):
+                if executor is None:
+                    send = request.fn(*request.args)
+                else:
+                    send = await asyncio.get_running_loop().run_in_executor(executor, request.fn, *request.args)
+            elif isinstance(request, tuple):
+                send = list(await asyncio.gather(*(call(each) for each in request)))
+            else:
+                send = await call(request)
+        except Exception as exc:
+            error = exc
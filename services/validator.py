@@ -1,39 +1,67 @@
+import asyncio
 import logging
 import re
-import xml.etree.ElementTree as ET
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
 
-from clients.content_client import ContentClient
+from clients.content_client import DISCOVERY_FIELDS, REPORT_PAYLOAD_FIELDS, ContentClient
 from config import EnvironmentConfig
+from services.report_rules import ReportContext, ReportRule
+from services.spec_checks import Finding, get_sources, module_findings, scan_report_spec
+from services.steps import Offload, Step, arun_steps, run_steps
+
+if TYPE_CHECKING:
+    from clients.async_content_client import AsyncContentClient
 
 
 logger = logging.getLogger(__name__)
 pattern = r"@name='([^']*)'"
+MISSING_DESCRIPTION = "?‘?‘?‘'?"
+
 
+def get_module_paths(module: Dict) -> List[List[str]]:
+    """Folder path and name of every data module referenced in ``useSpec`` search paths."""
+    return [re.findall(pattern, md.get("searchPath")) for md in module.get("useSpec", [])]
 
-def _extract_default_ns(spec_xml: str) -> Optional[str]:
-    if not spec_xml:
-        return None
-    root = ET.fromstring(spec_xml.strip())
-    tag = root.tag
-    if tag.startswith("{") and "}" in tag:
-        return tag[1 : tag.index("}")]
-    return None
 
+@dataclass
+class ModuleCheck:
+    """Outcome of validating a module referenced by a report, shared by all reports using it."""
 
-def _get_sources(module: Dict) -> List[str]:
-    sources = []
-    for use_spec in module.get("useSpec", []):
-        if (ancestor := use_spec.get("ancestors")) is not None:
-            sources.append(ancestor[0]["defaultName"])
-    return sources
+    sources: List[str]
+    is_ok: bool
+    exists_in_prod: bool
 
 
 class Validator:
-    def __init__(self, dev_client: ContentClient, prod_client: ContentClient, config: EnvironmentConfig):
+    """Checks reports and modules before they are deployed.
+
+    ``validate`` works with ``ContentClient`` instances and ``avalidate`` with
+    ``AsyncContentClient`` instances; both drive the same check steps
+    (see ``services.steps``), so they make the same requests and log the same output.
+    With an ``executor`` (normally a process pool) the CPU-bound checks from
+    ``services.spec_checks`` run there while all I/O stays in this process.
+    """
+
+    def __init__(
+        self,
+        dev_client: Union[ContentClient, "AsyncContentClient"],
+        prod_client: Union[ContentClient, "AsyncContentClient"],
+        config: EnvironmentConfig,
+        executor: Optional[Executor] = None,
+    ):
         self.dev_client = dev_client
         self.prod_client = prod_client
         self.config = config
+        self.executor = executor
+        # Per-run memo of modules used by reports, keyed by dev module id.
+        self._module_checks: Dict[str, ModuleCheck] = {}
+        self._module_locks: Dict[str, threading.Lock] = {}
+        self._module_async_locks: Dict[str, asyncio.Lock] = {}
+        self._module_locks_guard = threading.Lock()
 
     def validate(
         self,
@@ -41,39 +69,60 @@ class Validator:
         dev_main_folders: Dict[str, str],
         prod_main_folders: Dict[str, str],
         is_new: bool = True,
+        module: Optional[Dict] = None,
     ) -> bool:
+        """Whether ``obj`` may be deployed; ``module`` is a report's dev module when the caller already read it."""
+        steps = self._validate_steps(obj, dev_main_folders, prod_main_folders, is_new, self._used_module_check, module)
+        return run_steps(steps, executor=self.executor)
+
+    async def avalidate(
+        self,
+        obj: Dict,
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        is_new: bool = True,
+        module: Optional[Dict] = None,
+    ) -> bool:
+        steps = self._validate_steps(obj, dev_main_folders, prod_main_folders, is_new, self._aused_module_check, module)
+        return await arun_steps(steps, executor=self.executor)
+
+    def _validate_steps(
+        self,
+        obj: Dict,
+        dev_main_folders: Dict[str, str],
+        prod_main_folders: Dict[str, str],
+        is_new: bool,
+        used_module_check: Callable[..., Any],
+        module: Optional[Dict] = None,
+    ) -> Step[bool]:
         if obj["type"] == "report":
-            return self._check_report(obj, dev_main_folders, prod_main_folders, is_new)
+            return (yield from self._report_steps(obj, dev_main_folders, prod_main_folders, is_new, used_module_check, module))
         if obj["type"] == "module":
-            return self._check_module(obj, dev_main_folders, prod_main_folders, is_new=is_new)
+            return (yield from self._module_steps(obj, is_new=is_new))
         logger.info(f"Skipping validation for unsupported type {obj['type']}")
         return True
 
-    def _check_report(
+    def _report_steps(
         self,
         obj: Dict,
         dev_main_folders: Dict[str, str],
         prod_main_folders: Dict[str, str],
-        is_new: bool = True,
-    ) -> bool:
+        is_new: bool,
+        used_module_check: Callable[..., Any],
+        module: Optional[Dict] = None,
+    ) -> Step[bool]:
         is_ok = 1
         obj_name = obj["defaultName"].replace(self.config.tag, "").strip()
-        module = self.dev_client.get_module(obj["id"])
+        if module is None:
+            module = yield partial(self.dev_client.get_module, obj["id"])
         logger.info(f"Validating report {obj_name}")
-        spec_xml = obj["specification"]
-        root = ET.fromstring(spec_xml.strip())
-        ns = _extract_default_ns(spec_xml)
-        if ns:
-            ET.register_namespace("", ns)
-            if not root.tag.endswith("report"):
-                return False
-        ns_map = {"ns": ns}
-        queries = root.findall(".//ns:sqlText", ns_map)
+        yield partial(self.dev_client.ensure_fields, obj, REPORT_PAYLOAD_FIELDS)
+        rules = yield Offload(scan_report_spec, (obj["specification"],))
+        if rules is None:
+            return False
 
         sources = []
-        path_module = []
-        for md in module.get("useSpec", []):
-            path_module.append(re.findall(pattern, md.get("searchPath")))
+        path_module = get_module_paths(module)
 
         for paths in path_module:
             if paths and paths[-1] != "Empty":
@@ -81,7 +130,8 @@ class Validator:
                 if not dev_folder_id:
                     logger.warning(f"Main folder {paths[0]} for module {paths[-1]} not found in DEV")
                     continue
-                dev_obj_module_id = self.dev_client.find_object_in_path(
+                dev_obj_module_id = yield partial(
+                    self.dev_client.find_object_in_path,
                     dev_folder_id,
                     paths[1:-1],
                     paths[-1],
@@ -90,39 +140,71 @@ class Validator:
                 if not dev_obj_module_id:
                     logger.warning(f"Module {paths[-1]} not found in DEV at path {paths}")
                     continue
-                source_module = self.dev_client.get_module(dev_obj_module_id)
-                sources.extend(_get_sources(source_module))
-                module_content = self.dev_client.get_content(dev_obj_module_id)
                 logger.info(f"Validating module {paths[-1]} used in report {obj_name}")
-                is_ok = self._check_module(
-                    module_content,
-                    dev_main_folders,
-                    prod_main_folders,
-                    paths=paths,
-                    is_new=True,
-                    is_from_report=True,
-                )
-
-        if is_new and queries:
-            logger.warning(f"Report {obj_name} contains SQL; creation not allowed")
-            is_ok = 0
-
-        for elem in queries:
-            sql_text = elem.text
-            sql_text = sql_text.replace("\n", " ").replace("\t", " ")
-            sql_text = " ".join(sql_text.split())
-            if "sql_" in sql_text:
-                logger.warning(f"Report {obj_name} contains references to named SQL queries")
-                is_ok = 0
-
-        if "Greenplum" in sources:
-            if root.attrib.get("viewPagesAsTabs") != "bottomLeft":
-                logger.warning(
-                    f"Report {obj_name} has incorrect page view settings for Greenplum source; expected bottomLeft"
-                )
-                is_ok = 0
-            if "paginateHTMLOutput" in root.attrib:
-                logger.warning(f"Report {obj_name} has HTML pagination enabled for Greenplum source")
+                check = yield partial(used_module_check, dev_obj_module_id, paths, prod_main_folders)
+                sources.extend(check.sources)
+                is_ok = check.is_ok
+
+        return self._evaluate_report(obj, obj_name, rules, sources, is_new, is_ok)
+
+    def _used_module_check(self, module_id: str, paths: List[str], prod_main_folders: Dict[str, str]) -> ModuleCheck:
+        with self._module_locks_guard:
+            lock = self._module_locks.setdefault(module_id, threading.Lock())
+        with lock:
+            check = self._module_checks.get(module_id)
+            if check is not None:
+                self._log_reused_check(paths[-1], check)
+                return check
+            check = run_steps(self._used_module_steps(module_id, paths, prod_main_folders), executor=self.executor)
+            self._module_checks[module_id] = check
+            return check
+
+    async def _aused_module_check(self, module_id: str, paths: List[str], prod_main_folders: Dict[str, str]) -> ModuleCheck:
+        lock = self._module_async_locks.setdefault(module_id, asyncio.Lock())
+        async with lock:
+            check = self._module_checks.get(module_id)
+            if check is not None:
+                self._log_reused_check(paths[-1], check)
+                return check
+            check = await arun_steps(self._used_module_steps(module_id, paths, prod_main_folders), executor=self.executor)
+            self._module_checks[module_id] = check
+            return check
+
+    def _used_module_steps(self, module_id: str, paths: List[str], prod_main_folders: Dict[str, str]) -> Step[ModuleCheck]:
+        source_module, module_content = yield (
+            partial(self.dev_client.get_module, module_id),
+            partial(self.dev_client.get_content, module_id, fields=DISCOVERY_FIELDS),
+        )
+        module_name = module_content["defaultName"].replace(self.config.tag, "").strip()
+        prod_module_id = yield partial(
+            self.prod_client.find_object_in_path,
+            prod_main_folders.get(paths[0]),
+            paths[1:-1],
+            module_name,
+            "module",
+        )
+        exists_in_prod = prod_module_id is not None
+        is_ok = yield from self._module_steps(module_content, is_new=not exists_in_prod, module=source_module)
+        return ModuleCheck(sources=get_sources(source_module), is_ok=is_ok, exists_in_prod=exists_in_prod)
+
+    @staticmethod
+    def _log_reused_check(module_name: str, check: ModuleCheck) -> None:
+        outcome = "passed" if check.is_ok else "failed"
+        logger.info(f"Module {module_name} already validated in this run ({outcome}, exists in prod: {check.exists_in_prod})")
+
+    def _evaluate_report(
+        self,
+        obj: Dict,
+        obj_name: str,
+        rules: List[ReportRule],
+        sources: List[str],
+        is_new: bool,
+        is_ok: int,
+    ) -> bool:
+        context = ReportContext(name=obj_name, is_new=is_new, sources=sources)
+        for rule in rules:
+            for warning in rule.evaluate(context):
+                logger.warning(warning)
                 is_ok = 0
 
         if is_ok:
@@ -133,64 +215,20 @@ class Validator:
             logger.info(f"Report {obj['defaultName']} failed validation")
         return bool(is_ok)
 
-    def _check_module(
-        self,
-        obj: Dict,
-        dev_main_folders: Dict[str, str],
-        prod_main_folders: Dict[str, str],
-        paths: List[str] = None,
-        is_new: bool = True,
-        is_from_report: bool = False,
-    ) -> bool:
+    def _module_steps(self, obj: Dict, is_new: bool = True, module: Optional[Dict] = None) -> Step[bool]:
         obj_name = obj["defaultName"].replace(self.config.tag, "").strip()
-        obj_description = obj["defaultDescription"] if obj["defaultDescription"] is not None else "?‘?‘?‘'?"
-
-        if paths is None:
-            paths = []
-        if is_from_report:
-            prod_folder_id = prod_main_folders.get(paths[0])
-            prod_obj_module_id = self.prod_client.find_object_in_path(
-                prod_folder_id,
-                paths[1:-1],
-                obj_name,
-                "module",
-            )
-            is_new = 0 if prod_obj_module_id is not None else 1
+        obj_description = obj["defaultDescription"] if obj["defaultDescription"] is not None else MISSING_DESCRIPTION
 
         logger.info(f"Validating module {obj_name}")
-        module = self.dev_client.get_module(obj["id"])
-        is_ok = 1
-
-        if not obj_description.lower().startswith(("+ñú?ç‘? ?>ø?ç>ç‘Å:", "+ñú?ç‘?-?>ø?ç>ç‘Å:")):
-            logger.info(f"Module {obj_name} missing required description prefix")
-            is_ok = 0
-
-        for qobj in module["querySubject"]:
-            if "sqlQuery" in qobj:
-                query = qobj["sqlQuery"]["sqlText"]
-                qname = qobj["label"]
-                matches = re.findall(r"sql_[A-Za-z0-9_]+", query)
-                if matches:
-                    logger.warning(f"Module {obj_name} uses named SQL in {qname}")
-                    is_ok = 0
-
-        if is_new:
-            if not obj_name.isascii():
-                is_ok = 0
-                logger.warning(f"Module {obj_name} contains non-ASCII characters in name")
-
-            for qobj in module["querySubject"]:
-                if "sqlQuery" in qobj:
-                    qname = qobj["label"]
-                    logger.warning(f"Module {obj_name} contains SQL in {qname}")
-                    is_ok = 0
-
-            sources = _get_sources(module)
-            for source in sources:
-                if source != "Greenplum":
-                    logger.warning(f"Module {obj_name} uses source {source} instead of Greenplum")
-                    is_ok = 0
-                    break
+        if module is None:
+            module = yield partial(self.dev_client.get_module, obj["id"])
+        findings = yield Offload(module_findings, (obj_name, obj_description, module, is_new))
+        return self._module_outcome(obj, findings)
+
+    def _module_outcome(self, obj: Dict, findings: List[Finding]) -> bool:
+        for level, message in findings:
+            logger.log(level, message)
+        is_ok = not findings
 
         if is_ok:
             logger.info(f"==========================================")
@@ -1,20 +1,31 @@
 import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Iterator, Optional
 
 import requests
 
+import instrumentation
+from clients.transport import RetryPolicy, mount_transport
 from config import EnvironmentConfig
 
 
 logger = logging.getLogger(__name__)
 
+AUTH_HEADER = "IBM-BA-Authorization"
+# 441 is what Cognos answers once a CAM passport has expired.
+AUTH_FAILURE_STATUSES = frozenset({401, 403, 441})
+
 
 @dataclass
 class SessionData:
     headers: Dict[str, str]
     cookies: Dict[str, str]
     session: requests.Session
+    factory: Optional["SessionFactory"] = None
 
 
 class SessionFactory:
@@ -25,6 +36,15 @@ class SessionFactory:
         session = requests.Session()
         session.verify = self.config.verify_ssl
         session.trust_env = False
+        mount_transport(session, RetryPolicy(self.config.http_retries, self.config.http_backoff), self.config.http_pool_size)
+        session_data = SessionData(headers={}, cookies={}, session=session, factory=self)
+        self.refresh(session_data)
+        logger.info(f"Session created for {self.config.base_url}")
+        return session_data
+
+    def refresh(self, session_data: SessionData) -> None:
+        """Run the /session handshake on ``session_data.session`` and store the new passport in place."""
+        session = session_data.session
         session_endpoint = f"{self.config.base_url}/session"
         payload = {
             "parameters": [
@@ -33,15 +53,79 @@ class SessionFactory:
                 {"name": "CAMPassword", "value": self.config.password},
             ]
         }
+        instrumentation.note_call(self.config.base_url)
+        started = time.perf_counter()
         response = session.put(session_endpoint, json=payload, verify=self.config.verify_ssl, timeout=(10, 60))
+        metrics = instrumentation.active()
+        if metrics is not None:
+            metrics.record_request(
+                self.config.base_url,
+                "PUT",
+                session_endpoint,
+                time.perf_counter() - started,
+                len(response.content),
+                len(response.request.body or b""),
+            )
         response.raise_for_status()
         cookies = response.cookies
         cam_passport = cookies.get("cam_passport")
         xsrf_token = cookies.get("XSRF-TOKEN")
-        headers = {
+        session_data.headers = {
             "Content-Type": "application/json",
-            "IBM-BA-Authorization": f"CAM {cam_passport}",
+            AUTH_HEADER: f"CAM {cam_passport}",
             "X-XSRF-Token": xsrf_token,
         }
-        logger.info(f"Session created for {self.config.base_url}")
-        return SessionData(headers=headers, cookies=cookies, session=session)
+        session_data.cookies = cookies
+
+
+class SessionPool:
+    """Up to ``size`` authenticated sessions of one environment.
+
+    ``lease`` hands a session to one request at a time, logging in a new one
+    while fewer than ``size`` exist, so concurrent workers do not share one
+    ``requests.Session``. ``reauthenticate`` re-runs the handshake of a session
+    whose passport the server rejected.
+    """
+
+    def __init__(self, first: SessionData, size: int = 1):
+        self.size = max(1, size)
+        self.verify = first.session.verify
+        self._factory = first.factory
+        self._idle: "queue.Queue[SessionData]" = queue.Queue()
+        self._idle.put(first)
+        self._created = 1
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self) -> Iterator[SessionData]:
+        session_data = self._take()
+        try:
+            yield session_data
+        finally:
+            self._idle.put(session_data)
+
+    def _take(self) -> SessionData:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_grow = self._factory is not None and self._created < self.size
+            if can_grow:
+                self._created += 1
+        if can_grow:
+            try:
+                return self._factory.create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def reauthenticate(self, session_data: SessionData) -> bool:
+        """Log ``session_data`` in again; False when it was not created by a factory."""
+        if session_data.factory is None:
+            return False
+        logger.info(f"Session for {session_data.factory.config.base_url} was rejected, logging in again")
+        session_data.factory.refresh(session_data)
+        return True
@@ -0,0 +1,50 @@
+import sys
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable, List
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.mock_server import MockContentServer, MockContentStore  # noqa: E402
+from benchmarks.run import environment_config  # noqa: E402
+from benchmarks.tree_gen import add_admin_tree  # noqa: E402
+from config import EnvironmentConfig  # noqa: E402
+
+
+@pytest.fixture
+def serve() -> Callable[[MockContentStore], str]:
+    """Starts a mock server for a store and returns its base URL; every server is stopped after the test."""
+    servers: List[MockContentServer] = []
+
+    def start(store: MockContentStore, latency: float = 0.0) -> str:
+        server = MockContentServer(store, latency=latency)
+        servers.append(server)
+        return server.start()
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def make_config() -> Callable[..., EnvironmentConfig]:
+    """Environment config for a mock server with main folder "Main"; keyword arguments override fields."""
+
+    def build(base_url: str, **overrides) -> EnvironmentConfig:
+        return replace(environment_config(base_url, ["Main"], workers=4), **overrides)
+
+    return build
+
+
+@pytest.fixture
+def new_store() -> Callable[[], MockContentStore]:
+    """Empty store with the admin, backup and template folders the services expect."""
+
+    def build() -> MockContentStore:
+        store = MockContentStore()
+        add_admin_tree(store)
+        return store
+
+    return build
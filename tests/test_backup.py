@@ -0,0 +1,74 @@
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from benchmarks.run import connect
+from benchmarks.tree_gen import module_json, report_spec
+from config import DEFAULT_TAG
+from services.backup import BackupEntry, BackupManifest, rollback
+from services.discovery import DiscoveryService
+from services.migrator import Migrator
+from services.validator import Validator
+
+
+def test_rollback_restores_what_a_release_overwrote(serve, make_config, new_store, tmp_path):
+    dev_store, prod_store = new_store(), new_store()
+    dev_main = dev_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    prod_main = prod_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    for name in ("Revenue", "Margin"):
+        dev_store.add(dev_main, f"{name} {DEFAULT_TAG}", "report", specification=report_spec(), module="")
+        prod_store.add(prod_main, name, "report", specification="", module="", defaultDescription="Before the release")
+    dev, prod = make_config(serve(dev_store)), make_config(serve(prod_store))
+    dev_client, prod_client = connect(dev), connect(prod)
+    dev_discovery, prod_discovery = DiscoveryService(dev_client, dev), DiscoveryService(prod_client, prod)
+    dev_folders, prod_folders = dev_discovery.find_main_folders(), prod_discovery.find_main_folders()
+    manifest = BackupManifest(str(tmp_path / "prod.jsonl"), "prod", prod.base_url)
+    migrator = Migrator(dev_client, prod_client, dev, prod, Validator(dev_client, prod_client, dev), manifest=manifest)
+    migrator.migrate_objects(
+        dev_discovery.find_tagged_objects(dev_folders), dev_folders, prod_folders, prod_discovery.find_backup_folders()
+    )
+    manifest.close()
+    released = {prod_store.nodes[child]["defaultName"]: child for child in prod_store.children[prod_main]}
+    assert all(prod_store.nodes[prod_id]["specification"] == report_spec() for prod_id in released.values())
+
+    loaded = BackupManifest.load(manifest.path)
+    # A backup copy that has gone missing fails alone, reported by the prod object it belongs to.
+    loaded.entries.append(BackupEntry(prod_id="missing", backup_id="missing", type="report", name="Revenue"))
+    result = rollback(prod_client, loaded, workers=2)
+
+    assert sorted(result.restored) == ["Margin", "Revenue"]
+    assert list(result.failed) == ["missing"]
+    for prod_id in released.values():
+        assert prod_store.nodes[prod_id]["specification"] == ""
+        assert prod_store.nodes[prod_id]["defaultDescription"] == "Before the release"
+
+
+def test_reopened_manifest_keeps_its_entries_and_header(tmp_path):
+    path = str(tmp_path / "prod.jsonl")
+    manifest = BackupManifest(path, "prod", "http://prod")
+    manifest.record(BackupEntry(prod_id="p1", backup_id="b1", type="report", name="Revenue"))
+    manifest.close()
+
+    resumed = BackupManifest.reopen(path, "prod", "http://prod")
+    resumed.record(BackupEntry(prod_id="p2", backup_id="b2", type="report", name="Margin"))
+    resumed.close()
+
+    assert [entry.prod_id for entry in BackupManifest.load(path).entries] == ["p1", "p2"]
+    assert BackupManifest.reopen(str(tmp_path / "never-written.jsonl"), "prod", "http://prod").entries == []
+
+
+def test_rollback_restores_a_module_without_taking_the_copys_name(serve, make_config, new_store, tmp_path):
+    store = new_store()
+    main_id = store.add(ROOT_FOLDER_ID, "Main", "folder")
+    before = module_json("Sales")
+    released = dict(module_json("Sales"), querySubject=[])
+    prod_id = store.add(main_id, "Sales", "module", defaultDescription="Released", moduleJson=released)
+    # Servers label a copy on their own, so the backup's module JSON names the copy, not the prod module.
+    copy = dict(before, label="Copy of Sales", identifier="Copy_of_Sales")
+    backup_id = store.add(main_id, "Copy of Sales", "module", defaultDescription="Before the release", moduleJson=copy)
+    prod = make_config(serve(store))
+    manifest = BackupManifest(str(tmp_path / "prod.jsonl"), "prod", prod.base_url)
+    manifest.entries.append(BackupEntry(prod_id=prod_id, backup_id=backup_id, type="module", name="Sales"))
+
+    result = rollback(connect(prod), manifest, workers=1)
+
+    assert result.restored == ["Sales"] and not result.failed
+    assert store.nodes[prod_id]["moduleJson"] == before
+    assert store.nodes[prod_id]["defaultDescription"] == "Before the release"
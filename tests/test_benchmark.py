@@ -0,0 +1,18 @@
+from benchmarks.mock_server import MockContentServer
+from benchmarks.run import Benchmark, environment_config
+from benchmarks.tree_gen import TreeShape, generate
+from config import DEFAULT_TAG
+
+
+def test_benchmark_phases_migrate_every_valid_tagged_object():
+    shape = TreeShape(depth=2, fanout=2, objects_per_folder=4, tagged_every=3)
+    trees = generate(shape, DEFAULT_TAG)
+    with MockContentServer(trees.dev) as dev_server, MockContentServer(trees.prod) as prod_server:
+        dev = environment_config(dev_server.base_url, list(shape.main_folders), workers=4)
+        prod = environment_config(prod_server.base_url, list(shape.main_folders), workers=4)
+        discovery, validation, migration = Benchmark(trees.dev, trees.prod, dev, prod).run()
+
+    assert discovery.outcome["tagged"] == sum(trees.tagged.values())
+    assert migration.outcome["migrated"] + migration.outcome["unchanged"] == validation.outcome["passed"]
+    remaining = [node for node in trees.dev.nodes.values() if DEFAULT_TAG in (node.get("defaultName") or "")]
+    assert len(remaining) == validation.outcome["failed"]
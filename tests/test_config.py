@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+from config import load_config
+
+
+def test_targets_cannot_take_the_dev_name(monkeypatch):
+    monkeypatch.setenv("TARGETS", json.dumps([{"name": "eu"}, {"name": "dev"}]))
+
+    with pytest.raises(ValueError, match="dev environment"):
+        load_config()
+
+
+def test_targets_override_prod_settings(monkeypatch):
+    monkeypatch.setenv("TARGETS", json.dumps([{"name": "eu", "base_url": "http://eu"}, {"name": "us"}]))
+
+    config = load_config()
+
+    assert [target.name for target in config.targets] == ["eu", "us"]
+    assert config.prod is config.targets[0]
+    assert config.targets[0].base_url == "http://eu"
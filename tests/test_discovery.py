@@ -0,0 +1,68 @@
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from benchmarks.run import connect
+from benchmarks.tree_gen import TreeShape, generate
+from clients.name_search import LocalNameSearch
+from config import DEFAULT_TAG
+from services.discovery import DiscoveryService
+from services.snapshot import TreeSnapshot
+
+
+def discover(base_url, config, snapshot_path):
+    client = connect(config)
+    snapshot = TreeSnapshot(str(snapshot_path), base_url, config.tag, max_age_hours=24)
+    discovery = DiscoveryService(client, config, snapshot=snapshot)
+    objects = discovery.find_tagged_objects(discovery.find_main_folders())
+    snapshot.save()
+    return sorted(obj["defaultName"] for obj in objects)
+
+
+def test_snapshot_crawl_sees_a_change_below_unchanged_folders(serve, make_config, new_store, tmp_path):
+    store = new_store()
+    main_id = store.add(ROOT_FOLDER_ID, "Main", "folder")
+    b_id = store.add(store.add(main_id, "A", "folder"), "B", "folder")
+    c_id = store.add(b_id, "C", "folder")
+    store.add(c_id, f"r1 {DEFAULT_TAG}", "report")
+    # D holds nothing tagged, so its listing can be answered from the snapshot.
+    store.add(store.add(b_id, "D", "folder"), "untagged", "report")
+    base_url = serve(store)
+    config = make_config(base_url)
+    snapshot_path = tmp_path / "snapshot.json"
+    assert discover(base_url, config, snapshot_path) == [f"r1 {DEFAULT_TAG}"]
+
+    # Only C's modification time moves; Main, A and B look unchanged.
+    store.add(c_id, f"r2 {DEFAULT_TAG}", "report")
+    assert discover(base_url, config, snapshot_path) == [f"r1 {DEFAULT_TAG}", f"r2 {DEFAULT_TAG}"]
+
+    store.reset_calls()
+    assert discover(base_url, config, snapshot_path) == [f"r1 {DEFAULT_TAG}", f"r2 {DEFAULT_TAG}"]
+    # The root (for the main folder's id), Main, A and B are listed for their subfolders' times, and C for its
+    # tagged reports, one request each; the unchanged leaf D costs nothing.
+    assert store.calls["folder_items"] == 5
+    assert store.calls["content_get"] == 0
+
+
+def found(objects):
+    return sorted((obj["defaultName"], tuple(obj["full_path"])) for obj in objects)
+
+
+def test_name_search_finds_what_the_crawl_finds(serve, make_config):
+    trees = generate(TreeShape(depth=3, fanout=2, objects_per_folder=4, tagged_every=3), DEFAULT_TAG)
+    # Tagged, but outside the main folders: neither discovery may return it.
+    trees.dev.add(trees.dev.add(ROOT_FOLDER_ID, "Elsewhere", "folder"), f"Stray {DEFAULT_TAG}", "report")
+    base_url = serve(trees.dev)
+    crawl_config, search_config = make_config(base_url), make_config(base_url, discovery_mode="search")
+    crawl = DiscoveryService(connect(crawl_config), crawl_config)
+    crawled = found(crawl.find_tagged_objects(crawl.find_main_folders()))
+
+    search = DiscoveryService(connect(search_config), search_config)
+    main_folders = search.find_main_folders()
+    trees.dev.reset_calls()
+    searched = found(search.find_tagged_objects(main_folders))
+    dump = [dict(node) for node in trees.dev.nodes.values()]
+    local = DiscoveryService(connect(search_config), search_config, search=LocalNameSearch(dump))
+    locally_searched = found(local.find_tagged_objects(main_folders))
+
+    assert crawled and searched == crawled and locally_searched == crawled
+    assert all("Stray" not in name for name, _ in crawled)
+    # One search request replaces the crawl.
+    assert trees.dev.calls["search"] == 1 and trees.dev.calls["folder_items"] == 0
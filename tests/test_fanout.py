@@ -0,0 +1,44 @@
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from benchmarks.run import connect
+from benchmarks.tree_gen import module_json, report_spec
+from config import DEFAULT_TAG
+from services.discovery import DiscoveryService
+from services.fanout import FanOutDeployment
+from services.spec_checks import DESCRIPTION_PREFIXES
+from services.spec_store import SpecStore
+from services.startup import Startup
+
+
+def test_targets_deployed_at_once_each_validate_with_their_own_planned_modules(serve, make_config, new_store):
+    dev_store = new_store()
+    dev_main = dev_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    # A tagged module makes every target plan the reports of the batch before validating them.
+    dev_store.add(dev_main, f"Sales {DEFAULT_TAG}", "module", defaultDescription=DESCRIPTION_PREFIXES[0], moduleJson=module_json("Sales"))
+    reports = sorted(f"Report {index} {DEFAULT_TAG}" for index in range(60))
+    for name in reports:
+        dev_store.add(dev_main, name, "report", specification=report_spec(), module="", moduleJson={"useSpec": []})
+    dev = make_config(serve(dev_store), name="dev")
+    targets, prod_stores = [], []
+    for name in ("eu", "us", "apac"):
+        prod_store = new_store()
+        prod_stores.append((prod_store, prod_store.add(ROOT_FOLDER_ID, "Main", "folder")))
+        targets.append(make_config(serve(prod_store, latency=0.001), name=name))
+    spec_store = SpecStore()
+    dev_client = connect(dev)
+    dev_discovery = DiscoveryService(dev_client, dev, spec_store=spec_store)
+    dev_folders = dev_discovery.find_main_folders()
+    objects = dev_discovery.find_tagged_objects(dev_folders)
+    startup = Startup(targets, connect)
+
+    try:
+        results = FanOutDeployment(dev_client, dev, targets, startup, spec_store).run(objects, dev_folders)
+    finally:
+        spec_store.close()
+
+    assert [result.error for result in results] == [None, None, None]
+    assert all(sorted(result.migrated) == reports for result in results)
+    for prod_store, prod_main in prod_stores:
+        names = sorted(prod_store.nodes[child]["defaultName"] for child in prod_store.children[prod_main])
+        assert names == sorted(name.replace(DEFAULT_TAG, "").strip() for name in reports)
+    # Every report reached every target, so each lost its tag in dev.
+    assert not [node for node in dev_store.nodes.values() if node["type"] == "report" and DEFAULT_TAG in node["defaultName"]]
@@ -0,0 +1,82 @@
+import os
+
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from clients.content_client import DISCOVERY_FIELDS, ContentClient
+from clients.http_cache import JOURNAL_FILE, ResponseCache
+from session import SessionFactory, SessionPool
+
+
+def test_entries_survive_a_run_that_never_flushed(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1024)
+    cache.store("http://dev/content/a", b"a-body", etag='"1"')
+    cache.store("http://dev/content/b", b"b-body", modification_time="2024-01-01T00:00:00Z")
+    cache.invalidate("http://dev/content/b")
+    # The process dies here: no flush.
+
+    reopened = ResponseCache(str(tmp_path), max_bytes=1024)
+
+    assert reopened.lookup("http://dev/content/a").etag == '"1"'
+    assert reopened.read("http://dev/content/a") == b"a-body"
+    assert reopened.lookup("http://dev/content/b") is None
+    assert reopened.stats() == {"entries": 1, "bytes": len(b"a-body")}
+
+
+def test_flush_folds_the_journal_into_the_index(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1024)
+    cache.store("http://dev/content/a", b"a-body", etag='"1"')
+    cache.flush()
+    assert not os.path.exists(tmp_path / JOURNAL_FILE)
+    cache.store("http://dev/content/b", b"b-body", etag='"2"')
+    with open(tmp_path / JOURNAL_FILE, "a", encoding="utf-8") as journal_file:
+        journal_file.write('["put", "http://dev/cont')
+
+    reopened = ResponseCache(str(tmp_path), max_bytes=1024)
+
+    assert reopened.read("http://dev/content/a") == b"a-body"
+    assert reopened.read("http://dev/content/b") == b"b-body"
+
+
+def test_bodies_are_kept_when_no_index_was_ever_written(tmp_path):
+    body = tmp_path / ("0" * 64)
+    body.write_bytes(b"body of an older cache")
+
+    ResponseCache(str(tmp_path), max_bytes=1024)
+
+    assert body.exists()
+
+
+def cached_client(config, cache_dir):
+    sessions = SessionPool(SessionFactory(config).create(), config.session_pool_size)
+    return ContentClient(config.base_url, sessions, cache=ResponseCache(str(cache_dir), max_bytes=1024 * 1024))
+
+
+def test_content_client_revalidates_and_forgets_what_it_writes(serve, make_config, new_store, tmp_path):
+    store = new_store()
+    main_id = store.add(ROOT_FOLDER_ID, "Main", "folder")
+    report_id = store.add(main_id, "Revenue", "report", defaultDescription="First")
+    config = make_config(serve(store))
+    client = cached_client(config, tmp_path)
+    client.get_folder_items(main_id, DISCOVERY_FIELDS)
+    assert client.get_fields(report_id, "defaultDescription")["defaultDescription"] == "First"
+
+    # Unchanged since the listing: answered from the cache without a request.
+    store.reset_calls()
+    assert client.get_fields(report_id, "defaultDescription")["defaultDescription"] == "First"
+    assert store.calls["content_get"] == 0
+
+    # A later run has no listing times yet, so it revalidates and gets a 304.
+    client.cache.flush()
+    rerun = cached_client(config, tmp_path)
+    assert rerun.get_fields(report_id, "defaultDescription")["defaultDescription"] == "First"
+    assert store.calls["content_get"] == 1 and store.not_modified == 1
+
+    # A write through the client drops what it had cached, so the next read is a full one.
+    rerun.update_object(report_id, {"type": "report", "defaultDescription": "Second"})
+    assert rerun.get_fields(report_id, "defaultDescription")["defaultDescription"] == "Second"
+    assert store.calls["content_get"] == 2 and store.not_modified == 1
+
+    # Changed behind the client's back: the listing's new modification time forces a request.
+    store.update(report_id, {"defaultDescription": "Third"})
+    rerun.get_folder_items(main_id, DISCOVERY_FIELDS)
+    assert rerun.get_fields(report_id, "defaultDescription")["defaultDescription"] == "Third"
+    assert store.calls["content_get"] == 3
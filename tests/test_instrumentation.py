@@ -0,0 +1,44 @@
+import json
+
+import instrumentation
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from benchmarks.run import connect
+from benchmarks.tree_gen import report_spec
+from config import DEFAULT_TAG
+from services.discovery import DiscoveryService
+from services.migrator import Migrator
+from services.validator import Validator
+
+
+def test_metrics_count_every_request_and_charge_it_to_its_stage(serve, make_config, new_store, tmp_path):
+    dev_store, prod_store = new_store(), new_store()
+    dev_main = dev_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    prod_main = prod_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    for index in range(3):
+        dev_store.add(dev_main, f"Report {index} {DEFAULT_TAG}", "report", specification=report_spec(), module="")
+    prod_store.add(prod_main, "Report 0", "report", specification="", module="")
+    dev, prod = make_config(serve(dev_store)), make_config(serve(prod_store))
+    metrics = instrumentation.enable()
+    try:
+        dev_client, prod_client = connect(dev), connect(prod)
+        dev_discovery, prod_discovery = DiscoveryService(dev_client, dev), DiscoveryService(prod_client, prod)
+        dev_folders, prod_folders = dev_discovery.find_main_folders(), prod_discovery.find_main_folders()
+        objects = dev_discovery.find_tagged_objects(dev_folders)
+        migrator = Migrator(dev_client, prod_client, dev, prod, Validator(dev_client, prod_client, dev))
+        migrator.migrate_objects(objects, dev_folders, prod_folders, prod_discovery.find_backup_folders())
+    finally:
+        instrumentation.disable()
+    report = metrics.report()
+    metrics.write_json(str(tmp_path / "metrics.json"))
+    metrics.write_prometheus(str(tmp_path / "metrics.prom"))
+
+    for base_url, store in ((dev.base_url, dev_store), (prod.base_url, prod_store)):
+        counted = {kind: summary["count"] for kind, summary in report["endpoints"][base_url].items()}
+        assert counted == dict(store.calls)
+    assert {"discovery", "backup", "deploy", "resolution"} <= set(report["stages"])
+    assert report["stages"]["discovery"]["requests"] > 0
+    # Requests made on scheduler and snapshot threads are charged to the stage that started them.
+    assert report["stages"]["deploy"]["requests"] > 0 and report["stages"]["backup"]["requests"] > 0
+    assert json.loads((tmp_path / "metrics.json").read_text())["endpoints"] == report["endpoints"]
+    assert f'cognos_deploy_requests_total{{target="{prod.base_url}",endpoint="update"}} 3' in (tmp_path / "metrics.prom").read_text()
+    assert instrumentation.active() is None
@@ -0,0 +1,136 @@
+import pytest
+
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from benchmarks.run import connect
+from benchmarks.tree_gen import report_spec
+from config import DEFAULT_TAG
+from services.discovery import DiscoveryService
+from services.journal import CREATED, DONE, MigrationJournal
+from services.migrator import Migrator
+from services.spec_store import ObjectRecord, SpecStore
+from services.validator import Validator
+
+
+def test_resumed_run_finishes_what_a_crashed_run_started(serve, make_config, new_store, tmp_path):
+    dev_store, prod_store = new_store(), new_store()
+    dev_main = dev_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    prod_main = prod_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    for index in range(3):
+        dev_store.add(dev_main, f"Report {index} {DEFAULT_TAG}", "report", specification=report_spec(), module="")
+    dev, prod = make_config(serve(dev_store), migration_workers=1), make_config(serve(prod_store), migration_workers=1)
+    journal_path = str(tmp_path / "journal.jsonl")
+
+    def attempt(journal, fail_on_update=None):
+        dev_client, prod_client = connect(dev), connect(prod)
+        dev_discovery, prod_discovery = DiscoveryService(dev_client, dev), DiscoveryService(prod_client, prod)
+        if journal.resumed:
+            folders = journal.folders
+        else:
+            folders = (dev_discovery.find_main_folders(), prod_discovery.find_main_folders(), prod_discovery.find_backup_folders())
+            journal.start_run(folders)
+        objects = journal.record_discovery(dev_discovery.find_tagged_objects(folders[0]))
+        if fail_on_update is not None:
+            update_object, updates = prod_client.update_object, []
+
+            def failing_update_object(obj_id, payload):
+                updates.append(obj_id)
+                if len(updates) == fail_on_update:
+                    raise RuntimeError("connection lost")
+                return update_object(obj_id, payload)
+
+            prod_client.update_object = failing_update_object
+        migrator = Migrator(dev_client, prod_client, dev, prod, Validator(dev_client, prod_client, dev), journal=journal)
+        try:
+            return migrator.migrate_objects(objects, *folders)
+        finally:
+            journal.close()
+
+    with pytest.raises(RuntimeError):
+        attempt(MigrationJournal(journal_path), fail_on_update=2)
+    crashed = MigrationJournal(journal_path, resume=True)
+    steps = sorted(crashed.progress(obj["id"]).step for obj in crashed.discovered if crashed.progress(obj["id"]))
+    crashed.close()
+    # The second report was created in prod but never updated; the others were deployed and renamed.
+    assert steps == [CREATED, DONE, DONE]
+
+    migrated = attempt(MigrationJournal(journal_path, resume=True))
+
+    assert sorted(migrated) == [f"Report {index} {DEFAULT_TAG}" for index in range(3)]
+    prod_names = sorted(prod_store.nodes[child]["defaultName"] for child in prod_store.children[prod_main])
+    assert prod_names == ["Report 0", "Report 1", "Report 2"]
+    assert not [node for node in dev_store.nodes.values() if DEFAULT_TAG in node["defaultName"]]
+
+
+def test_deferred_dev_renames_are_journaled_by_every_target(serve, make_config, new_store, tmp_path):
+    dev_store = new_store()
+    dev_main = dev_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    dev_store.add(dev_main, f"Revenue {DEFAULT_TAG}", "report", specification=report_spec(), module="")
+    dev = make_config(serve(dev_store))
+    dev_client = connect(dev)
+    dev_discovery = DiscoveryService(dev_client, dev)
+    dev_folders = dev_discovery.find_main_folders()
+    migrators, journals = [], []
+    for name in ("eu", "us"):
+        prod_store = new_store()
+        prod_store.add(ROOT_FOLDER_ID, "Main", "folder")
+        prod = make_config(serve(prod_store), name=name)
+        prod_client = connect(prod)
+        prod_discovery = DiscoveryService(prod_client, prod)
+        folders = (dev_folders, prod_discovery.find_main_folders(), prod_discovery.find_backup_folders())
+        journal = MigrationJournal(str(tmp_path / f"{name}.jsonl"))
+        journal.start_run(folders)
+        objects = journal.record_discovery(dev_discovery.find_tagged_objects(dev_folders))
+        migrator = Migrator(
+            dev_client, prod_client, dev, prod, Validator(dev_client, prod_client, dev), journal=journal, defer_dev_renames=True
+        )
+        migrator.migrate_objects(objects, *folders)
+        migrators.append(migrator)
+        journals.append(journal)
+
+    lead, other = migrators
+    assert [dev_obj["defaultName"] for dev_obj, _, _ in lead.pending_dev_renames()] == [f"Revenue {DEFAULT_TAG}"]
+    lead.finish(lead.pending_dev_renames())
+    other.finish(other.pending_dev_renames(), rename_in_dev=False)
+
+    assert not lead.pending_dev_renames() and not other.pending_dev_renames()
+    assert not [node for node in dev_store.nodes.values() if DEFAULT_TAG in node["defaultName"]]
+    for journal in journals:
+        assert [journal.progress(obj["id"]).step for obj in journal.discovered] == [DONE]
+        journal.close()
+
+
+def test_resumed_journal_names_the_manifest_of_its_run(tmp_path):
+    journal_path = str(tmp_path / "journal.jsonl")
+    journal = MigrationJournal(journal_path)
+    journal.manifest_path = str(tmp_path / "prod-20260101-000000.jsonl")
+    journal.start_run(({"Main": "d"}, {"Main": "p"}, {"report": "b"}))
+    journal.close()
+
+    resumed = MigrationJournal(journal_path, resume=True)
+    resumed.close()
+
+    assert resumed.resumed and resumed.manifest_path == journal.manifest_path
+
+
+def test_resumed_leftovers_are_records_like_the_crawled_objects(tmp_path):
+    journal_path = str(tmp_path / "journal.jsonl")
+    journal = MigrationJournal(journal_path)
+    journal.start_run(({"Main": "d"}, {"Main": "p"}, None))
+    spec = report_spec()
+    first = {"id": "r1", "defaultName": f"Report 1 {DEFAULT_TAG}", "type": "report", "specification": spec, "module": ""}
+    second = dict(first, id="r2", defaultName=f"Report 2 {DEFAULT_TAG}")
+    journal.record_discovery([first, second])
+    journal.close()
+
+    resumed = MigrationJournal(journal_path, resume=True)
+    store = SpecStore()
+    try:
+        # The rename of r1 was done before the crash, so the crawl only finds r2.
+        objects = resumed.record_discovery([ObjectRecord.from_item(second, store)], store)
+    finally:
+        resumed.close()
+        store.close()
+
+    assert [obj["id"] for obj in objects] == ["r2", "r1"]
+    assert all(isinstance(obj, ObjectRecord) for obj in objects)
+    assert objects[1]["defaultName"] == first["defaultName"]
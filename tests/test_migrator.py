@@ -0,0 +1,241 @@
+import asyncio
+import json
+from collections import Counter
+
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from benchmarks.run import connect
+from benchmarks.tree_gen import TreeShape, generate, module_json, report_spec
+from clients.async_content_client import AsyncContentClient
+from clients.bundle import BundleContentClient, BundleWriter, ReleaseBundle
+from config import DEFAULT_TAG
+from services.backup import BackupManifest
+from services.discovery import DiscoveryService
+from services.export import BundleExport
+from services.migrator import Migrator
+from services.spec_checks import DESCRIPTION_PREFIXES
+from services.spec_store import SpecStore
+from services.validator import Validator
+from session import SessionFactory
+
+
+DESCRIPTION = DESCRIPTION_PREFIXES[0]
+
+
+def add_release(store, tag: str = "") -> None:
+    """Main folder with a data module and a report, both tagged with ``tag``."""
+    main_id = store.add(ROOT_FOLDER_ID, "Main", "folder")
+    store.add(main_id, f"Sales {tag}".strip(), "module", defaultDescription=DESCRIPTION, moduleJson=module_json("Sales"))
+    store.add(
+        main_id,
+        f"Revenue {tag}".strip(),
+        "report",
+        defaultDescription=DESCRIPTION,
+        specification=report_spec(),
+        module="",
+        moduleJson={"useSpec": []},
+    )
+
+
+def test_report_module_is_fetched_once_for_planning_and_validation(serve, make_config, new_store):
+    dev_store, prod_store = new_store(), new_store()
+    add_release(dev_store, DEFAULT_TAG)
+    add_release(prod_store)
+    prod_store.update(next(node["id"] for node in prod_store.nodes.values() if node["defaultName"] == "Revenue"), {"specification": ""})
+    dev, prod = make_config(serve(dev_store)), make_config(serve(prod_store))
+    dev_client, prod_client = connect(dev), connect(prod)
+    fetched = Counter()
+    get_module = dev_client.get_module
+
+    def counting_get_module(obj_id):
+        fetched[obj_id] += 1
+        return get_module(obj_id)
+
+    dev_client.get_module = counting_get_module
+    spec_store = SpecStore()
+    dev_discovery, prod_discovery = DiscoveryService(dev_client, dev, spec_store=spec_store), DiscoveryService(prod_client, prod)
+    dev_main, prod_main = dev_discovery.find_main_folders(), prod_discovery.find_main_folders()
+    objects = dev_discovery.find_tagged_objects(dev_main)
+    migrator = Migrator(dev_client, prod_client, dev, prod, Validator(dev_client, prod_client, dev))
+
+    migrated = migrator.migrate_objects(objects, dev_main, prod_main, prod_discovery.find_backup_folders())
+    spec_store.close()
+
+    # The module is planned with the report but fails validation on its description prefix.
+    assert len(migrated) == 1
+    report_id = next(obj["id"] for obj in objects if obj["type"] == "report")
+    assert fetched[report_id] == 1
+
+
+def prod_state(store):
+    """Every node as (folder path, type, name, payload), without the ids and times that differ between runs."""
+
+    def path(node_id):
+        return tuple(ancestor["defaultName"] for ancestor in store.ancestors(node_id))
+
+    return sorted(
+        (
+            path(node_id),
+            node["type"],
+            node["defaultName"],
+            json.dumps({key: node.get(key) for key in ("defaultDescription", "specification", "module", "moduleJson")}, sort_keys=True),
+        )
+        for node_id, node in store.nodes.items()
+    )
+
+
+def test_async_migration_matches_sync(serve, make_config):
+    shape = TreeShape(depth=2, fanout=2, objects_per_folder=5, tagged_every=2, prod_share=0.5, module_ref_every=2)
+    sync_trees, async_trees = generate(shape, DEFAULT_TAG), generate(shape, DEFAULT_TAG)
+
+    sync_dev, sync_prod = make_config(serve(sync_trees.dev)), make_config(serve(sync_trees.prod))
+    dev_client, prod_client = connect(sync_dev), connect(sync_prod)
+    dev_discovery, prod_discovery = DiscoveryService(dev_client, sync_dev), DiscoveryService(prod_client, sync_prod)
+    dev_main, prod_main = dev_discovery.find_main_folders(), prod_discovery.find_main_folders()
+    sync_migrator = Migrator(dev_client, prod_client, sync_dev, sync_prod, Validator(dev_client, prod_client, sync_dev))
+    sync_migrated = sync_migrator.migrate_objects(
+        dev_discovery.find_tagged_objects(dev_main), dev_main, prod_main, prod_discovery.find_backup_folders()
+    )
+
+    async_dev, async_prod = make_config(serve(async_trees.dev)), make_config(serve(async_trees.prod))
+
+    async def run_async():
+        dev_client = AsyncContentClient(async_dev.base_url, SessionFactory(async_dev).create())
+        prod_client = AsyncContentClient(async_prod.base_url, SessionFactory(async_prod).create())
+        async with dev_client, prod_client:
+            dev_discovery, prod_discovery = DiscoveryService(dev_client, async_dev), DiscoveryService(prod_client, async_prod)
+            dev_main, prod_main = await dev_discovery.afind_main_folders(), await prod_discovery.afind_main_folders()
+            objects = await dev_discovery.arecursive_search_objects(dev_main["Main"], ["Main"])
+            migrator = Migrator(dev_client, prod_client, async_dev, async_prod, Validator(dev_client, prod_client, async_dev))
+            migrated = await migrator.amigrate_objects(objects, dev_main, prod_main, await prod_discovery.afind_backup_folders())
+            return migrator, migrated
+
+    async_migrator, async_migrated = asyncio.run(run_async())
+
+    assert sync_migrated
+    assert sorted(async_migrated) == sorted(sync_migrated)
+    assert sorted(async_migrator.unchanged) == sorted(sync_migrator.unchanged)
+    assert prod_state(async_trees.prod) == prod_state(sync_trees.prod)
+    assert prod_state(async_trees.dev) == prod_state(sync_trees.dev)
+
+
+def test_api_calls_are_counted_per_object_not_per_name(serve, make_config, new_store):
+    dev_store, prod_store = new_store(), new_store()
+    dev_main, prod_main = dev_store.add(ROOT_FOLDER_ID, "Main", "folder"), prod_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    for folder_name in ("East", "West"):
+        folder_id = dev_store.add(dev_main, folder_name, "folder")
+        prod_store.add(prod_main, folder_name, "folder")
+        dev_store.add(folder_id, f"Revenue {DEFAULT_TAG}", "report", specification=report_spec(), module="")
+    dev, prod = make_config(serve(dev_store)), make_config(serve(prod_store))
+    dev_client, prod_client = connect(dev), connect(prod)
+    dev_discovery, prod_discovery = DiscoveryService(dev_client, dev), DiscoveryService(prod_client, prod)
+    dev_folders, prod_folders = dev_discovery.find_main_folders(), prod_discovery.find_main_folders()
+    objects = dev_discovery.find_tagged_objects(dev_folders)
+    migrator = Migrator(dev_client, prod_client, dev, prod, Validator(dev_client, prod_client, dev))
+
+    migrator.migrate_objects(objects, dev_folders, prod_folders, prod_discovery.find_backup_folders())
+
+    assert sorted(migrator.api_calls) == sorted(obj["id"] for obj in objects)
+    assert sorted(calls["path"] for calls in migrator.api_calls.values()) == ["Main/East", "Main/West"]
+    assert all(calls["prod"] > 0 for calls in migrator.api_calls.values())
+
+
+def test_snapshot_backs_up_only_objects_that_pass_validation(serve, make_config, new_store, tmp_path):
+    dev_store, prod_store = new_store(), new_store()
+    add_release(dev_store, DEFAULT_TAG)
+    add_release(prod_store)
+    for node in prod_store.nodes.values():
+        if node["defaultName"] in ("Sales", "Revenue"):
+            prod_store.update(node["id"], {"defaultDescription": "Before the release"})
+    dev, prod = make_config(serve(dev_store)), make_config(serve(prod_store))
+    dev_client, prod_client = connect(dev), connect(prod)
+    dev_discovery, prod_discovery = DiscoveryService(dev_client, dev), DiscoveryService(prod_client, prod)
+    dev_main, prod_main = dev_discovery.find_main_folders(), prod_discovery.find_main_folders()
+    manifest = BackupManifest(str(tmp_path / "prod.jsonl"), "prod", prod.base_url)
+    migrator = Migrator(dev_client, prod_client, dev, prod, Validator(dev_client, prod_client, dev), manifest=manifest)
+
+    migrated = migrator.migrate_objects(
+        dev_discovery.find_tagged_objects(dev_main), dev_main, prod_main, prod_discovery.find_backup_folders()
+    )
+    manifest.close()
+
+    # The module fails validation on its description prefix, so only the report is backed up and deployed.
+    assert migrated == [f"Revenue {DEFAULT_TAG}"]
+    assert [entry.name for entry in BackupManifest.load(manifest.path).entries] == ["Revenue"]
+
+
+def test_importing_a_bundle_deploys_like_migrating_from_dev(serve, make_config, tmp_path):
+    shape = TreeShape(depth=2, fanout=2, objects_per_folder=5, tagged_every=2, prod_share=0.5, module_ref_every=2)
+    direct_trees, bundle_trees = generate(shape, DEFAULT_TAG), generate(shape, DEFAULT_TAG)
+
+    direct_dev, direct_prod = make_config(serve(direct_trees.dev)), make_config(serve(direct_trees.prod))
+    dev_client, prod_client = connect(direct_dev), connect(direct_prod)
+    dev_discovery, prod_discovery = DiscoveryService(dev_client, direct_dev), DiscoveryService(prod_client, direct_prod)
+    dev_main, prod_main = dev_discovery.find_main_folders(), prod_discovery.find_main_folders()
+    direct_migrator = Migrator(dev_client, prod_client, direct_dev, direct_prod, Validator(dev_client, prod_client, direct_dev))
+    direct_migrated = direct_migrator.migrate_objects(
+        dev_discovery.find_tagged_objects(dev_main), dev_main, prod_main, prod_discovery.find_backup_folders()
+    )
+
+    bundle_dev, bundle_prod = make_config(serve(bundle_trees.dev)), make_config(serve(bundle_trees.prod))
+    path = str(tmp_path / "release.bundle")
+    dev_client = connect(bundle_dev)
+    dev_discovery = DiscoveryService(dev_client, bundle_dev)
+    dev_main = dev_discovery.find_main_folders()
+    BundleExport(dev_client, bundle_dev, BundleWriter(path)).run(dev_discovery.find_tagged_objects(dev_main), dev_main)
+    dev_before_import = prod_state(bundle_trees.dev)
+
+    bundle = ReleaseBundle(path)
+    try:
+        bundle_client, prod_client = BundleContentClient(bundle), connect(bundle_prod)
+        prod_discovery = DiscoveryService(prod_client, bundle_prod)
+        prod_main = prod_discovery.find_main_folders()
+        bundle_migrator = Migrator(bundle_client, prod_client, bundle_dev, bundle_prod, Validator(bundle_client, prod_client, bundle_dev))
+        bundle_migrated = bundle_migrator.migrate_objects(
+            list(bundle.objects()), bundle.main_folders, prod_main, prod_discovery.find_backup_folders()
+        )
+    finally:
+        bundle.close()
+
+    assert direct_migrated
+    assert sorted(bundle_migrated) == sorted(direct_migrated)
+    assert sorted(bundle_migrator.unchanged) == sorted(direct_migrator.unchanged)
+    assert prod_state(bundle_trees.prod) == prod_state(direct_trees.prod)
+    # An import never touches dev; the tags stay until a regular run.
+    assert prod_state(bundle_trees.dev) == dev_before_import
+
+
+def test_migrators_sharing_records_keep_their_own_planned_modules(serve, make_config, new_store):
+    dev_store = new_store()
+    add_release(dev_store, DEFAULT_TAG)
+    dev = make_config(serve(dev_store))
+    dev_client = connect(dev)
+    fetched = Counter()
+    get_module = dev_client.get_module
+
+    def counting_get_module(obj_id):
+        fetched[obj_id] += 1
+        return get_module(obj_id)
+
+    dev_client.get_module = counting_get_module
+    spec_store = SpecStore()
+    dev_discovery = DiscoveryService(dev_client, dev, spec_store=spec_store)
+    dev_main = dev_discovery.find_main_folders()
+    report = next(obj for obj in dev_discovery.find_tagged_objects(dev_main) if obj["type"] == "report")
+    migrators = []
+    for name in ("eu", "us"):
+        prod_store = new_store()
+        prod_store.add(ROOT_FOLDER_ID, "Main", "folder")
+        prod = make_config(serve(prod_store), name=name)
+        prod_client = connect(prod)
+        prod_discovery = DiscoveryService(prod_client, prod)
+        validator = Validator(dev_client, prod_client, dev)
+        migrator = Migrator(dev_client, prod_client, dev, prod, validator, spec_store=spec_store)
+        migrator.plan(report)
+        migrators.append((migrator, prod_discovery.find_main_folders(), prod_discovery.find_backup_folders()))
+
+    outcomes = [migrator.migrate_one(report, dev_main, *folders) for migrator, *folders in migrators]
+    spec_store.close()
+
+    assert outcomes == ["migrated", "migrated"]
+    # Each migrator validated with the module it planned; neither read it again.
+    assert fetched[report["id"]] == 2
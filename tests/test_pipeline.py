@@ -0,0 +1,53 @@
+import threading
+
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from benchmarks.run import connect
+from benchmarks.tree_gen import report_spec
+from config import DEFAULT_TAG
+from services.discovery import DiscoveryService
+from services.migrator import Migrator
+from services.pipeline import MigrationPipeline
+from services.validator import Validator
+
+
+def test_pipeline_bounds_the_objects_in_flight(serve, make_config, new_store):
+    dev_store, prod_store = new_store(), new_store()
+    dev_main = dev_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    prod_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    for index in range(40):
+        dev_store.add(dev_main, f"Report {index} {DEFAULT_TAG}", "report", specification=report_spec(), module="")
+    dev = make_config(serve(dev_store, latency=0.002), migration_workers=2, stream_queue_size=3)
+    prod = make_config(serve(prod_store, latency=0.002), migration_workers=2)
+    dev_client, prod_client = connect(dev), connect(prod)
+    dev_discovery, prod_discovery = DiscoveryService(dev_client, dev), DiscoveryService(prod_client, prod)
+    dev_folders, prod_folders = dev_discovery.find_main_folders(), prod_discovery.find_main_folders()
+    objects = dev_discovery.find_tagged_objects(dev_folders)
+    migrator = Migrator(dev_client, prod_client, dev, prod, Validator(dev_client, prod_client, dev))
+    pipeline = MigrationPipeline(migrator)
+
+    lock = threading.Lock()
+    taken, finished, peak = [0], [0], [0]
+    migrate_one = migrator.migrate_one
+
+    def counting_migrate_one(*args):
+        try:
+            return migrate_one(*args)
+        finally:
+            with lock:
+                finished[0] += 1
+
+    migrator.migrate_one = counting_migrate_one
+
+    def source():
+        for obj in objects:
+            with lock:
+                taken[0] += 1
+                peak[0] = max(peak[0], taken[0] - finished[0])
+            yield obj
+
+    migrated = pipeline.run(source(), dev_folders, prod_folders, prod_discovery.find_backup_folders())
+
+    assert len(migrated) == 40
+    assert pipeline.max_in_flight == 5
+    # The object being handed over is counted before ``_accept`` can wait for a slot.
+    assert peak[0] <= pipeline.max_in_flight + 1
@@ -0,0 +1,79 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from benchmarks.tree_gen import REPORT_NAMESPACE, report_spec
+from services.report_rules import ReportContext
+from services.spec_checks import scan_report_spec
+
+
+def tree_warnings(spec_xml, context):
+    """The checks as they were written before the streaming rules, over a parsed element tree.
+
+    They read ``sqlText`` with ``elem.text``; here the element's whole text is taken,
+    which is the same for the plain SQL a report holds and what the rules now see
+    when the SQL carries markup.
+    """
+    root = ET.fromstring(spec_xml.strip())
+    if root.tag.startswith("{"):
+        if not root.tag.endswith("report"):
+            return None
+        namespace = root.tag[1 : root.tag.index("}")]
+    else:
+        namespace = None
+    queries = root.findall(".//ns:sqlText", {"ns": namespace})
+    warnings = []
+    if context.is_new and queries:
+        warnings.append(f"Report {context.name} contains SQL; creation not allowed")
+    for elem in queries:
+        sql_text = " ".join("".join(elem.itertext()).split())
+        if "sql_" in sql_text:
+            warnings.append(f"Report {context.name} contains references to named SQL queries")
+    if "Greenplum" in context.sources:
+        if root.attrib.get("viewPagesAsTabs") != "bottomLeft":
+            warnings.append(
+                f"Report {context.name} has incorrect page view settings for Greenplum source; expected bottomLeft"
+            )
+        if "paginateHTMLOutput" in root.attrib:
+            warnings.append(f"Report {context.name} has HTML pagination enabled for Greenplum source")
+    return warnings
+
+
+def stream_warnings(spec_xml, context):
+    rules = scan_report_spec(spec_xml)
+    if rules is None:
+        return None
+    return [warning for rule in rules for warning in rule.evaluate(context)]
+
+
+SPECS = [
+    report_spec(),
+    report_spec(sql="select * from sales"),
+    report_spec(sql="select * from sql_sales"),
+    report_spec(sql="select 1", greenplum_layout=False),
+    # A named query behind child markup, which the streaming pass used to drop.
+    report_spec(sql="select * from <b>joined</b> sql_sales"),
+    (
+        f'<report xmlns="{REPORT_NAMESPACE}" viewPagesAsTabs="top" paginateHTMLOutput="true"><queries>'
+        "<query><source><sqlText>select * from sql_a</sqlText></source></query>"
+        "<query><source><sqlText>\n\tselect *\n\tfrom b</sqlText></source></query>"
+        "</queries></report>"
+    ),
+    f'<dashboard xmlns="{REPORT_NAMESPACE}"><sqlText>sql_a</sqlText></dashboard>',
+    "<report><queries><query><source><sqlText>sql_a</sqlText></source></query></queries></report>",
+]
+
+
+@pytest.mark.parametrize("spec_xml", SPECS)
+@pytest.mark.parametrize("is_new", [True, False])
+@pytest.mark.parametrize("sources", [[], ["Greenplum"]])
+def test_streaming_rules_match_the_tree_checks(spec_xml, is_new, sources):
+    context = ReportContext(name="Revenue", is_new=is_new, sources=sources)
+
+    assert stream_warnings(spec_xml, context) == tree_warnings(spec_xml, context)
+
+
+def test_sql_with_child_markup_keeps_its_text():
+    context = ReportContext(name="Revenue", is_new=False, sources=[])
+
+    assert stream_warnings(SPECS[4], context) == ["Report Revenue contains references to named SQL queries"]
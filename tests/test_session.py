@@ -0,0 +1,40 @@
+import asyncio
+
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from benchmarks.run import connect
+from clients.async_content_client import AsyncContentClient
+from session import SessionFactory
+
+
+def test_an_expired_passport_costs_one_login(serve, make_config, new_store):
+    store = new_store()
+    main_id = store.add(ROOT_FOLDER_ID, "Main", "folder")
+    client = connect(make_config(serve(store), session_pool_size=1))
+    client.get_content(main_id)
+    store.expire_passports()
+    store.reset_calls()
+
+    for _ in range(3):
+        assert client.get_content(main_id)["defaultName"] == "Main"
+
+    # The first request is rejected, logs in again and is replayed; the rest use the new passport.
+    assert store.calls["session"] == 1
+    assert store.calls["content_get"] == 4
+
+
+def test_concurrent_async_requests_share_one_login(serve, make_config, new_store):
+    store = new_store()
+    main_id = store.add(ROOT_FOLDER_ID, "Main", "folder")
+    config = make_config(serve(store))
+
+    async def read_concurrently():
+        async with AsyncContentClient(config.base_url, SessionFactory(config).create()) as client:
+            await client.get_content(main_id)
+            store.expire_passports()
+            store.reset_calls()
+            return await asyncio.gather(*(client.get_content(main_id) for _ in range(5)))
+
+    results = asyncio.run(read_concurrently())
+
+    assert [result["defaultName"] for result in results] == ["Main"] * 5
+    assert store.calls["session"] == 1
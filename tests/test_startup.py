@@ -0,0 +1,57 @@
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from benchmarks.run import connect
+from benchmarks.tree_gen import report_spec
+from config import DEFAULT_TAG
+from services.discovery import DiscoveryService
+from services.journal import MigrationJournal
+from services.migrator import Migrator
+from services.startup import Startup, target_folders
+from services.validator import Validator
+
+
+def test_startup_only_logs_in_where_main_folders_are_known(serve, make_config, new_store):
+    dev_store, prod_store = new_store(), new_store()
+    for store in (dev_store, prod_store):
+        store.add(ROOT_FOLDER_ID, "Main", "folder")
+    dev = make_config(serve(dev_store), name="dev")
+    prod = make_config(serve(prod_store), name="prod")
+
+    startup = Startup([dev, prod], connect, known_main_folders={"prod"})
+
+    assert set(startup.environment("dev").main_folders) == {"Main"}
+    assert startup.environment("prod").main_folders is None
+    assert prod_store.calls["session"] == 1 and prod_store.calls["folder_items"] == 0
+
+
+def test_backup_folders_are_looked_up_when_the_first_backup_needs_them(serve, make_config, new_store, tmp_path):
+    dev_store, prod_store = new_store(), new_store()
+    dev_main = dev_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    prod_main = prod_store.add(ROOT_FOLDER_ID, "Main", "folder")
+    dev_store.add(dev_main, f"New {DEFAULT_TAG}", "report", specification=report_spec(), module="")
+    dev = make_config(serve(dev_store), name="dev")
+    prod = make_config(serve(prod_store), name="prod")
+    startup = Startup([dev, prod], connect)
+    dev_env, prod_env = startup.environment("dev"), startup.environment("prod")
+    journal = MigrationJournal(str(tmp_path / "journal.jsonl"))
+    dev_discovery = DiscoveryService(dev_env.client, dev)
+
+    def deploy():
+        prod_main_folders, prod_backup_folders = target_folders(prod_env, journal, dev_env.main_folders)
+        objects = dev_discovery.find_tagged_objects(dev_env.main_folders)
+        validator = Validator(dev_env.client, prod_env.client, dev)
+        migrator = Migrator(dev_env.client, prod_env.client, dev, prod, validator, journal=journal)
+        migrator.migrate_objects(objects, dev_env.main_folders, prod_main_folders, prod_backup_folders)
+        return prod_backup_folders
+
+    # Only a new object: nothing is backed up, so the backup folders are never looked up.
+    assert not deploy().loaded
+    assert journal.folders[2] is None
+
+    dev_store.add(dev_main, f"Existing {DEFAULT_TAG}", "report", specification=report_spec(), module="")
+    prod_store.add(prod_main, "Existing", "report", specification="", module="")
+    backup_folders = deploy()
+    journal.close()
+
+    assert backup_folders.loaded
+    assert journal.folders[2] == dict(backup_folders)
+    assert any(node["defaultName"] == "Existing" and node["parentId"] == backup_folders["report"] for node in prod_store.nodes.values())
@@ -0,0 +1,63 @@
+from benchmarks.mock_server import ROOT_FOLDER_ID
+from clients.transport import AdaptiveLimiter, RetryPolicy, retry_statuses, timed_request
+from session import SessionFactory
+
+
+def test_put_is_not_retried_after_a_server_error():
+    retry = RetryPolicy(retries=3, backoff_factor=0).urllib3_retry()
+
+    assert not retry.is_retry("PUT", 500)
+    assert retry.is_retry("PUT", 503)
+    assert retry.is_retry("GET", 500)
+    # urllib3 makes a new Retry for every attempt; it must keep the rule.
+    assert not retry.increment("GET", "/content/1", error=None, _pool=None, _stacktrace=None).is_retry("PUT", 500)
+    assert 500 not in retry_statuses("PUT") and 500 in retry_statuses("GET")
+
+
+class _Response:
+    def __init__(self, retry_after):
+        self.headers = {"Retry-After": retry_after}
+
+
+def test_retry_after_is_capped_at_the_maximum_backoff():
+    policy = RetryPolicy(retries=3, backoff_factor=0.5, max_backoff=10.0)
+    retry = policy.urllib3_retry()
+
+    assert retry.get_retry_after(_Response("3600")) == 10.0
+    assert retry.get_retry_after(_Response("2")) == 2.0
+    # urllib3 makes a new Retry for every attempt; it must keep the cap.
+    assert retry.increment("GET", "/content/1", error=None, _pool=None, _stacktrace=None).get_retry_after(_Response("3600")) == 10.0
+    assert policy.retry_after("3600", 0.5) == 10.0
+    assert policy.retry_after("2", 0.5) == 2.0
+    assert policy.retry_after(None, 0.5) == 0.5
+
+
+def test_adaptive_limit_backs_off_when_throttled_and_grows_back(serve, make_config, new_store):
+    store = new_store()
+    main_id = store.add(ROOT_FOLDER_ID, "Main", "folder")
+    config = make_config(serve(store), http_retries=0)
+    session_data = SessionFactory(config).create()
+    limiter = AdaptiveLimiter(maximum=8, latency_target=10.0)
+    url = f"{config.base_url}/content/{main_id}"
+
+    def request():
+        return timed_request(session_data.session, limiter, "GET", url, headers=session_data.headers).status_code
+
+    assert limiter.limit == 4
+    for _ in range(12):
+        assert request() == 200
+    grown = limiter.limit
+    assert grown > 6
+
+    store.fail_next(429)
+    assert request() == 429
+    assert limiter.limit == grown / 2
+
+    # A second throttle right after the first is part of the same congestion signal.
+    store.fail_next(503)
+    assert request() == 503
+    assert limiter.limit == grown / 2
+
+    for _ in range(12):
+        assert request() == 200
+    assert limiter.limit > grown / 2
@@ -0,0 +1,38 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.run import connect
+from benchmarks.tree_gen import TreeShape, generate
+from config import DEFAULT_TAG
+from services.discovery import DiscoveryService
+from services.validator import Validator
+
+
+class CountingPool(ProcessPoolExecutor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_checks_in_a_process_pool_give_the_inline_verdicts(serve, make_config):
+    shape = TreeShape(depth=2, fanout=2, objects_per_folder=6, tagged_every=2, prod_share=0.5, module_ref_every=2)
+    trees = generate(shape, DEFAULT_TAG)
+    dev, prod = make_config(serve(trees.dev)), make_config(serve(trees.prod))
+    dev_client, prod_client = connect(dev), connect(prod)
+    dev_discovery, prod_discovery = DiscoveryService(dev_client, dev), DiscoveryService(prod_client, prod)
+    dev_main, prod_main = dev_discovery.find_main_folders(), prod_discovery.find_main_folders()
+    objects = [obj for obj in dev_discovery.find_tagged_objects(dev_main) if obj["type"] in ("report", "module")]
+
+    inline = Validator(dev_client, prod_client, dev)
+    inline_verdicts = [inline.validate(dict(obj), dev_main, prod_main, is_new=is_new) for obj in objects for is_new in (True, False)]
+    with CountingPool(max_workers=2) as pool:
+        pooled = Validator(dev_client, prod_client, dev, executor=pool)
+        pooled_verdicts = [pooled.validate(dict(obj), dev_main, prod_main, is_new=is_new) for obj in objects for is_new in (True, False)]
+
+    assert objects and pooled_verdicts == inline_verdicts
+    assert True in inline_verdicts and False in inline_verdicts
+    # Every report scan and module check ran in the pool.
+    assert pool.submitted >= len(objects) * 2